@@ -1,14 +1,19 @@
-from datetime import timedelta
+import asyncio
+from datetime import datetime, timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import TypeAdapter, ValidationError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from ..core.db import get_session
-from ..core.security import create_access_token, get_password_hash, verify_password
+from ..core.security import create_access_token, get_password_hash, password_needs_rehash, verify_password
 from ..models.user import Token, User, UserCreate, UserRead
 
 router = APIRouter(tags=["auth"])
@@ -18,35 +23,101 @@ limiter = Limiter(key_func=get_remote_address)
 @router.post("/register", response_model=UserRead)
 @limiter.limit("5/minute")
 def register(request: Request, user_in: UserCreate, session: Session = Depends(get_session)) -> Any:
-    user = session.exec(select(User).where(User.email == user_in.email)).first()
-    if user:
-        raise HTTPException(
-            status_code=400,
-            detail="The user with this email already exists in the system",
-        )
+    # 普通 def 端点在线程池里执行：argon2 哈希与数据库读写都不占用事件循环
+    hashed_password = get_password_hash(user_in.password)
     user = User(
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         is_active=True,
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    try:
+        session.commit()
+    except IntegrityError:
+        # 邮箱唯一约束由数据库保证，省去一次预查询
+        session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this email already exists in the system",
+        ) from None
+    # id 由 INSERT 回填，created_at 在 Python 侧生成，get_session 不会在提交后过期对象，无需 refresh
     return user
 
 
+_bulk_users_adapter = TypeAdapter(list[UserCreate])
+
+# 每个 argon2 哈希约占 46 MiB 内存并独占一个线程池线程：限制单批人数与同时计算的哈希数，
+# 避免一个请求占满所有 def 端点共用的线程池
+_MAX_BULK_USERS = 100
+_BULK_HASH_CONCURRENCY = 4
+
+
+@router.post("/register/bulk", response_model=list[UserRead])
+@limiter.limit("2/minute")
+async def register_bulk(request: Request, session: Session = Depends(get_session)) -> Any:
+    # pydantic-core 直接校验整段 JSON body，不逐条走 FastAPI 的请求体解析
+    try:
+        users_in = _bulk_users_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False)) from None
+    if not users_in:
+        return []
+    if len(users_in) > _MAX_BULK_USERS:
+        raise HTTPException(status_code=413, detail=f"At most {_MAX_BULK_USERS} users per request")
+
+    sem = asyncio.Semaphore(_BULK_HASH_CONCURRENCY)
+
+    async def _hash(password: str) -> str:
+        async with sem:
+            return await run_in_threadpool(get_password_hash, password)
+
+    hashes = await asyncio.gather(*(_hash(u.password) for u in users_in))
+    rows = [
+        {"email": u.email, "hashed_password": h, "is_active": True, "created_at": datetime.utcnow()}
+        for u, h in zip(users_in, hashes, strict=True)
+    ]
+    try:
+        # 同步 Session 的写入同样放进线程池，不阻塞事件循环
+        return await run_in_threadpool(_insert_users, session, rows)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=400,
+            detail="One or more users with these emails already exist in the system",
+        ) from None
+
+
+def _insert_users(session: Session, rows: list[dict[str, Any]]) -> list[User]:
+    try:
+        users = session.scalars(insert(User).returning(User), rows).all()
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise
+    return users
+
+
+# 按 lower(email) 查找，命中唯一表达式索引 ix_user_email_lower
+_LOGIN_LOOKUP = select(User.id, User.hashed_password).where(
+    func.lower(User.email) == bindparam("email"), User.is_active.is_(True)
+)
+
+
 @router.post("/login", response_model=Token)
 @limiter.limit("10/minute")
 def login(
     request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)
 ) -> Any:
     # OAuth2PasswordRequestForm uses 'username' for the email field
-    user = session.exec(select(User).where(User.email == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # 未激活用户直接查不到，与密码错误返回同样的错误，不暴露账号状态
+    row = session.exec(_LOGIN_LOOKUP, params={"email": form_data.username.lower()}).first()
+    if not row or not verify_password(form_data.password, row.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+    user_id, hashed_password = row
+    if password_needs_rehash(hashed_password):
+        new_hash = get_password_hash(form_data.password)
+        session.exec(update(User).where(User.id == user_id).values(hashed_password=new_hash))
+        session.commit()
 
     access_token_expires = timedelta(minutes=60 * 24 * 8)  # 8 days
-    access_token = create_access_token(subject=user.id, expires_delta=access_token_expires)
+    access_token = create_access_token(subject=user_id, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer"}
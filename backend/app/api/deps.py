@@ -1,43 +1,110 @@
+import hashlib
+import hmac
+from collections.abc import Callable
+from functools import lru_cache
+from typing import NamedTuple
+
 from fastapi import HTTPException, Request
 
+from ..core.config import LLMCredentials, get_config
+
+_cfg = get_config()
+
+# Server-side LLM config, built once and shared across requests
+_SERVER_LLM = LLMCredentials(_cfg.llm.base_url, _cfg.llm.api_key, _cfg.llm.model)
+
+
+class AuthInfo(NamedTuple):
+    """Credentials parsed from one request: kind is "token", "byok" or "none"."""
+
+    kind: str
+    token: bytes
+    api_key: str
+
+
+def parse_auth(request: Request) -> AuthInfo:
+    """Walk the raw ASGI headers once and cache the result on request.state."""
+    cached = getattr(request.state, "auth", None)
+    if cached is not None:
+        return cached
+    token: bytes | None = None
+    api_key = ""
+    for name, value in request.scope["headers"]:
+        if name == b"authorization":
+            if value[:7] == b"Bearer ":
+                token = value[7:]
+        elif name == b"x-llm-api-key" and not api_key:
+            api_key = value.decode("latin-1")
+    if token is not None:
+        auth = AuthInfo("token", token, "")
+    elif api_key:
+        auth = AuthInfo("byok", b"", api_key)
+    else:
+        auth = AuthInfo("none", b"", "")
+    request.state.auth = auth
+    return auth
+
+
+def _llm_from_token(request: Request, auth: AuthInfo) -> LLMCredentials:
+    # API token — use server-side LLM config
+    expected = _cfg.security.api_token_bytes
+    # 长度不符直接拒绝，随机探测的 token 不进入比较
+    if expected and len(auth.token) == len(expected) and hmac.compare_digest(auth.token, expected):
+        return _SERVER_LLM
+    raise HTTPException(401, "Invalid API token")
+
+
+def _llm_from_byok(request: Request, auth: AuthInfo) -> LLMCredentials:
+    # BYOK — LLM config from headers
+    return LLMCredentials(
+        base_url=request.headers.get("X-LLM-Base-URL", ""),
+        api_key=auth.api_key,
+        model=request.headers.get("X-LLM-Model", ""),
+    )
 
-def get_llm_config(request: Request) -> dict:
-    """Extract LLM configuration from request headers (BYOK) or API token."""
-    from ..core.config import get_config
-    cfg = get_config()
-
-    # 1. Check for API token — use server-side LLM config
-    auth = request.headers.get("Authorization", "")
-    if auth.startswith("Bearer "):
-        token = auth[7:]
-        if cfg.security.api_token and token == cfg.security.api_token:
-            return {"base_url": cfg.llm.base_url, "api_key": cfg.llm.api_key, "model": cfg.llm.model}
-        raise HTTPException(401, "Invalid API token")
-
-    # 2. BYOK — LLM config from headers
-    api_key = request.headers.get("X-LLM-API-Key", "")
-    if api_key:
-        return {
-            "base_url": request.headers.get("X-LLM-Base-URL", ""),
-            "api_key": api_key,
-            "model": request.headers.get("X-LLM-Model", ""),
-        }
-
-    # 3. Fallback to config.yaml
-    if cfg.llm.api_key and cfg.llm.api_key != "YOUR_API_KEY":
-        return {"base_url": cfg.llm.base_url, "api_key": cfg.llm.api_key, "model": cfg.llm.model}
 
+def _llm_from_config(request: Request, auth: AuthInfo) -> LLMCredentials:
+    return _SERVER_LLM
+
+
+def _llm_missing(request: Request, auth: AuthInfo) -> LLMCredentials:
     raise HTTPException(400, "Missing X-LLM-API-Key header. Configure your API key in Settings.")
 
 
+# Fallback to config.yaml is decided once at import, not per request
+_DISPATCH: dict[str, Callable[[Request, AuthInfo], LLMCredentials]] = {
+    "token": _llm_from_token,
+    "byok": _llm_from_byok,
+    "none": _llm_from_config if _cfg.llm.api_key and _cfg.llm.api_key != "YOUR_API_KEY" else _llm_missing,
+}
+
+
+def get_llm_config(request: Request) -> LLMCredentials:
+    """Extract LLM configuration from request headers (BYOK) or API token."""
+    auth = parse_auth(request)
+    return _DISPATCH[auth.kind](request, auth)
+
+
 def get_client_id(request: Request) -> str:
     """Derive a client identity for per-user concurrency control."""
+    auth = parse_auth(request)
     # API token users share one identity
-    auth = request.headers.get("Authorization", "")
-    if auth.startswith("Bearer "):
+    if auth.kind == "token":
         return "_api_token_"
     # BYOK users: hash their API key (first 16 chars) as identity
-    api_key = request.headers.get("X-LLM-API-Key", "")
-    if api_key:
-        return api_key[:16]
+    if auth.kind == "byok":
+        return auth.api_key[:16]
     return request.client.host if request.client else "_unknown_"
+
+
+@lru_cache(maxsize=4096)
+def _fast_id(identity: str) -> int:
+    return int.from_bytes(hashlib.blake2b(identity.encode(), digest_size=8).digest(), "little")
+
+
+def get_client_key(request: Request) -> int:
+    """Compact int form of get_client_id, for in-memory per-client maps (e.g. semaphores).
+
+    Persisted data (preferences, notes) keeps using get_client_id so existing files stay addressable.
+    """
+    return _fast_id(get_client_id(request))
@@ -3,85 +3,224 @@
 from __future__ import annotations
 
 import asyncio
-import io
-import json
+import base64
+import hashlib
 import logging
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
+from urllib.parse import urlencode
 
-import httpx
-from fastapi import APIRouter, HTTPException, Request
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy import and_, bindparam, case, delete, func, literal_column, text, true, tuple_, update
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlmodel import Session, select
 
-from ..core.db import engine
+from ..core.config import LLMCredentials, get_config
+from ..core.db import engine, get_session
+from ..core.http import get_http_client
 from ..models.knowledge import (
+    CollectionPaper,
     Flashcard,
     KnowledgeEntity,
     KnowledgeRelationship,
     PaperCollection,
     PaperKnowledge,
+    PaperTag,
     ReadingEvent,
     ReadingProgress,
+    ResearchReport,
     UserAnnotation,
 )
 from ..models.task import Task, TaskStatus
-from ..services.knowledge_extractor import KnowledgeExtractor
+from ..services.audio_summary import AudioSummaryService
+from ..services.cache import get_cached, get_or_fetch, set_cached
+from ..services.deep_research import DeepResearchService
+from ..services.insights_generator import InsightsGenerator
+from ..services.knowledge_export import KnowledgeExporter
+from ..services.knowledge_extractor import KnowledgeExtractor, enqueue_extraction
+from ..services.literature_review import LiteratureReviewGenerator
+from ..services.paper_chat import PaperChatService
+from ..services.srs_engine import SRSEngine
 from .deps import get_llm_config, get_client_id
 
 logger = logging.getLogger(__name__)
 
+# 高频的按主键查询预先构造好（只取用到的列）：每次请求只绑定参数，直接命中编译缓存
+_PAPER_STATUS_BY_ID = select(
+    PaperKnowledge.id, PaperKnowledge.extraction_status, PaperKnowledge.extraction_error, PaperKnowledge.title,
+).where(PaperKnowledge.id == bindparam("paper_id"))
+_PAPER_JSON_BY_ID = select(
+    PaperKnowledge.id, PaperKnowledge.title, PaperKnowledge.extraction_status, PaperKnowledge.knowledge_json,
+).where(PaperKnowledge.id == bindparam("paper_id"))
+
+
+def _json_text(path: str):
+    """knowledge_json 中的双语字段：对象取 en（没有再取 zh），否则取原值"""
+    kj = PaperKnowledge.knowledge_json
+    return case(
+        (
+            func.json_type(kj, path) == "object",
+            func.coalesce(func.json_extract(kj, f"{path}.en"), func.json_extract(kj, f"{path}.zh")),
+        ),
+        else_=func.json_extract(kj, path),
+    )
+
+
+# 整库读取 knowledge_json 时按批从游标取行（yield_per），避免一次性物化所有大文本；
+# 损坏的 JSON 在 SQL 里滤掉，导出拼接原文时不会产出非法响应体
+_COMPLETED_KNOWLEDGE_JSON = (
+    select(PaperKnowledge.knowledge_json)
+    .where(PaperKnowledge.extraction_status == "completed", func.json_valid(PaperKnowledge.knowledge_json))
+    .execution_options(yield_per=200)
+)
+
+# 热点读端点的语句在导入时构造一次；请求里只追加游标条件、分页或绑定参数，
+# 不再每次重建整棵表达式树（json_extract/case 等列表达式尤其费时）
+_PAPERS_TOKEN = select(func.count(), func.max(PaperKnowledge.updated_at)).where(
+    PaperKnowledge.extraction_status == "completed",
+)
+
+_LIST_PAPERS_EXTRACTED = and_(
+    PaperKnowledge.extraction_status == "completed", func.json_valid(PaperKnowledge.knowledge_json),
+)
+_LIST_PAPERS = select(
+    PaperKnowledge.id, PaperKnowledge.task_id, PaperKnowledge.title,
+    PaperKnowledge.doi, PaperKnowledge.year, PaperKnowledge.venue,
+    PaperKnowledge.extraction_status, PaperKnowledge.created_at,
+    case((_LIST_PAPERS_EXTRACTED, func.substr(_json_text("$.metadata.abstract"), 1, 200)), else_=None).label("summary"),
+    case((_LIST_PAPERS_EXTRACTED, _json_text("$.tldr")), else_=None).label("tldr"),
+).order_by(PaperKnowledge.created_at.desc(), PaperKnowledge.id.desc())
+
+_ANNOTATIONS_BY_PAPER = (
+    select(UserAnnotation)
+    .where(UserAnnotation.paper_id == bindparam("paper_id"))
+    .order_by(UserAnnotation.created_at.desc(), UserAnnotation.id.desc())
+)
+
+_GRAPH_TOKEN = select(
+    select(func.count()).select_from(KnowledgeEntity).scalar_subquery(),
+    select(func.count()).select_from(KnowledgeRelationship).scalar_subquery(),
+    select(func.count()).select_from(PaperKnowledge).scalar_subquery(),
+    select(func.max(PaperKnowledge.updated_at)).scalar_subquery(),
+)
+
+# 图谱响应体整体由 SQLite 的 json_object / json_group_array 生成：一行一列取回，
+# Python 不再逐行建 dict 再序列化。子查询结果过 json() 才会按 JSON 而不是字符串嵌入
+_GRAPH_NODES = select(func.json_group_array(func.json_object(
+    "id", KnowledgeEntity.id, "name", KnowledgeEntity.name, "type", KnowledgeEntity.type,
+    "definition", KnowledgeEntity.definition, "importance", KnowledgeEntity.importance,
+    "paper_id", KnowledgeEntity.paper_id,
+))).scalar_subquery()
+_GRAPH_EDGES = select(func.json_group_array(func.json_object(
+    "id", KnowledgeRelationship.id, "source", KnowledgeRelationship.source_entity_id,
+    "target", KnowledgeRelationship.target_entity_id, "type", KnowledgeRelationship.type,
+    "description", KnowledgeRelationship.description, "confidence", KnowledgeRelationship.confidence,
+))).scalar_subquery()
+_GRAPH_JSON = select(func.json_object("nodes", func.json(_GRAPH_NODES), "edges", func.json(_GRAPH_EDGES)))
+
+_ENTITY_SEARCH = select(
+    KnowledgeEntity.id, KnowledgeEntity.name, KnowledgeEntity.type,
+    KnowledgeEntity.definition, KnowledgeEntity.paper_id,
+)
+
+
+# ----------------------------------------------------------------------
+# 列表分页游标
+# 列表端点保持返回数组；传 limit 时下一页游标放在 X-Next-Cursor 响应头里
+# ----------------------------------------------------------------------
+
+
+def _encode_cursor(*keys: str) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(keys)).decode()
+
+
+def _decode_cursor(cursor: str, size: int, timestamp: bool = False) -> list[Any]:
+    """解析游标；timestamp=True 时第一个键是 created_at（ISO 格式）"""
+    try:
+        keys = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if isinstance(keys, list) and len(keys) == size and all(isinstance(k, str) for k in keys):
+            if timestamp:
+                keys[0] = datetime.fromisoformat(keys[0])
+            return keys
+    except ValueError:
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 def create_knowledge_router() -> APIRouter:
     router = APIRouter(prefix="/api/knowledge", tags=["knowledge"])
 
+    # ------------------------------------------------------------------
+    # LLM 服务实例（按凭据缓存；请求都走 core.http 的共享客户端，实例本身不持有连接池）
+    # ------------------------------------------------------------------
+
+    @lru_cache(maxsize=32)
+    def _extractor(llm_config: LLMCredentials) -> KnowledgeExtractor:
+        return KnowledgeExtractor(api_key=llm_config.api_key, model=llm_config.model, base_url=llm_config.base_url)
+
+    @lru_cache(maxsize=32)
+    def _insights_generator(llm_config: LLMCredentials) -> InsightsGenerator:
+        return InsightsGenerator(api_key=llm_config.api_key, model=llm_config.model, base_url=llm_config.base_url)
+
+    @lru_cache(maxsize=32)
+    def _review_generator(llm_config: LLMCredentials) -> LiteratureReviewGenerator:
+        return LiteratureReviewGenerator(api_key=llm_config.api_key, model=llm_config.model, base_url=llm_config.base_url)
+
+    @lru_cache(maxsize=32)
+    def _chat_service(llm_config: LLMCredentials) -> PaperChatService:
+        return PaperChatService(api_key=llm_config.api_key, model=llm_config.model, base_url=llm_config.base_url)
+
+    @lru_cache(maxsize=32)
+    def _audio_service(llm_config: LLMCredentials) -> AudioSummaryService:
+        return AudioSummaryService(api_key=llm_config.api_key, model=llm_config.model, base_url=llm_config.base_url)
+
+    # 只查/删已生成音频文件的端点不需要凭据，共用一个实例
+    _audio_files = AudioSummaryService("", "", "")
+
     # ------------------------------------------------------------------
     # 知识提取
     # ------------------------------------------------------------------
 
     @router.post("/extract/{task_id}")
-    async def extract_knowledge(task_id: str, request: Request) -> dict[str, str]:
+    async def extract_knowledge(task_id: str, request: Request, session: Session = Depends(get_session)) -> dict[str, str]:
         llm_config = get_llm_config(request)
 
-        with Session(engine) as session:
-            task = session.get(Task, task_id)
-        if not task:
+        # 一条 LEFT JOIN 同时取任务状态和已有的论文知识记录
+        row = session.exec(
+            select(
+                Task.status, Task.original_pdf_path,
+                PaperKnowledge.id, PaperKnowledge.extraction_status,
+            )
+            .outerjoin(PaperKnowledge, PaperKnowledge.task_id == Task.task_id)
+            .where(Task.task_id == task_id)
+        ).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Task not found")
-        if task.status != TaskStatus.COMPLETED:
+        task_status, original_pdf_path, paper_id, extraction_status = row
+        if task_status != TaskStatus.COMPLETED:
             raise HTTPException(status_code=400, detail="Task not completed yet")
 
-        with Session(engine) as session:
-            existing = session.exec(
-                select(PaperKnowledge).where(PaperKnowledge.task_id == task_id)
-            ).first()
-        if existing and existing.extraction_status == "completed":
-            return {"paper_id": existing.id, "status": "already_completed"}
+        if paper_id and extraction_status == "completed":
+            return {"paper_id": paper_id, "status": "already_completed"}
 
-        if not task.original_pdf_path or not Path(task.original_pdf_path).exists():
+        if not original_pdf_path or not Path(original_pdf_path).exists():
             raise HTTPException(status_code=404, detail="Original PDF not found or expired")
 
-        pdf_bytes = Path(task.original_pdf_path).read_bytes()
-        paper_id = existing.id if existing else None
-
-        extractor = KnowledgeExtractor(
-            api_key=llm_config["api_key"],
-            model=llm_config.get("model", ""),
-            base_url=llm_config.get("base_url", ""),
-        )
-
-        async def _do_extract():
-            try:
-                async with extractor:
-                    await extractor.extract(pdf_bytes, task_id, user_id=0, paper_id=paper_id)
-            except Exception:
-                pass
-
-        asyncio.create_task(_do_extract())
+        # 入队后立即返回：PDF 由后台 worker 在开始提取时才读入，并发数受 worker 数量限制
+        enqueue_extraction(_extractor(llm_config), Path(original_pdf_path), task_id, paper_id)
         return {"paper_id": paper_id or "pending", "status": "extracting"}
 
     @router.get("/extract/status/{paper_id}")
-    async def extraction_status(paper_id: str) -> dict[str, Any]:
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
+    def extraction_status(paper_id: str, session: Session = Depends(get_session)) -> dict[str, Any]:
+        paper = session.exec(_PAPER_STATUS_BY_ID, params={"paper_id": paper_id}).first()
         if not paper:
             raise HTTPException(status_code=404, detail="Paper not found")
         return {
@@ -93,198 +232,220 @@ def create_knowledge_router() -> APIRouter:
 
     # ------------------------------------------------------------------
     # 论文知识 CRUD
+    # 纯数据库读写的端点用普通 def：FastAPI 放到线程池执行，同步查询不阻塞事件循环
     # ------------------------------------------------------------------
 
     @router.get("/papers")
-    async def list_papers() -> list[dict[str, Any]]:
-        with Session(engine) as session:
-            papers = session.exec(
-                select(PaperKnowledge).order_by(PaperKnowledge.created_at.desc())
-            ).all()
+    def list_papers(
+        response: Response,
+        offset: int = Query(0, ge=0),
+        limit: int | None = Query(None, ge=1, le=500),
+        cursor: str | None = None,
+        session: Session = Depends(get_session),
+    ) -> list[dict[str, Any]]:
+        # 摘要/TLDR 在 SQLite 里用 json_extract 取出，只有几百字节过线，knowledge_json 整块不读也不解析
+        stmt = _LIST_PAPERS
+        if cursor:
+            created_at, last_id = _decode_cursor(cursor, 2, timestamp=True)
+            stmt = stmt.where(tuple_(PaperKnowledge.created_at, PaperKnowledge.id) < (created_at, last_id))
+        papers = session.exec(stmt.offset(offset).limit(limit)).all()
+        if limit and len(papers) == limit:
+            last = papers[-1]
+            response.headers["X-Next-Cursor"] = _encode_cursor(last.created_at.isoformat(), last.id)
         result = []
         for p in papers:
-            summary = ""
-            tldr = ""
-            if p.knowledge_json and p.extraction_status == "completed":
-                try:
-                    kj = json.loads(p.knowledge_json)
-                    meta = kj.get("metadata", {})
-                    abstract = meta.get("abstract", "")
-                    if isinstance(abstract, dict):
-                        abstract = abstract.get("en", abstract.get("zh", ""))
-                    summary = str(abstract)[:200] if abstract else ""
-                    tldr_obj = kj.get("tldr", {})
-                    if isinstance(tldr_obj, dict):
-                        tldr = tldr_obj.get("en", tldr_obj.get("zh", ""))
-                        if tldr and "unable to generate" in tldr.lower():
-                            tldr = ""
-                    elif tldr_obj:
-                        tldr = str(tldr_obj)
-                except Exception:
-                    pass
+            tldr = str(p.tldr) if p.tldr else ""
+            if "unable to generate" in tldr.lower():
+                tldr = ""
             result.append({
                 "id": p.id, "task_id": p.task_id, "title": p.title,
                 "doi": p.doi, "year": p.year, "venue": p.venue,
                 "extraction_status": p.extraction_status,
-                "summary": summary,
+                "summary": str(p.summary) if p.summary else "",
                 "tldr": tldr,
                 "created_at": p.created_at.isoformat() if p.created_at else None,
             })
         return result
 
     @router.get("/papers/{paper_id}")
-    async def get_paper(paper_id: str) -> dict[str, Any]:
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
+    def get_paper(paper_id: str, session: Session = Depends(get_session)) -> Response:
+        paper = session.exec(_PAPER_JSON_BY_ID, params={"paper_id": paper_id}).first()
         if not paper:
             raise HTTPException(status_code=404, detail="Paper not found")
         if paper.knowledge_json:
-            return json.loads(paper.knowledge_json)
-        return {"id": paper.id, "title": paper.title, "extraction_status": paper.extraction_status}
+            # 库里存的就是合法 JSON，原样返回，不做 loads → dumps 往返
+            return Response(content=paper.knowledge_json, media_type="application/json")
+        return JSONResponse({"id": paper.id, "title": paper.title, "extraction_status": paper.extraction_status})
 
     @router.delete("/papers/{paper_id}")
-    async def delete_paper(paper_id: str) -> dict[str, str]:
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-            if not paper:
-                raise HTTPException(status_code=404, detail="Paper not found")
-            for model in (Flashcard, UserAnnotation, KnowledgeRelationship, KnowledgeEntity):
-                items = session.exec(select(model).where(model.paper_id == paper_id)).all()
-                for item in items:
-                    session.delete(item)
-            session.delete(paper)
-            session.commit()
+    def delete_paper(paper_id: str, session: Session = Depends(get_session)) -> dict[str, str]:
+        # 子表先删（外键），每张表一条批量 DELETE；PaperTag 与收藏夹成员没有外键约束，同样显式清理
+        for model in (Flashcard, UserAnnotation, KnowledgeRelationship, KnowledgeEntity, PaperTag, CollectionPaper):
+            session.exec(delete(model).where(model.paper_id == paper_id))
+        result = session.exec(delete(PaperKnowledge).where(PaperKnowledge.id == paper_id))
+        if not result.rowcount:
+            session.rollback()
+            raise HTTPException(status_code=404, detail="Paper not found")
+        session.commit()
+        _papers_cache.clear()
         return {"status": "deleted"}
 
     # ------------------------------------------------------------------
     # 知识图谱
     # ------------------------------------------------------------------
 
+    # (版本标记, 序列化后的响应体)；整体替换元组，线程池里并发读写不会读到半新半旧的值
+    _graph_cache: dict[str, tuple] = {}
+    _export_cache: dict[str, tuple] = {}
+
     @router.get("/graph")
-    async def get_graph() -> dict[str, Any]:
-        with Session(engine) as session:
-            entities = session.exec(select(KnowledgeEntity)).all()
-            relationships = session.exec(select(KnowledgeRelationship)).all()
-        nodes = [
-            {"id": e.id, "name": e.name, "type": e.type, "definition": e.definition, "importance": e.importance, "paper_id": e.paper_id}
-            for e in entities
-        ]
-        edges = [
-            {"id": r.id, "source": r.source_entity_id, "target": r.target_entity_id, "type": r.type, "description": r.description, "confidence": r.confidence}
-            for r in relationships
-        ]
-        return {"nodes": nodes, "edges": edges}
+    def get_graph(session: Session = Depends(get_session)) -> Response:
+        # 版本标记：实体数、关系数、论文数与最新 updated_at（提取完成时最后写入）；命中时直接返回序列化结果
+        token = tuple(session.exec(_GRAPH_TOKEN).one())
+        entry = _graph_cache.get("entry")
+        if entry is not None and entry[0] == token:
+            return Response(content=entry[1], media_type="application/json")
+        body = session.exec(_GRAPH_JSON).one().encode()
+        _graph_cache["entry"] = (token, body)
+        return Response(content=body, media_type="application/json")
 
     @router.get("/graph/search")
-    async def search_entities(q: str) -> list[dict[str, Any]]:
-        with Session(engine) as session:
-            entities = session.exec(
-                select(KnowledgeEntity).where(KnowledgeEntity.name.contains(q))
-            ).all()
-        return [{"id": e.id, "name": e.name, "type": e.type, "definition": e.definition, "paper_id": e.paper_id} for e in entities]
+    def search_entities(
+        q: str,
+        limit: int = Query(50, ge=1, le=500),
+        session: Session = Depends(get_session),
+    ) -> list[dict[str, Any]]:
+        stmt = _ENTITY_SEARCH.limit(limit)
+        entities = None
+        # trigram 索引只能匹配 >= 3 个字符的子串，更短的查询仍走 LIKE
+        if len(q) >= 3 and session.get_bind().dialect.name == "sqlite":
+            phrase = '"' + q.replace('"', '""') + '"'
+            fts_ids = text("SELECT entity_id FROM entity_fts WHERE entity_fts MATCH :q").bindparams(q=phrase)
+            try:
+                entities = session.exec(stmt.where(KnowledgeEntity.id.in_(fts_ids))).all()
+            except OperationalError:
+                pass  # 索引未建立（FTS5 不可用）
+        if entities is None:
+            entities = session.exec(stmt.where(KnowledgeEntity.name.contains(q))).all()
+        return [{"id": e[0], "name": e[1], "type": e[2], "definition": e[3], "paper_id": e[4]} for e in entities]
 
     # ------------------------------------------------------------------
     # 闪卡
     # ------------------------------------------------------------------
 
     @router.get("/flashcards")
-    async def list_flashcards() -> list[dict[str, Any]]:
-        with Session(engine) as session:
-            cards = session.exec(select(Flashcard)).all()
+    def list_flashcards(
+        response: Response,
+        limit: int | None = Query(None, ge=1, le=500),
+        cursor: str | None = None,
+        session: Session = Depends(get_session),
+    ) -> list[dict[str, Any]]:
+        stmt = select(*_FLASHCARD_COLUMNS).order_by(Flashcard.id)
+        if cursor:
+            (last_id,) = _decode_cursor(cursor, 1)
+            stmt = stmt.where(Flashcard.id > last_id)
+        cards = session.exec(stmt.limit(limit)).all()
+        if limit and len(cards) == limit:
+            response.headers["X-Next-Cursor"] = _encode_cursor(cards[-1].id)
         return [_flashcard_to_dict(c) for c in cards]
 
     @router.get("/flashcards/due")
-    async def get_due_flashcards(limit: int = 20) -> list[dict[str, Any]]:
-        from datetime import datetime
-        with Session(engine) as session:
-            cards = session.exec(
-                select(Flashcard)
-                .where(Flashcard.next_review <= datetime.utcnow())
-                .order_by(Flashcard.next_review)
-                .limit(limit)
-            ).all()
+    def get_due_flashcards(limit: int = 20, session: Session = Depends(get_session)) -> list[dict[str, Any]]:
+        cards = session.exec(_DUE_FLASHCARDS, params={"now": datetime.utcnow(), "limit": limit}).all()
         return [_flashcard_to_dict(c) for c in cards]
 
     @router.post("/flashcards/{card_id}/review")
-    async def review_flashcard(card_id: str, quality: int) -> dict[str, Any]:
+    def review_flashcard(card_id: str, quality: int, session: Session = Depends(get_session)) -> dict[str, Any]:
         if not 0 <= quality <= 5:
             raise HTTPException(status_code=400, detail="quality must be 0-5")
-        from ..services.srs_engine import SRSEngine
-        with Session(engine) as session:
-            card = session.get(Flashcard, card_id)
-            if not card:
-                raise HTTPException(status_code=404, detail="Flashcard not found")
-            SRSEngine.review(card, quality)
-            session.add(card)
-            session.commit()
-            session.refresh(card)
+        # 只读 SRS 三列算新状态，再用一条 UPDATE ... RETURNING 写回并取回整行
+        state = session.exec(
+            select(Flashcard.interval_days, Flashcard.ease_factor, Flashcard.repetitions)
+            .where(Flashcard.id == card_id)
+        ).first()
+        if not state:
+            raise HTTPException(status_code=404, detail="Flashcard not found")
+        card = session.exec(
+            update(Flashcard)
+            .where(Flashcard.id == card_id)
+            .values(**SRSEngine.schedule(*state, quality))
+            .returning(*_FLASHCARD_COLUMNS)
+        ).one()
+        session.commit()
         return _flashcard_to_dict(card)
 
     @router.post("/flashcards")
-    async def create_flashcard(paper_id: str, front: str, back: str, tags: str = "", difficulty: int = 3) -> dict[str, Any]:
-        import uuid
-        from datetime import datetime
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-            if not paper:
-                raise HTTPException(status_code=404, detail="Paper not found")
-            card = Flashcard(
-                id=f"fc_{uuid.uuid4().hex[:12]}",
-                paper_id=paper_id,
-                user_id=0,
-                front=front,
-                back=back,
-                tags_json=json.dumps(tags.split(",") if tags else []),
-                difficulty=difficulty,
-                next_review=datetime.utcnow(),
-            )
-            session.add(card)
-            session.commit()
-            session.refresh(card)
+    def create_flashcard(paper_id: str, front: str, back: str, tags: str = "", difficulty: int = 3, session: Session = Depends(get_session)) -> dict[str, Any]:
+        if not _paper_exists(session, paper_id):
+            raise HTTPException(status_code=404, detail="Paper not found")
+        card = Flashcard(
+            id=f"fc_{secrets.token_hex(6)}",
+            paper_id=paper_id,
+            user_id=0,
+            front=front,
+            back=back,
+            tags_json=tags.split(",") if tags else [],
+            difficulty=difficulty,
+            next_review=datetime.utcnow(),
+        )
+        session.add(card)
+        session.commit()
         return _flashcard_to_dict(card)
 
     @router.delete("/flashcards/{card_id}")
-    async def delete_flashcard(card_id: str) -> dict[str, str]:
-        with Session(engine) as session:
-            card = session.get(Flashcard, card_id)
-            if not card:
-                raise HTTPException(status_code=404, detail="Flashcard not found")
-            session.delete(card)
-            session.commit()
+    def delete_flashcard(card_id: str, session: Session = Depends(get_session)) -> dict[str, str]:
+        # 单条 DELETE，靠 rowcount 判断是否存在，省掉先 SELECT
+        if not session.exec(delete(Flashcard).where(Flashcard.id == card_id)).rowcount:
+            raise HTTPException(status_code=404, detail="Flashcard not found")
+        session.commit()
         return {"status": "deleted"}
 
     # ------------------------------------------------------------------
     # 研究洞察（跨论文分析）
     # ------------------------------------------------------------------
 
-    # In-memory cache for insights (regenerate on demand)
-    _insights_cache: dict[str, Any] = {}
+    # 洞察结果存在共享 KV 缓存里，多 worker 共用；键取已完成论文 id 集合的哈希，增删论文后自动失效。
+    # inflight: 本进程内正在进行的生成任务，并发请求共享同一次 LLM 调用
+    _insights_inflight: dict[str, asyncio.Task] = {}
+    _INSIGHTS_TTL = 6 * 3600
+
+    def _insights_key() -> str:
+        with Session(engine) as session:
+            paper_ids = session.exec(
+                select(PaperKnowledge.id)
+                .where(PaperKnowledge.extraction_status == "completed")
+                .order_by(PaperKnowledge.id)
+            ).all()
+        return "insights:" + hashlib.sha256(",".join(paper_ids).encode()).hexdigest()
+
+    async def _generate_insights(llm_config: LLMCredentials, papers_json: list[dict], key: str) -> dict[str, Any]:
+        result = await _insights_generator(llm_config).generate(papers_json)
+        await asyncio.to_thread(set_cached, key, result, _INSIGHTS_TTL)
+        return result
 
     @router.post("/insights/generate")
     async def generate_insights(request: Request) -> dict[str, Any]:
-        from ..services.insights_generator import InsightsGenerator
         llm_config = get_llm_config(request)
-        papers_json = _get_completed_papers_json()
+        papers_json = await _get_completed_papers_json()
         if len(papers_json) < 2:
             raise HTTPException(400, "Need at least 2 papers to generate insights")
 
-        generator = InsightsGenerator(
-            api_key=llm_config["api_key"],
-            model=llm_config.get("model", ""),
-            base_url=llm_config.get("base_url", ""),
-        )
-        try:
-            result = await generator.generate(papers_json)
-            _insights_cache["latest"] = result
-            return result
-        finally:
-            await generator.close()
+        # _insights_key 是同步查询，放进线程避免阻塞事件循环
+        key = await asyncio.to_thread(_insights_key)
+        task = _insights_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(_generate_insights(llm_config, papers_json, key))
+            _insights_inflight[key] = task
+            task.add_done_callback(lambda _: _insights_inflight.pop(key, None))
+        # shield: 某个请求断开不会取消其他请求正在等待的生成
+        return await asyncio.shield(task)
 
     @router.get("/insights")
-    async def get_insights() -> dict[str, Any]:
-        if "latest" not in _insights_cache:
+    def get_insights() -> dict[str, Any]:
+        cached = get_cached(_insights_key())
+        if cached is None:
             return {"paper_count": 0, "message": "No insights generated yet. Click 'Generate Insights' to analyze your papers."}
-        return _insights_cache["latest"]
+        return cached
 
     # ------------------------------------------------------------------
     # 语义搜索（向量）
@@ -309,7 +470,7 @@ def create_knowledge_router() -> APIRouter:
         return {"query": q, "results": hits, "total": len(hits)}
 
     @router.get("/vector/stats")
-    async def vector_stats() -> dict[str, Any]:
+    def vector_stats() -> dict[str, Any]:
         from ..services.vector_search import get_vector_service
         vs = get_vector_service()
         if not vs:
@@ -322,21 +483,15 @@ def create_knowledge_router() -> APIRouter:
 
     @router.post("/review/generate")
     async def generate_review(request: Request) -> dict[str, Any]:
-        from ..services.literature_review import LiteratureReviewGenerator
         llm_config = get_llm_config(request)
         body = await request.json() if request.headers.get("content-type", "").startswith("application/json") else {}
         topic = body.get("topic", "")
 
-        papers_json = _get_completed_papers_json()
+        papers_json = await _get_completed_papers_json()
         if not papers_json:
             raise HTTPException(400, "No papers in knowledge base")
 
-        gen = LiteratureReviewGenerator(
-            api_key=llm_config["api_key"],
-            model=llm_config.get("model", ""),
-            base_url=llm_config.get("base_url", ""),
-        )
-        review = await gen.generate(papers_json, topic)
+        review = await _review_generator(llm_config).generate(papers_json, topic)
         return {"review": review, "paper_count": len(papers_json), "topic": topic}
 
     # ------------------------------------------------------------------
@@ -344,23 +499,25 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/papers/{paper_id}/annotations")
-    async def list_annotations(paper_id: str) -> list[dict[str, Any]]:
-        with Session(engine) as session:
-            anns = session.exec(
-                select(UserAnnotation)
-                .where(UserAnnotation.paper_id == paper_id)
-                .order_by(UserAnnotation.created_at.desc())
-            ).all()
+    def list_annotations(
+        paper_id: str,
+        response: Response,
+        limit: int | None = Query(None, ge=1, le=500),
+        cursor: str | None = None,
+        session: Session = Depends(get_session),
+    ) -> list[dict[str, Any]]:
+        stmt = _ANNOTATIONS_BY_PAPER
+        if cursor:
+            created_at, last_id = _decode_cursor(cursor, 2, timestamp=True)
+            stmt = stmt.where(tuple_(UserAnnotation.created_at, UserAnnotation.id) < (created_at, last_id))
+        anns = session.exec(stmt.limit(limit), params={"paper_id": paper_id}).all()
+        if limit and len(anns) == limit:
+            response.headers["X-Next-Cursor"] = _encode_cursor(anns[-1].created_at.isoformat(), anns[-1].id)
         result = []
         for a in anns:
-            meta = {}
-            if a.tags_json:
-                try:
-                    meta = json.loads(a.tags_json)
-                    if isinstance(meta, list):
-                        meta = {"tags": meta}
-                except Exception:
-                    meta = {}
+            meta = a.tags_json or {}
+            if isinstance(meta, list):
+                meta = {"tags": meta}
             result.append({
                 "id": a.id, "type": a.type, "content": a.content,
                 "target_type": a.target_type, "target_id": a.target_id,
@@ -371,9 +528,7 @@ def create_knowledge_router() -> APIRouter:
         return result
 
     @router.post("/papers/{paper_id}/annotations")
-    async def create_annotation(paper_id: str, request: Request) -> dict[str, Any]:
-        import uuid
-        from datetime import datetime
+    async def create_annotation(paper_id: str, request: Request, session: Session = Depends(get_session)) -> dict[str, Any]:
         body = await request.json()
         ann_type = body.get("type", "note")
         content = body.get("content", "")
@@ -383,37 +538,32 @@ def create_knowledge_router() -> APIRouter:
         color = body.get("color", "")
         if not content:
             raise HTTPException(400, "content is required")
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-            if not paper:
-                raise HTTPException(status_code=404, detail="Paper not found")
-            ann = UserAnnotation(
-                id=f"ann_{uuid.uuid4().hex[:12]}",
-                paper_id=paper_id,
-                user_id=0,
-                type=ann_type,
-                content=content,
-                target_type=target_type,
-                target_id=target_id,
-                tags_json=json.dumps({"tags": tags if isinstance(tags, list) else [], "color": color}),
-                created_at=datetime.utcnow(),
-            )
-            session.add(ann)
-            session.commit()
-            session.refresh(ann)
-        meta = json.loads(ann.tags_json) if ann.tags_json else {}
+        if not _paper_exists(session, paper_id):
+            raise HTTPException(status_code=404, detail="Paper not found")
+        ann = UserAnnotation(
+            id=f"ann_{secrets.token_hex(6)}",
+            paper_id=paper_id,
+            user_id=0,
+            type=ann_type,
+            content=content,
+            target_type=target_type,
+            target_id=target_id,
+            tags_json={"tags": tags if isinstance(tags, list) else [], "color": color},
+            created_at=datetime.utcnow(),
+        )
+        session.add(ann)
+        session.commit()
+        meta = ann.tags_json or {}
         return {"id": ann.id, "type": ann.type, "content": ann.content, "target_type": ann.target_type,
                 "target_id": ann.target_id, "color": meta.get("color", ""), "tags": meta.get("tags", []),
                 "created_at": ann.created_at.isoformat() if ann.created_at else None}
 
     @router.delete("/annotations/{ann_id}")
-    async def delete_annotation(ann_id: str) -> dict[str, str]:
-        with Session(engine) as session:
-            ann = session.get(UserAnnotation, ann_id)
-            if not ann:
-                raise HTTPException(status_code=404, detail="Annotation not found")
-            session.delete(ann)
-            session.commit()
+    def delete_annotation(ann_id: str, session: Session = Depends(get_session)) -> dict[str, str]:
+        # 单条 DELETE，靠 rowcount 判断是否存在，省掉先 SELECT
+        if not session.exec(delete(UserAnnotation).where(UserAnnotation.id == ann_id)).rowcount:
+            raise HTTPException(status_code=404, detail="Annotation not found")
+        session.commit()
         return {"status": "deleted"}
 
     # ------------------------------------------------------------------
@@ -422,7 +572,6 @@ def create_knowledge_router() -> APIRouter:
 
     @router.post("/papers/{paper_id}/chat")
     async def chat_with_paper(paper_id: str, request: Request) -> dict[str, Any]:
-        from ..services.paper_chat import PaperChatService
         llm_config = get_llm_config(request)
         body = await request.json()
         message = body.get("message", "")
@@ -430,23 +579,17 @@ def create_knowledge_router() -> APIRouter:
         if not message:
             raise HTTPException(400, "message is required")
 
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper or not paper.knowledge_json:
+        kj = _load_knowledge(paper_id)
+        if kj is None:
             raise HTTPException(404, "Paper not found or knowledge not extracted")
 
-        svc = PaperChatService(
-            api_key=llm_config["api_key"],
-            model=llm_config.get("model", ""),
-            base_url=llm_config.get("base_url", ""),
-        )
-        reply = await svc.chat(paper.knowledge_json, message, history)
+        svc = _chat_service(llm_config)
+        reply = await svc.chat(kj, message, history)
         return {"reply": reply}
 
     @router.post("/chat")
     async def chat_cross_papers(request: Request) -> dict[str, Any]:
         """跨论文对话 — RAG 增强，用向量检索最相关内容"""
-        from ..services.paper_chat import PaperChatService
         from ..services.vector_search import get_vector_service
         llm_config = get_llm_config(request)
         body = await request.json()
@@ -461,18 +604,21 @@ def create_knowledge_router() -> APIRouter:
         if vs:
             rag_context = await vs.get_context_for_chat(message, n_results=15)
 
-        svc = PaperChatService(
-            api_key=llm_config["api_key"],
-            model=llm_config.get("model", ""),
-            base_url=llm_config.get("base_url", ""),
-        )
+        svc = _chat_service(llm_config)
 
         if rag_context:
             # RAG mode: use retrieved context
             reply = await svc.chat_with_context(rag_context, message, history)
         else:
-            # Fallback: use all papers
-            papers_json = _get_completed_papers_json()
+            # Fallback: chat_multi 只用前 10 篇，只取最近的 10 篇（走解析缓存）
+            with Session(engine) as session:
+                recent_ids = session.exec(
+                    select(PaperKnowledge.id)
+                    .where(PaperKnowledge.extraction_status == "completed")
+                    .order_by(PaperKnowledge.created_at.desc())
+                    .limit(10)
+                ).all()
+                papers_json = _load_papers_json(session, list(recent_ids))
             if not papers_json:
                 raise HTTPException(400, "No papers in knowledge base")
             reply = await svc.chat_multi(papers_json, message, history)
@@ -482,28 +628,19 @@ def create_knowledge_router() -> APIRouter:
     @router.post("/compare")
     async def compare_papers(request: Request) -> dict[str, Any]:
         """对比 2-3 篇论文"""
-        from ..services.paper_chat import PaperChatService
         llm_config = get_llm_config(request)
         body = await request.json()
         paper_ids = body.get("paper_ids", [])
         if len(paper_ids) < 2:
             raise HTTPException(400, "Need at least 2 paper IDs")
 
-        papers_json = []
         with Session(engine) as session:
-            for pid in paper_ids[:5]:
-                p = session.get(PaperKnowledge, pid)
-                if p and p.knowledge_json:
-                    papers_json.append(json.loads(p.knowledge_json))
+            papers_json = _load_papers_json(session, paper_ids[:5])
 
         if len(papers_json) < 2:
             raise HTTPException(400, "Need at least 2 papers with extracted knowledge")
 
-        svc = PaperChatService(
-            api_key=llm_config["api_key"],
-            model=llm_config.get("model", ""),
-            base_url=llm_config.get("base_url", ""),
-        )
+        svc = _chat_service(llm_config)
         prompt = (
             "Compare these papers in detail. Create a structured comparison with:\n"
             "1. **Overview** — What each paper is about (1 sentence each)\n"
@@ -531,60 +668,54 @@ def create_knowledge_router() -> APIRouter:
         if not paper_ids:
             raise HTTPException(400, "paper_ids is required")
 
-        papers_json = []
         with Session(engine) as session:
-            for pid in paper_ids[:20]:
-                p = session.get(PaperKnowledge, pid)
-                if p and p.knowledge_json:
-                    papers_json.append(json.loads(p.knowledge_json))
+            papers_json = _load_papers_json(session, paper_ids[:20])
 
         if not papers_json:
             raise HTTPException(400, "No papers with extracted knowledge")
 
-        context = _build_writing_context(papers_json)
         cols_str = ", ".join(columns)
-        cols_json = ", ".join(f'"{c}"' for c in columns)
-        prompt = (
-            f"Extract structured data from these papers into a table.\n\n"
-            f"Columns: {cols_str}\n\n"
-            f"Return a JSON object with:\n"
-            f"- \"columns\": [{cols_json}]\n"
-            f"- \"rows\": array of objects, one per paper, each with \"paper\" (title+year) and a value for each column\n\n"
-            f"If a value is not available, use \"-\".\n"
-            f"Be concise — each cell should be 1-2 sentences max.\n\n"
-            f"Papers:\n{context}\n\n"
-            f"Respond ONLY with valid JSON."
-        )
-
-        import httpx as hx
-        async with hx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(
-                f"{llm_config['base_url']}/chat/completions",
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"},
-                json={
-                    "model": llm_config.get("model", "gpt-4o"),
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.2,
-                    "max_tokens": 4096,
-                },
+        client = get_http_client()
+        # 每篇论文单独请求一行、有界并发：总耗时约等于最慢的一篇，某篇失败或解析出错只丢这一行
+        sem = asyncio.Semaphore(8)
+
+        async def _extract_row(paper: dict) -> dict:
+            prompt = (
+                f"Extract structured data from this paper into one table row.\n\n"
+                f"Columns: {cols_str}\n\n"
+                f"Return a JSON object with \"paper\" (title+year) and a value for each column.\n\n"
+                f"If a value is not available, use \"-\".\n"
+                f"Be concise — each cell should be 1-2 sentences max.\n\n"
+                f"Paper:\n{_build_writing_context([paper])}\n\n"
+                f"Respond ONLY with valid JSON."
             )
+            async with sem:
+                resp = await client.post(
+                    f"{llm_config.base_url}/chat/completions",
+                    headers={"Authorization": f"Bearer {llm_config.api_key}"},
+                    json={
+                        "model": llm_config.model,
+                        "messages": [{"role": "user", "content": prompt}],
+                        "temperature": 0.2,
+                        "max_tokens": 1024,
+                    },
+                    timeout=120.0,
+                )
             resp.raise_for_status()
             content = resp.json()["choices"][0]["message"]["content"].strip()
-
-        # Parse JSON from response
-        try:
-            if content.startswith("```"):
-                lines = content.split("\n")
-                content = "\n".join(lines[1:-1] if lines[-1].strip() == "```" else lines[1:])
-            start = content.find("{")
-            end = content.rfind("}")
-            if start != -1 and end != -1:
-                table_data = json.loads(content[start:end+1])
-            else:
-                table_data = json.loads(content)
-        except json.JSONDecodeError:
-            table_data = {"columns": columns, "rows": [], "error": "Failed to parse table"}
-
+            start, end = content.find("{"), content.rfind("}")
+            row = orjson.loads(content[start:end+1] if start != -1 and end != -1 else content)
+            if not isinstance(row, dict):
+                raise ValueError("table row is not a JSON object")
+            return row
+
+        results = await asyncio.gather(*(_extract_row(p) for p in papers_json), return_exceptions=True)
+        rows = [r for r in results if isinstance(r, dict)]
+        if len(rows) < len(results):
+            logger.warning("extract-table: %d of %d rows failed", len(results) - len(rows), len(results))
+        table_data: dict[str, Any] = {"columns": columns, "rows": rows}
+        if not rows:
+            table_data["error"] = "Failed to parse table"
         return table_data
 
     # ------------------------------------------------------------------
@@ -592,87 +723,77 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/export/json")
-    async def export_full_json() -> dict[str, Any]:
-        from datetime import datetime
-        papers_json = _get_completed_papers_json()
-        global_entities: dict[str, dict] = {}
-        for pj in papers_json:
-            for ent in pj.get("entities", []):
-                key = ent.get("name", "").lower().strip()
-                if key and key not in global_entities:
-                    global_entities[key] = ent
-        return {
-            "schema_version": "1.0.0",
-            "exported_at": datetime.utcnow().isoformat(),
-            "papers": papers_json,
-            "global_entities": list(global_entities.values()),
-            "global_relationships": [],
-        }
+    def export_full_json(session: Session = Depends(get_session)) -> Response:
+        # 缓存序列化好的 papers/global_entities 部分；只有 exported_at 每次重新生成
+        token = _completed_papers_token(session)
+        entry = _export_cache.get("entry")
+        if entry is None or entry[0] != token:
+            # 按 lower(trim(name)) 去重交给数据库的窗口函数，每组保留最早写入的实体
+            key = func.lower(func.trim(KnowledgeEntity.name))
+            ranked = (
+                select(
+                    KnowledgeEntity.id, KnowledgeEntity.paper_id, KnowledgeEntity.name, KnowledgeEntity.type,
+                    KnowledgeEntity.aliases_json, KnowledgeEntity.definition, KnowledgeEntity.importance,
+                    func.row_number().over(partition_by=key, order_by=literal_column("knowledgeentity.rowid")).label("rn"),
+                )
+                .join(PaperKnowledge, PaperKnowledge.id == KnowledgeEntity.paper_id)
+                .where(PaperKnowledge.extraction_status == "completed", key != "")
+                .subquery()
+            )
+            global_entities = [
+                {
+                    "id": r.id, "paper_id": r.paper_id, "name": r.name, "type": r.type,
+                    "aliases": r.aliases_json or [],
+                    "definition": r.definition, "importance": r.importance,
+                }
+                for r in session.exec(select(*ranked.c).where(ranked.c.rn == 1).order_by(ranked.c.name)).all()
+            ]
+            # papers 直接拼接库里存的 JSON 文本，不再把解析后的 dict 重新序列化一遍
+            papers_part = b",".join(kj.encode() for kj in session.exec(_COMPLETED_KNOWLEDGE_JSON) if kj)
+            tail = orjson.dumps({"global_entities": global_entities, "global_relationships": []})
+            body = b'{"papers":[' + papers_part + b"]," + tail[1:]
+            entry = (token, body)
+            _export_cache["entry"] = entry
+        head = orjson.dumps({"schema_version": "1.0.0", "exported_at": datetime.utcnow().isoformat()})
+        return Response(content=head[:-1] + b"," + entry[1][1:], media_type="application/json")
 
     @router.get("/export/paper/{paper_id}")
-    async def export_paper_json(paper_id: str) -> dict[str, Any]:
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
+    def export_paper_json(paper_id: str, session: Session = Depends(get_session)) -> Response:
+        paper = session.exec(_PAPER_JSON_BY_ID, params={"paper_id": paper_id}).first()
         if not paper:
             raise HTTPException(status_code=404, detail="Paper not found")
         if not paper.knowledge_json:
             raise HTTPException(status_code=400, detail="Knowledge not extracted yet")
-        return json.loads(paper.knowledge_json)
+        return Response(content=paper.knowledge_json, media_type="application/json")
 
     @router.get("/export/bibtex")
-    async def export_bibtex():
-        from fastapi.responses import PlainTextResponse
-        papers_json = _get_completed_papers_json()
-        bib_entries = []
-        for pj in papers_json:
-            metadata = pj.get("metadata", {})
-            bibtex = metadata.get("bibtex")
-            if bibtex:
-                bib_entries.append(bibtex)
-            else:
-                authors = metadata.get("authors", [])
-                author_str = " and ".join(a.get("name", "") for a in authors)
-                cite_key = pj.get("id", "unknown").replace("pk_", "")
-                entry = f"@article{{{cite_key},\n  title = {{{metadata.get('title', '')}}},\n  author = {{{author_str}}},\n  year = {{{metadata.get('year', '')}}},\n"
-                if metadata.get("doi"):
-                    entry += f"  doi = {{{metadata['doi']}}},\n"
-                if metadata.get("venue"):
-                    entry += f"  journal = {{{metadata['venue']}}},\n"
-                entry += "}\n"
-                bib_entries.append(entry)
-        return PlainTextResponse(content="\n".join(bib_entries), media_type="text/plain",
+    def export_bibtex(session: Session = Depends(get_session)):
+        entries = _cached_renders(session, PaperKnowledge.bibtex_cached, KnowledgeExporter.render_bibtex)
+        return PlainTextResponse(content="\n".join(entries), media_type="text/plain",
                                  headers={"Content-Disposition": "attachment; filename=paperradar_references.bib"})
 
     @router.get("/export/obsidian")
-    async def export_obsidian():
-        from fastapi.responses import Response
-        from ..services.knowledge_export import KnowledgeExporter
-        papers_json = _get_completed_papers_json()
-        zip_bytes = KnowledgeExporter.export_obsidian_vault(papers_json)
-        return Response(content=zip_bytes, media_type="application/zip",
-                        headers={"Content-Disposition": "attachment; filename=paperradar_vault.zip"})
+    async def export_obsidian(session: Session = Depends(get_session)):
+        papers_json = await _get_completed_papers_json(session)
+        # 与 CSV 导出相同：逐篇压缩、边写边发，同步生成器由 StreamingResponse 在线程池中迭代
+        return StreamingResponse(KnowledgeExporter.stream_obsidian_vault(papers_json), media_type="application/zip",
+                                 headers={"Content-Disposition": "attachment; filename=paperradar_vault.zip"})
 
     @router.get("/export/csv")
-    async def export_csv():
-        import zipfile as zf_mod
-        from fastapi.responses import Response
-        from ..services.knowledge_export import KnowledgeExporter
-        papers_json = _get_completed_papers_json()
-        ent_csv, rel_csv = KnowledgeExporter.export_csv(papers_json)
-        buf = io.BytesIO()
-        with zf_mod.ZipFile(buf, "w", zf_mod.ZIP_DEFLATED) as zf:
-            zf.writestr("entities.csv", ent_csv)
-            zf.writestr("relationships.csv", rel_csv)
-        return Response(content=buf.getvalue(), media_type="application/zip",
-                        headers={"Content-Disposition": "attachment; filename=paperradar_csv.zip"})
+    async def export_csv(session: Session = Depends(get_session)):
+        papers_json = await _get_completed_papers_json(session)
+        # 同步生成器由 StreamingResponse 在线程池中迭代
+        return StreamingResponse(KnowledgeExporter.stream_csv_zip(papers_json), media_type="application/zip",
+                                 headers={"Content-Disposition": "attachment; filename=paperradar_csv.zip"})
 
     @router.get("/export/csl-json")
-    async def export_csl_json():
-        from fastapi.responses import Response
-        from ..services.knowledge_export import KnowledgeExporter
-        papers_json = _get_completed_papers_json()
-        csl_bytes = KnowledgeExporter.export_csl_json(papers_json)
-        return Response(content=csl_bytes, media_type="application/json",
+    def export_csl_json(session: Session = Depends(get_session)):
+        items = _cached_renders(
+            session, PaperKnowledge.csl_cached,
+            lambda pj: orjson.dumps(KnowledgeExporter.render_csl_item(pj)).decode(),
+        )
+        # 条目已是序列化好的 JSON，直接拼接成数组
+        return Response(content="[" + ",".join(items) + "]", media_type="application/json",
                         headers={"Content-Disposition": "attachment; filename=paperradar_references.json"})
 
     # ------------------------------------------------------------------
@@ -681,18 +802,13 @@ def create_knowledge_router() -> APIRouter:
 
     @router.post("/papers/{paper_id}/audio")
     async def generate_audio_summary(paper_id: str, request: Request) -> dict[str, Any]:
-        from ..services.audio_summary import AudioSummaryService
         llm_config = get_llm_config(request)
         with Session(engine) as session:
             paper = session.get(PaperKnowledge, paper_id)
         if not paper or not paper.knowledge_json:
             raise HTTPException(404, "Paper not found or knowledge not extracted")
 
-        svc = AudioSummaryService(
-            api_key=llm_config["api_key"],
-            model=llm_config.get("model", ""),
-            base_url=llm_config.get("base_url", ""),
-        )
+        svc = _audio_service(llm_config)
 
         # Check cache first
         cached = svc.get_cached(paper_id)
@@ -710,40 +826,56 @@ def create_knowledge_router() -> APIRouter:
         return {"status": "generating"}
 
     @router.get("/papers/{paper_id}/audio/status")
-    async def audio_status(paper_id: str) -> dict[str, Any]:
-        from ..services.audio_summary import AudioSummaryService
-        svc = AudioSummaryService("", "", "")
-        cached = svc.get_cached(paper_id)
+    def audio_status(paper_id: str) -> dict[str, Any]:
+        cached = _audio_files.get_cached(paper_id)
         if cached:
             return {"status": "ready", "url": f"/api/knowledge/papers/{paper_id}/audio/file"}
         return {"status": "not_found"}
 
     @router.get("/papers/{paper_id}/audio/file")
-    async def get_audio_file(paper_id: str):
-        from fastapi.responses import FileResponse as FR
-        from ..services.audio_summary import AudioSummaryService
-        svc = AudioSummaryService("", "", "")
-        cached = svc.get_cached(paper_id)
-        if not cached:
+    def get_audio_file(paper_id: str):
+        cached = _audio_files.get_cached(paper_id)
+        try:
+            # 线程池里先取好 stat，FileResponse 不再重复 stat；Range 请求（播放器拖动进度）由 Starlette 返回 206
+            stat_result = cached.stat() if cached else None
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None:
             raise HTTPException(404, "Audio not generated yet")
-        return FR(str(cached), media_type="audio/mpeg", filename=f"{paper_id}.mp3")
+        return FileResponse(cached, media_type="audio/mpeg", filename=f"{paper_id}.mp3", stat_result=stat_result)
 
     @router.delete("/papers/{paper_id}/audio")
-    async def delete_audio(paper_id: str) -> dict[str, str]:
-        from ..services.audio_summary import AudioSummaryService
-        svc = AudioSummaryService("", "", "")
-        svc.delete_cached(paper_id)
+    def delete_audio(paper_id: str) -> dict[str, str]:
+        _audio_files.delete_cached(paper_id)
         return {"status": "deleted"}
 
     # ------------------------------------------------------------------
     # Citation Network
     # ------------------------------------------------------------------
 
+    # Semantic Scholar / OpenAlex 的响应走共享 KV 缓存（cache-aside）：同一 URL 与参数在 TTL 内不再请求外部 API，
+    # 也不容易撞上 S2 的限流。只缓存 200 响应的 JSON；非 200 返回 None 且不写缓存，网络异常照常抛出
+    _ID_LOOKUP_TTL = 24 * 3600
+    _CITATIONS_TTL = 3600
+
+    async def _cached_api_json(
+        url: str, ttl: int, params: dict[str, Any] | None = None, headers: dict[str, str] | None = None,
+    ) -> Any | None:
+        key = "api:" + url + ("?" + urlencode(sorted(params.items())) if params else "")
+
+        async def _fetch() -> Any | None:
+            r = await get_http_client().get(url, params=params, headers=headers, timeout=15.0)
+            return r.json() if r.status_code == 200 else None
+
+        return await get_or_fetch(key, ttl, _fetch)
+
     @router.get("/papers/{paper_id}/citations")
     async def get_citation_network(paper_id: str) -> dict[str, Any]:
         """Fetch citation network for a paper via Semantic Scholar API."""
         with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
+            paper = session.exec(
+                select(PaperKnowledge.id, PaperKnowledge.arxiv_id).where(PaperKnowledge.id == paper_id)
+            ).first()
         if not paper:
             raise HTTPException(404, "Paper not found")
         if not paper.arxiv_id:
@@ -754,52 +886,55 @@ def create_knowledge_router() -> APIRouter:
         nodes: dict[str, dict] = {}
         edges: list[dict] = []
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # Resolve S2 paper ID and get basic info
-            try:
-                r = await client.get(f"{base}/ArXiv:{paper.arxiv_id}", params={"fields": s2_fields})
-                if r.status_code != 200:
-                    return {"nodes": [], "edges": [], "message": "Paper not found on Semantic Scholar"}
-                center = r.json()
-            except Exception:
-                return {"nodes": [], "edges": [], "message": "Semantic Scholar API unavailable"}
-
-            s2id = center.get("paperId", "")
-            nodes[s2id] = {
-                "id": s2id, "title": center.get("title", ""), "year": center.get("year"),
-                "citations": center.get("citationCount", 0),
-                "authors": [a.get("name", "") for a in (center.get("authors") or [])[:3]],
-                "arxiv_id": paper.arxiv_id, "is_center": True,
-            }
+        # Resolve S2 paper ID and get basic info
+        try:
+            center = await _cached_api_json(f"{base}/ArXiv:{paper.arxiv_id}", _ID_LOOKUP_TTL, {"fields": s2_fields})
+            if center is None:
+                return {"nodes": [], "edges": [], "message": "Paper not found on Semantic Scholar"}
+        except Exception:
+            return {"nodes": [], "edges": [], "message": "Semantic Scholar API unavailable"}
+
+        s2id = center.get("paperId", "")
+        nodes[s2id] = {
+            "id": s2id, "title": center.get("title", ""), "year": center.get("year"),
+            "citations": center.get("citationCount", 0),
+            "authors": [a.get("name", "") for a in (center.get("authors") or [])[:3]],
+            "arxiv_id": paper.arxiv_id, "is_center": True,
+        }
 
-            # Fetch references (papers this paper cites) and citations (papers citing this)
-            for rel, direction in [("references", "cites"), ("citations", "citedBy")]:
-                try:
-                    r2 = await client.get(
-                        f"{base}/{s2id}/{rel}",
-                        params={"fields": s2_fields, "limit": 20},
-                    )
-                    if r2.status_code != 200:
-                        continue
-                    for item in r2.json().get("data", []):
-                        cp = item.get("citingPaper") or item.get("citedPaper") or item
-                        cid = cp.get("paperId", "")
-                        if not cid or not cp.get("title"):
-                            continue
-                        if cid not in nodes:
-                            nodes[cid] = {
-                                "id": cid, "title": cp.get("title", ""), "year": cp.get("year"),
-                                "citations": cp.get("citationCount", 0),
-                                "authors": [a.get("name", "") for a in (cp.get("authors") or [])[:3]],
-                                "arxiv_id": (cp.get("externalIds") or {}).get("ArXiv", ""),
-                                "is_center": False,
-                            }
-                        if direction == "cites":
-                            edges.append({"source": s2id, "target": cid, "type": "cites"})
-                        else:
-                            edges.append({"source": cid, "target": s2id, "type": "cites"})
-                except Exception:
+        # Fetch references (papers this paper cites) and citations (papers citing this)
+        # 两个列表互不依赖，并发请求：耗时取两者中较慢的一个，而不是相加
+        relations = [("references", "cites"), ("citations", "citedBy")]
+        responses = await asyncio.gather(
+            *(
+                _cached_api_json(f"{base}/{s2id}/{rel}", _CITATIONS_TTL, {"fields": s2_fields, "limit": 20})
+                for rel, _ in relations
+            ),
+            return_exceptions=True,
+        )
+        for (_, direction), data in zip(relations, responses, strict=True):
+            try:
+                if isinstance(data, BaseException) or data is None:
                     continue
+                for item in data.get("data", []):
+                    cp = item.get("citingPaper") or item.get("citedPaper") or item
+                    cid = cp.get("paperId", "")
+                    if not cid or not cp.get("title"):
+                        continue
+                    if cid not in nodes:
+                        nodes[cid] = {
+                            "id": cid, "title": cp.get("title", ""), "year": cp.get("year"),
+                            "citations": cp.get("citationCount", 0),
+                            "authors": [a.get("name", "") for a in (cp.get("authors") or [])[:3]],
+                            "arxiv_id": (cp.get("externalIds") or {}).get("ArXiv", ""),
+                            "is_center": False,
+                        }
+                    if direction == "cites":
+                        edges.append({"source": s2id, "target": cid, "type": "cites"})
+                    else:
+                        edges.append({"source": cid, "target": s2id, "type": "cites"})
+            except Exception:
+                continue
 
         return {"nodes": list(nodes.values()), "edges": edges}
 
@@ -811,7 +946,9 @@ def create_knowledge_router() -> APIRouter:
     async def get_citation_contexts(paper_id: str) -> dict[str, Any]:
         """Fetch citation contexts showing how this paper is cited (supporting/contrasting/mentioning)."""
         with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
+            paper = session.exec(
+                select(PaperKnowledge.id, PaperKnowledge.arxiv_id).where(PaperKnowledge.id == paper_id)
+            ).first()
         if not paper:
             raise HTTPException(404, "Paper not found")
         if not paper.arxiv_id:
@@ -820,42 +957,41 @@ def create_knowledge_router() -> APIRouter:
         base = "https://api.semanticscholar.org/graph/v1/paper"
         contexts: list[dict] = []
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            try:
-                r = await client.get(f"{base}/ArXiv:{paper.arxiv_id}", params={"fields": "paperId"})
-                if r.status_code != 200:
-                    return {"contexts": [], "message": "Paper not found on Semantic Scholar"}
-                s2id = r.json().get("paperId", "")
-            except Exception:
-                return {"contexts": [], "message": "Semantic Scholar API unavailable"}
+        try:
+            found = await _cached_api_json(f"{base}/ArXiv:{paper.arxiv_id}", _ID_LOOKUP_TTL, {"fields": "paperId"})
+            if found is None:
+                return {"contexts": [], "message": "Paper not found on Semantic Scholar"}
+            s2id = found.get("paperId", "")
+        except Exception:
+            return {"contexts": [], "message": "Semantic Scholar API unavailable"}
 
-            # Fetch citations with contexts
-            try:
-                r2 = await client.get(
-                    f"{base}/{s2id}/citations",
-                    params={"fields": "contexts,intents,title,year,authors,citationCount,externalIds", "limit": 30},
-                )
-                if r2.status_code == 200:
-                    for item in r2.json().get("data", []):
-                        cp = item.get("citingPaper", {})
-                        if not cp.get("title"):
-                            continue
-                        ctxs = item.get("contexts") or []
-                        intents = item.get("intents") or []
-                        if not ctxs:
-                            continue
-                        contexts.append({
-                            "title": cp.get("title", ""),
-                            "year": cp.get("year"),
-                            "authors": [a.get("name", "") for a in (cp.get("authors") or [])[:3]],
-                            "citations": cp.get("citationCount", 0),
-                            "arxiv_id": (cp.get("externalIds") or {}).get("ArXiv", ""),
-                            "s2_id": cp.get("paperId", ""),
-                            "contexts": ctxs[:3],
-                            "intents": intents,
-                        })
-            except Exception:
-                pass
+        # Fetch citations with contexts
+        try:
+            data = await _cached_api_json(
+                f"{base}/{s2id}/citations", _CITATIONS_TTL,
+                {"fields": "contexts,intents,title,year,authors,citationCount,externalIds", "limit": 30},
+            )
+            if data is not None:
+                for item in data.get("data", []):
+                    cp = item.get("citingPaper", {})
+                    if not cp.get("title"):
+                        continue
+                    ctxs = item.get("contexts") or []
+                    intents = item.get("intents") or []
+                    if not ctxs:
+                        continue
+                    contexts.append({
+                        "title": cp.get("title", ""),
+                        "year": cp.get("year"),
+                        "authors": [a.get("name", "") for a in (cp.get("authors") or [])[:3]],
+                        "citations": cp.get("citationCount", 0),
+                        "arxiv_id": (cp.get("externalIds") or {}).get("ArXiv", ""),
+                        "s2_id": cp.get("paperId", ""),
+                        "contexts": ctxs[:3],
+                        "intents": intents,
+                    })
+        except Exception:
+            pass
 
         return {"contexts": contexts}
 
@@ -864,7 +1000,7 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/paper-by-task/{task_id}")
-    async def get_paper_by_task(task_id: str) -> dict[str, Any]:
+    def get_paper_by_task(task_id: str) -> dict[str, Any]:
         with Session(engine) as session:
             paper = session.exec(
                 select(PaperKnowledge).where(PaperKnowledge.task_id == task_id)
@@ -886,7 +1022,6 @@ def create_knowledge_router() -> APIRouter:
         if not text:
             raise HTTPException(400, "text is required")
 
-        import httpx as hx
         prompt = (
             "You are a helpful research assistant. Explain the following academic text "
             "in simple, easy-to-understand language (CEFR A2/B1 level). "
@@ -896,18 +1031,19 @@ def create_knowledge_router() -> APIRouter:
             prompt += f"Paper context: {context}\n\n"
         prompt += f"Text to explain:\n\"{text}\""
 
-        async with hx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
-                f"{llm_config['base_url']}/chat/completions",
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"},
-                json={
-                    "model": llm_config.get("model", "gpt-4o"),
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 300,
-                },
-            )
-            resp.raise_for_status()
-            reply = resp.json()["choices"][0]["message"]["content"]
+        client = get_http_client()
+        resp = await client.post(
+            f"{llm_config.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {llm_config.api_key}"},
+            json={
+                "model": llm_config.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 300,
+            },
+            timeout=30.0,
+        )
+        resp.raise_for_status()
+        reply = resp.json()["choices"][0]["message"]["content"]
         return {"explanation": reply}
 
     # ------------------------------------------------------------------
@@ -916,15 +1052,12 @@ def create_knowledge_router() -> APIRouter:
 
     @router.post("/reading-events")
     async def record_reading_event(request: Request) -> dict[str, str]:
-        import uuid
-        from datetime import datetime
         body = await request.json()
         event = ReadingEvent(
-            id=f"re_{uuid.uuid4().hex[:12]}",
+            id=f"re_{secrets.token_hex(6)}",
             paper_id=body.get("paper_id", ""),
             task_id=body.get("task_id", ""),
             event_type=body.get("event_type", "view"),
-            created_at=datetime.utcnow(),
         )
         with Session(engine) as session:
             session.add(event)
@@ -932,35 +1065,40 @@ def create_knowledge_router() -> APIRouter:
         return {"status": "recorded"}
 
     @router.get("/reading-history")
-    async def get_reading_history(days: int = 30) -> dict[str, Any]:
-        from datetime import datetime, timedelta
-        from sqlmodel import func
+    def get_reading_history(days: int = 30) -> dict[str, Any]:
         cutoff = datetime.utcnow() - timedelta(days=days)
+        day = func.date(ReadingEvent.created_at)
         with Session(engine) as session:
-            # Recent events
+            # Recent events：只取列表展示的前 100 条
             events = session.exec(
-                select(ReadingEvent)
+                select(
+                    ReadingEvent.id, ReadingEvent.paper_id, ReadingEvent.task_id,
+                    ReadingEvent.event_type, ReadingEvent.created_at,
+                )
                 .where(ReadingEvent.created_at >= cutoff)
                 .order_by(ReadingEvent.created_at.desc())
+                .limit(100)
             ).all()
-            # Stats
-            total_events = session.exec(select(func.count(ReadingEvent.id))).one()
-            unique_papers = session.exec(
-                select(func.count(func.distinct(ReadingEvent.paper_id)))
-                .where(ReadingEvent.paper_id != "")
+            # Stats：总数与去重论文数一条查询（空 paper_id 经 case 变 NULL，不计入 distinct）
+            total_events, unique_papers = session.exec(
+                select(
+                    func.count(ReadingEvent.id),
+                    func.count(func.distinct(case((ReadingEvent.paper_id != "", ReadingEvent.paper_id)))),
+                )
             ).one()
-            # Daily counts for chart
-            daily: dict[str, int] = {}
-            for e in events:
-                day = e.created_at.strftime("%Y-%m-%d") if e.created_at else ""
-                if day:
-                    daily[day] = daily.get(day, 0) + 1
+            # Daily counts for chart：按天分组计数交给数据库，走 created_at 索引做范围扫描
+            daily = dict(session.exec(
+                select(day, func.count())
+                .where(ReadingEvent.created_at >= cutoff)
+                .group_by(day)
+                .order_by(day.desc())
+            ).all())
 
         return {
             "events": [
                 {"id": e.id, "paper_id": e.paper_id, "task_id": e.task_id,
                  "event_type": e.event_type, "created_at": e.created_at.isoformat() if e.created_at else None}
-                for e in events[:100]
+                for e in events
             ],
             "stats": {"total_events": total_events, "unique_papers": unique_papers},
             "daily": daily,
@@ -989,40 +1127,40 @@ def create_knowledge_router() -> APIRouter:
             return {"enriched": False, "reason": "No DOI or title available"}
 
         enriched_data = {}
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            try:
-                r = await client.get(query, headers={"User-Agent": "PaperRadar/2.1 (mailto:contact@paperradar.dev)"})
-                if r.status_code != 200:
-                    return {"enriched": False, "reason": "OpenAlex API error"}
-                data = r.json()
-                # Handle search results vs direct lookup
-                work = data if "id" in data else (data.get("results", [{}])[0] if data.get("results") else {})
-                if not work.get("id"):
-                    return {"enriched": False, "reason": "Paper not found in OpenAlex"}
-
-                enriched_data = {
-                    "openalex_id": work.get("id", ""),
-                    "cited_by_count": work.get("cited_by_count", 0),
-                    "type": work.get("type", ""),
-                    "open_access": work.get("open_access", {}).get("is_oa", False),
-                    "concepts": [c.get("display_name", "") for c in (work.get("concepts") or [])[:5]],
-                    "topics": [t.get("display_name", "") for t in (work.get("topics") or [])[:3]],
-                    "institutions": list({i.get("display_name", "") for a in (work.get("authorships") or []) for i in (a.get("institutions") or []) if i.get("display_name")}),
-                }
-                # Update paper fields if missing
-                with Session(engine) as session:
-                    p = session.get(PaperKnowledge, paper_id)
-                    if p:
-                        if not p.doi and work.get("doi"):
-                            p.doi = work["doi"].replace("https://doi.org/", "")
-                        if not p.year and work.get("publication_year"):
-                            p.year = work["publication_year"]
-                        if not p.venue and work.get("primary_location", {}).get("source", {}).get("display_name"):
-                            p.venue = work["primary_location"]["source"]["display_name"]
-                        session.add(p)
-                        session.commit()
-            except Exception as exc:
-                return {"enriched": False, "reason": str(exc)[:100]}
+        try:
+            data = await _cached_api_json(
+                query, _ID_LOOKUP_TTL, headers={"User-Agent": "PaperRadar/2.1 (mailto:contact@paperradar.dev)"},
+            )
+            if data is None:
+                return {"enriched": False, "reason": "OpenAlex API error"}
+            # Handle search results vs direct lookup
+            work = data if "id" in data else (data.get("results", [{}])[0] if data.get("results") else {})
+            if not work.get("id"):
+                return {"enriched": False, "reason": "Paper not found in OpenAlex"}
+
+            enriched_data = {
+                "openalex_id": work.get("id", ""),
+                "cited_by_count": work.get("cited_by_count", 0),
+                "type": work.get("type", ""),
+                "open_access": work.get("open_access", {}).get("is_oa", False),
+                "concepts": [c.get("display_name", "") for c in (work.get("concepts") or [])[:5]],
+                "topics": [t.get("display_name", "") for t in (work.get("topics") or [])[:3]],
+                "institutions": list({i.get("display_name", "") for a in (work.get("authorships") or []) for i in (a.get("institutions") or []) if i.get("display_name")}),
+            }
+            # Update paper fields if missing
+            with Session(engine) as session:
+                p = session.get(PaperKnowledge, paper_id)
+                if p:
+                    if not p.doi and work.get("doi"):
+                        p.doi = work["doi"].replace("https://doi.org/", "")
+                    if not p.year and work.get("publication_year"):
+                        p.year = work["publication_year"]
+                    if not p.venue and work.get("primary_location", {}).get("source", {}).get("display_name"):
+                        p.venue = work["primary_location"]["source"]["display_name"]
+                    session.add(p)
+                    session.commit()
+        except Exception as exc:
+            return {"enriched": False, "reason": str(exc)[:100]}
 
         return {"enriched": True, "data": enriched_data}
 
@@ -1031,32 +1169,39 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/collections")
-    async def list_collections() -> list[dict[str, Any]]:
-        with Session(engine) as session:
-            cols = session.exec(select(PaperCollection).order_by(PaperCollection.updated_at.desc())).all()
+    def list_collections(session: Session = Depends(get_session)) -> list[dict[str, Any]]:
+        cols = session.exec(
+            select(
+                PaperCollection.id, PaperCollection.name, PaperCollection.description,
+                PaperCollection.color, PaperCollection.created_at, PaperCollection.updated_at,
+            ).order_by(PaperCollection.updated_at.desc())
+        ).all()
+        # 全部成员关系一次取回，按加入顺序归组；paper_count 即成员数
+        members: dict[str, list[str]] = {}
+        for cid, pid in session.exec(
+            select(CollectionPaper.collection_id, CollectionPaper.paper_id)
+            .order_by(CollectionPaper.added_at, CollectionPaper.id)
+        ):
+            members.setdefault(cid, []).append(pid)
         return [
-            {"id": c.id, "name": c.name, "description": c.description, "color": c.color,
-             "paper_ids": json.loads(c.paper_ids_json) if c.paper_ids_json else [],
-             "paper_count": len(json.loads(c.paper_ids_json)) if c.paper_ids_json else 0,
-             "created_at": c.created_at.isoformat() if c.created_at else None,
-             "updated_at": c.updated_at.isoformat() if c.updated_at else None}
-            for c in cols
+            {"id": cid, "name": name, "description": description, "color": color,
+             "paper_ids": members.get(cid, []),
+             "paper_count": len(members.get(cid, ())),
+             "created_at": created_at.isoformat() if created_at else None,
+             "updated_at": updated_at.isoformat() if updated_at else None}
+            for cid, name, description, color, created_at, updated_at in cols
         ]
 
     @router.post("/collections")
     async def create_collection(request: Request) -> dict[str, Any]:
-        import uuid
-        from datetime import datetime
         body = await request.json()
         name = body.get("name", "").strip()
         if not name:
             raise HTTPException(400, "name is required")
-        cid = f"col_{uuid.uuid4().hex[:12]}"
+        cid = f"col_{secrets.token_hex(6)}"
         with Session(engine) as session:
             col = PaperCollection(
-                id=cid, name=name, description=body.get("description", ""),
-                color=body.get("color", "blue"), paper_ids_json="[]",
-                created_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+                id=cid, name=name, description=body.get("description", ""), color=body.get("color", "blue")
             )
             session.add(col)
             session.commit()
@@ -1064,7 +1209,6 @@ def create_knowledge_router() -> APIRouter:
 
     @router.put("/collections/{col_id}")
     async def update_collection(col_id: str, request: Request) -> dict[str, str]:
-        from datetime import datetime
         body = await request.json()
         with Session(engine) as session:
             col = session.get(PaperCollection, col_id)
@@ -1076,55 +1220,63 @@ def create_knowledge_router() -> APIRouter:
                 col.description = body["description"]
             if "color" in body:
                 col.color = body["color"]
-            col.updated_at = datetime.utcnow()
+            col.updated_at = func.now()
             session.add(col)
             session.commit()
         return {"status": "updated"}
 
     @router.delete("/collections/{col_id}")
-    async def delete_collection(col_id: str) -> dict[str, str]:
-        with Session(engine) as session:
-            col = session.get(PaperCollection, col_id)
-            if not col:
-                raise HTTPException(404, "Collection not found")
-            session.delete(col)
-            session.commit()
+    def delete_collection(col_id: str, session: Session = Depends(get_session)) -> dict[str, str]:
+        session.exec(delete(CollectionPaper).where(CollectionPaper.collection_id == col_id))
+        result = session.exec(delete(PaperCollection).where(PaperCollection.id == col_id))
+        if not result.rowcount:
+            session.rollback()
+            raise HTTPException(404, "Collection not found")
+        session.commit()
         return {"status": "deleted"}
 
+    def _collection_size(session: Session, col_id: str) -> int:
+        return session.exec(
+            select(func.count()).select_from(CollectionPaper).where(CollectionPaper.collection_id == col_id)
+        ).one()
+
     @router.post("/collections/{col_id}/papers")
-    async def add_paper_to_collection(col_id: str, request: Request) -> dict[str, Any]:
-        from datetime import datetime
-        body = await request.json()
+    def add_paper_to_collection(
+        col_id: str, body: dict[str, Any] = Body(...), session: Session = Depends(get_session)
+    ) -> dict[str, Any]:
         paper_id = body.get("paper_id", "")
         if not paper_id:
             raise HTTPException(400, "paper_id is required")
-        with Session(engine) as session:
-            col = session.get(PaperCollection, col_id)
-            if not col:
-                raise HTTPException(404, "Collection not found")
-            ids = json.loads(col.paper_ids_json) if col.paper_ids_json else []
-            if paper_id not in ids:
-                ids.append(paper_id)
-                col.paper_ids_json = json.dumps(ids)
-                col.updated_at = datetime.utcnow()
-                session.add(col)
-                session.commit()
-        return {"paper_count": len(ids)}
+        if session.exec(select(PaperCollection.id).where(PaperCollection.id == col_id)).first() is None:
+            raise HTTPException(404, "Collection not found")
+        try:
+            session.add(CollectionPaper(collection_id=col_id, paper_id=paper_id))
+            session.exec(
+                update(PaperCollection).where(PaperCollection.id == col_id).values(updated_at=func.now())
+            )
+            session.commit()
+        except IntegrityError:
+            # 唯一约束冲突 = 已在收藏夹中，保持幂等
+            session.rollback()
+        return {"paper_count": _collection_size(session, col_id)}
 
     @router.delete("/collections/{col_id}/papers/{paper_id}")
-    async def remove_paper_from_collection(col_id: str, paper_id: str) -> dict[str, Any]:
-        from datetime import datetime
-        with Session(engine) as session:
-            col = session.get(PaperCollection, col_id)
-            if not col:
-                raise HTTPException(404, "Collection not found")
-            ids = json.loads(col.paper_ids_json) if col.paper_ids_json else []
-            ids = [pid for pid in ids if pid != paper_id]
-            col.paper_ids_json = json.dumps(ids)
-            col.updated_at = datetime.utcnow()
-            session.add(col)
-            session.commit()
-        return {"paper_count": len(ids)}
+    def remove_paper_from_collection(
+        col_id: str, paper_id: str, session: Session = Depends(get_session)
+    ) -> dict[str, Any]:
+        result = session.exec(
+            update(PaperCollection).where(PaperCollection.id == col_id).values(updated_at=func.now())
+        )
+        if not result.rowcount:
+            session.rollback()
+            raise HTTPException(404, "Collection not found")
+        session.exec(
+            delete(CollectionPaper).where(
+                CollectionPaper.collection_id == col_id, CollectionPaper.paper_id == paper_id
+            )
+        )
+        session.commit()
+        return {"paper_count": _collection_size(session, col_id)}
 
     # ------------------------------------------------------------------
     # Paper Writing Assistant
@@ -1142,12 +1294,8 @@ def create_knowledge_router() -> APIRouter:
         if not paper_ids:
             raise HTTPException(400, "paper_ids is required")
 
-        papers_json = []
         with Session(engine) as session:
-            for pid in paper_ids[:20]:
-                p = session.get(PaperKnowledge, pid)
-                if p and p.knowledge_json:
-                    papers_json.append(json.loads(p.knowledge_json))
+            papers_json = _load_papers_json(session, paper_ids[:20])
 
         if not papers_json:
             raise HTTPException(400, "No papers with extracted knowledge found")
@@ -1168,20 +1316,20 @@ def create_knowledge_router() -> APIRouter:
             f"Papers:\n{context}"
         )
 
-        import httpx as hx
-        async with hx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(
-                f"{llm_config['base_url']}/chat/completions",
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"},
-                json={
-                    "model": llm_config.get("model", "gpt-4o"),
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3,
-                    "max_tokens": 4096,
-                },
-            )
-            resp.raise_for_status()
-            text = resp.json()["choices"][0]["message"]["content"]
+        client = get_http_client()
+        resp = await client.post(
+            f"{llm_config.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {llm_config.api_key}"},
+            json={
+                "model": llm_config.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.3,
+                "max_tokens": 4096,
+            },
+            timeout=120.0,
+        )
+        resp.raise_for_status()
+        text = resp.json()["choices"][0]["message"]["content"]
         return {"related_work": text}
 
     # ------------------------------------------------------------------
@@ -1219,12 +1367,116 @@ def create_knowledge_router() -> APIRouter:
             parts.append("")
         return "\n".join(parts)
 
-    def _get_completed_papers_json() -> list[dict]:
+    # 已完成论文的解析结果缓存：(版本标记, 解析结果)，版本标记为 (数量, max(updated_at))；返回的 dict 只读。
+    # 与 _graph_cache 一样整体替换元组，线程池里不会读到新标记配旧结果
+    _papers_cache: dict[str, tuple] = {}
+
+    def _paper_pdf_path(paper_id: str) -> str:
+        """论文对应任务的原始 PDF 路径：一次 LEFT JOIN 只取两列，不读 knowledge_json"""
         with Session(engine) as session:
-            papers = session.exec(
-                select(PaperKnowledge).where(PaperKnowledge.extraction_status == "completed")
+            row = session.exec(
+                select(PaperKnowledge.id, Task.original_pdf_path)
+                .outerjoin(Task, Task.task_id == PaperKnowledge.task_id)
+                .where(PaperKnowledge.id == paper_id)
+            ).first()
+        if not row:
+            raise HTTPException(404, "Paper not found")
+        if not row.original_pdf_path or not Path(row.original_pdf_path).exists():
+            raise HTTPException(404, "Original PDF not found")
+        return row.original_pdf_path
+
+    def _paper_exists(session: Session, paper_id: str) -> bool:
+        return session.exec(select(PaperKnowledge.id).where(PaperKnowledge.id == paper_id)).first() is not None
+
+    def _completed_papers_token(session: Session) -> tuple:
+        return tuple(session.exec(_PAPERS_TOKEN).one())
+
+    async def _get_completed_papers_json(session: Session | None = None) -> list[dict]:
+        if session is None:
+            with Session(engine) as session:
+                return await _get_completed_papers_json(session)
+        token = _completed_papers_token(session)
+        entry = _papers_cache.get("entry")
+        if entry is not None and entry[0] == token:
+            return list(entry[1])
+        result = session.exec(_COMPLETED_KNOWLEDGE_JSON)
+        # 缓存未命中时的整库解析放到线程池，避免长时间占住事件循环；
+        # 按批取行、边取边解析，不同时持有全部 JSON 文本和解析结果
+        papers = await asyncio.to_thread(
+            lambda: [orjson.loads(kj) for batch in result.partitions() for kj in batch if kj]
+        )
+        _papers_cache["entry"] = (token, papers)
+        return list(papers)
+
+    # 解析后的 knowledge_json 按 (paper_id, updated_at) 缓存，写 knowledge_json 时都会刷新 updated_at，
+    # 版本变了旧条目自然不再命中。返回的 dict 在请求间共享，调用方只读不改
+    _knowledge_cache: OrderedDict[tuple[str, datetime], dict] = OrderedDict()
+    _knowledge_cache_lock = threading.Lock()
+    _KNOWLEDGE_CACHE_SIZE = 256
+
+    def _load_papers_json(session: Session, paper_ids: list[str]) -> list[dict]:
+        """取多篇论文解析后的 knowledge_json，按请求顺序返回，跳过不存在/未提取的"""
+        versions = session.exec(
+            select(PaperKnowledge.id, PaperKnowledge.updated_at)
+            .where(PaperKnowledge.id.in_(paper_ids), PaperKnowledge.knowledge_json != "")
+        ).all()
+        parsed: dict[str, dict] = {}
+        with _knowledge_cache_lock:
+            for pid, version in versions:
+                kj = _knowledge_cache.get((pid, version))
+                if kj is not None:
+                    _knowledge_cache.move_to_end((pid, version))
+                    parsed[pid] = kj
+        missing = {pid: version for pid, version in versions if pid not in parsed}
+        if missing:
+            # 未命中的才读大字段，一条 IN 查询
+            rows = session.exec(
+                select(PaperKnowledge.id, PaperKnowledge.knowledge_json).where(PaperKnowledge.id.in_(missing))
             ).all()
-        return [json.loads(p.knowledge_json) for p in papers if p.knowledge_json]
+            fresh = {pid: orjson.loads(kj) for pid, kj in rows if kj}
+            parsed.update(fresh)
+            with _knowledge_cache_lock:
+                for pid, kj in fresh.items():
+                    _knowledge_cache[(pid, missing[pid])] = kj
+                while len(_knowledge_cache) > _KNOWLEDGE_CACHE_SIZE:
+                    _knowledge_cache.popitem(last=False)
+        return [parsed[pid] for pid in paper_ids if pid in parsed]
+
+    def _load_knowledge(paper_id: str) -> dict | None:
+        with Session(engine) as session:
+            papers_json = _load_papers_json(session, [paper_id])
+        return papers_json[0] if papers_json else None
+
+    def _cached_renders(session: Session, column, render) -> list[str]:
+        """取已完成论文的预渲染导出文本；旧数据没有缓存时现算一次并回填"""
+        rows = session.exec(
+            select(PaperKnowledge.id, column).where(PaperKnowledge.extraction_status == "completed")
+        ).all()
+        missing = [pid for pid, cached in rows if cached is None]
+        if not missing:
+            return [cached for _, cached in rows]
+        sources = session.exec(
+            select(PaperKnowledge.id, PaperKnowledge.knowledge_json).where(PaperKnowledge.id.in_(missing))
+        ).all()
+        filled = {pid: render({"id": pid, **orjson.loads(kj)}) for pid, kj in sources if kj}
+        for pid, rendered in filled.items():
+            session.exec(update(PaperKnowledge).where(PaperKnowledge.id == pid).values({column: rendered}))
+        session.commit()
+        return [filled[pid] if cached is None else cached for pid, cached in rows if cached is not None or pid in filled]
+
+    # _flashcard_to_dict 用到的列；投影查询返回的 Row 同样按属性访问
+    _FLASHCARD_COLUMNS = (
+        Flashcard.id, Flashcard.paper_id, Flashcard.front, Flashcard.back, Flashcard.tags_json,
+        Flashcard.difficulty, Flashcard.interval_days, Flashcard.ease_factor, Flashcard.repetitions,
+        Flashcard.next_review, Flashcard.last_review,
+    )
+    # 到期闪卡查询只构造一次，当前时间和条数作为绑定参数传入，语句本身始终命中编译缓存
+    _DUE_FLASHCARDS = (
+        select(*_FLASHCARD_COLUMNS)
+        .where(Flashcard.next_review <= bindparam("now"))
+        .order_by(Flashcard.next_review)
+        .limit(bindparam("limit"))
+    )
 
     def _flashcard_to_dict(card: Flashcard) -> dict[str, Any]:
         return {
@@ -1232,7 +1484,7 @@ def create_knowledge_router() -> APIRouter:
             "paper_id": card.paper_id,
             "front": card.front,
             "back": card.back,
-            "tags": json.loads(card.tags_json) if card.tags_json else [],
+            "tags": card.tags_json or [],
             "difficulty": card.difficulty,
             "srs": {
                 "interval_days": card.interval_days,
@@ -1264,7 +1516,7 @@ def create_knowledge_router() -> APIRouter:
         profile_parts = []
         for p in completed[:10]:
             if p.knowledge_json:
-                kj = json.loads(p.knowledge_json)
+                kj = orjson.loads(p.knowledge_json)
                 meta = kj.get("metadata", {})
                 title = meta.get("title", "")
                 if isinstance(title, dict):
@@ -1290,28 +1542,28 @@ def create_knowledge_router() -> APIRouter:
             f"Return ONLY a JSON array of indices in order of relevance, e.g. [3, 0, 7, 1, ...]"
         )
 
-        import httpx as hx
         try:
-            async with hx.AsyncClient(timeout=30.0) as client:
-                resp = await client.post(
-                    f"{llm_config['base_url']}/chat/completions",
-                    headers={"Authorization": f"Bearer {llm_config['api_key']}"},
-                    json={"model": llm_config.get("model", "gpt-4o"), "messages": [{"role": "user", "content": prompt}], "max_tokens": 200},
-                )
-                resp.raise_for_status()
-                content = resp.json()["choices"][0]["message"]["content"].strip()
-                # Parse indices
-                start = content.find("[")
-                end = content.rfind("]")
-                if start != -1 and end != -1:
-                    indices = json.loads(content[start:end+1])
-                    ranked = [candidate_papers[i] for i in indices if i < len(candidate_papers)]
-                    # Append any missing
-                    seen = set(indices)
-                    for i, p in enumerate(candidate_papers):
-                        if i not in seen:
-                            ranked.append(p)
-                    return {"ranked": ranked}
+            client = get_http_client()
+            resp = await client.post(
+                f"{llm_config.base_url}/chat/completions",
+                headers={"Authorization": f"Bearer {llm_config.api_key}"},
+                json={"model": llm_config.model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 200},
+                timeout=30.0,
+            )
+            resp.raise_for_status()
+            content = resp.json()["choices"][0]["message"]["content"].strip()
+            # Parse indices
+            start = content.find("[")
+            end = content.rfind("]")
+            if start != -1 and end != -1:
+                indices = orjson.loads(content[start:end+1])
+                ranked = [candidate_papers[i] for i in indices if i < len(candidate_papers)]
+                # Append any missing
+                seen = set(indices)
+                for i, p in enumerate(candidate_papers):
+                    if i not in seen:
+                        ranked.append(p)
+                return {"ranked": ranked}
         except Exception:
             pass
         return {"ranked": candidate_papers, "message": "Ranking failed, returning original order"}
@@ -1321,10 +1573,8 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/digest")
-    async def get_digest(days: int = 7) -> dict[str, Any]:
+    def get_digest(days: int = 7) -> dict[str, Any]:
         """Generate a digest of recent activity for email/webhook notifications."""
-        from datetime import datetime, timedelta
-        from sqlmodel import func
         cutoff = datetime.utcnow() - timedelta(days=days)
 
         with Session(engine) as session:
@@ -1375,7 +1625,7 @@ def create_knowledge_router() -> APIRouter:
         llm_config = get_llm_config(request)
         body = await request.json() if request.headers.get("content-type", "").startswith("application/json") else {}
         topic = body.get("topic", "")
-        papers_json = _get_completed_papers_json()
+        papers_json = await _get_completed_papers_json()
         if len(papers_json) < 2:
             raise HTTPException(400, "Need at least 2 papers")
 
@@ -1404,14 +1654,15 @@ def create_knowledge_router() -> APIRouter:
             + "\n\n".join(context_parts)
         )
 
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=120.0) as client:
-            resp = await client.post(
-                "/chat/completions",
-                json={"model": llm_config.get("model", ""), "messages": [{"role": "user", "content": prompt}], "max_tokens": 4000},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}", "Content-Type": "application/json"},
-            )
-            resp.raise_for_status()
-            result = resp.json()["choices"][0]["message"]["content"]
+        client = get_http_client()
+        resp = await client.post(
+            f"{llm_config.base_url}/chat/completions",
+            json={"model": llm_config.model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 4000},
+            headers={"Authorization": f"Bearer {llm_config.api_key}", "Content-Type": "application/json"},
+            timeout=120.0,
+        )
+        resp.raise_for_status()
+        result = resp.json()["choices"][0]["message"]["content"]
 
         return {"gaps": result, "paper_count": len(papers_json), "topic": topic}
 
@@ -1434,58 +1685,63 @@ def create_knowledge_router() -> APIRouter:
         base = f"https://api.zotero.org/{library_type}s/{library_id}"
         headers = {"Zotero-API-Key": api_key, "Zotero-API-Version": "3"}
         imported = []
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(f"{base}/items/top", headers=headers, params={"limit": limit, "format": "json", "itemType": "-attachment"})
-            if resp.status_code != 200:
-                raise HTTPException(400, f"Zotero API error: {resp.status_code}")
-            items = resp.json()
-            for item in items:
-                data = item.get("data", {})
-                title = data.get("title", "")
-                doi = data.get("DOI", "")
-                url = data.get("url", "")
-                year = None
-                date_str = data.get("date", "")
-                if date_str:
-                    import re
-                    m = re.search(r"(\d{4})", date_str)
-                    if m:
-                        year = int(m.group(1))
-                # Check if already in KB by title
-                with Session(engine) as session:
-                    existing = session.exec(select(PaperKnowledge).where(PaperKnowledge.title == title)).first()
-                if existing:
-                    imported.append({"title": title, "status": "exists", "paper_id": existing.id})
-                    continue
-                # Create a KB entry from Zotero metadata
-                import uuid
-                paper_id = f"pk_{uuid.uuid4().hex[:12]}"
-                authors = [{"name": f"{c.get('firstName', '')} {c.get('lastName', '')}".strip()} for c in data.get("creators", [])]
-                knowledge = {
-                    "id": paper_id,
-                    "metadata": {
-                        "title": {"en": title, "zh": title},
-                        "authors": authors,
-                        "year": year,
-                        "doi": doi,
-                        "venue": data.get("publicationTitle", ""),
-                        "abstract": {"en": data.get("abstractNote", ""), "zh": ""},
-                        "keywords": [],
-                    },
-                    "entities": [], "relationships": [], "findings": [],
-                    "methods": [], "datasets": [], "flashcards": [], "annotations": [],
-                    "source": "zotero",
-                }
-                with Session(engine) as session:
-                    paper = PaperKnowledge(
-                        id=paper_id, title=title, doi=doi, year=year,
-                        venue=data.get("publicationTitle", ""),
-                        knowledge_json=json.dumps(knowledge, ensure_ascii=False),
-                        extraction_status="imported",
-                    )
-                    session.add(paper)
-                    session.commit()
-                imported.append({"title": title, "status": "imported", "paper_id": paper_id})
+        client = get_http_client()
+        resp = await client.get(f"{base}/items/top", headers=headers, params={"limit": limit, "format": "json", "itemType": "-attachment"}, timeout=30.0)
+        if resp.status_code != 200:
+            raise HTTPException(400, f"Zotero API error: {resp.status_code}")
+        items = resp.json()
+        # 已在库中的标题一次 IN 查询取齐；新条目攒起来最后一个事务写入
+        titles = [item.get("data", {}).get("title", "") for item in items]
+        with Session(engine) as session:
+            existing_ids = dict(session.exec(
+                select(PaperKnowledge.title, PaperKnowledge.id).where(PaperKnowledge.title.in_(titles))
+            ).all())
+        new_papers: list[PaperKnowledge] = []
+        for item in items:
+            data = item.get("data", {})
+            title = data.get("title", "")
+            doi = data.get("DOI", "")
+            url = data.get("url", "")
+            year = None
+            date_str = data.get("date", "")
+            if date_str:
+                m = re.search(r"(\d{4})", date_str)
+                if m:
+                    year = int(m.group(1))
+            # Check if already in KB by title
+            if title in existing_ids:
+                imported.append({"title": title, "status": "exists", "paper_id": existing_ids[title]})
+                continue
+            # Create a KB entry from Zotero metadata
+            paper_id = f"pk_{secrets.token_hex(6)}"
+            authors = [{"name": f"{c.get('firstName', '')} {c.get('lastName', '')}".strip()} for c in data.get("creators", [])]
+            knowledge = {
+                "id": paper_id,
+                "metadata": {
+                    "title": {"en": title, "zh": title},
+                    "authors": authors,
+                    "year": year,
+                    "doi": doi,
+                    "venue": data.get("publicationTitle", ""),
+                    "abstract": {"en": data.get("abstractNote", ""), "zh": ""},
+                    "keywords": [],
+                },
+                "entities": [], "relationships": [], "findings": [],
+                "methods": [], "datasets": [], "flashcards": [], "annotations": [],
+                "source": "zotero",
+            }
+            new_papers.append(PaperKnowledge(
+                id=paper_id, title=title, doi=doi, year=year,
+                venue=data.get("publicationTitle", ""),
+                knowledge_json=orjson.dumps(knowledge).decode(),
+                extraction_status="imported",
+            ))
+            existing_ids[title] = paper_id
+            imported.append({"title": title, "status": "imported", "paper_id": paper_id})
+        if new_papers:
+            with Session(engine) as session:
+                session.add_all(new_papers)
+                session.commit()
         return {"imported": len([i for i in imported if i["status"] == "imported"]), "total": len(imported), "items": imported}
 
     # ------------------------------------------------------------------
@@ -1493,7 +1749,7 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/similarity-map")
-    async def get_similarity_map() -> dict[str, Any]:
+    def get_similarity_map() -> dict[str, Any]:
         """Get 2D coordinates for all papers based on vector embeddings (PCA)."""
         from ..services.vector_search import get_vector_service
         vs = get_vector_service()
@@ -1542,21 +1798,9 @@ def create_knowledge_router() -> APIRouter:
     async def get_paper_figures(paper_id: str) -> dict[str, Any]:
         """Extract figures/images from a paper's PDF."""
         from ..services.figure_extractor import extract_figures
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper:
-            raise HTTPException(404, "Paper not found")
-        # Find original PDF via task
-        pdf_path = None
-        if paper.task_id:
-            with Session(engine) as session:
-                task = session.get(Task, paper.task_id)
-                if task and task.original_pdf_path:
-                    pdf_path = task.original_pdf_path
-        if not pdf_path or not Path(pdf_path).exists():
-            raise HTTPException(404, "Original PDF not found")
-        pdf_bytes = Path(pdf_path).read_bytes()
-        figures = extract_figures(pdf_bytes)
+        pdf_path = _paper_pdf_path(paper_id)
+        # 读盘和 PyMuPDF 解析都在线程池里做，不阻塞事件循环
+        figures = await asyncio.to_thread(lambda: extract_figures(Path(pdf_path).read_bytes()))
         # Strip base64 for listing (return separately per figure)
         listing = [{"index": f["index"], "page": f["page"], "width": f["width"], "height": f["height"]} for f in figures]
         return {"paper_id": paper_id, "figures": listing, "total": len(figures)}
@@ -1564,24 +1808,11 @@ def create_knowledge_router() -> APIRouter:
     @router.get("/papers/{paper_id}/figures/{fig_index}")
     async def get_paper_figure_image(paper_id: str, fig_index: int) -> Any:
         """Get a specific figure image as PNG."""
-        from fastapi.responses import Response
         from ..services.figure_extractor import extract_figures
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper:
-            raise HTTPException(404, "Paper not found")
-        pdf_path = None
-        if paper.task_id:
-            with Session(engine) as session:
-                task = session.get(Task, paper.task_id)
-                if task and task.original_pdf_path:
-                    pdf_path = task.original_pdf_path
-        if not pdf_path or not Path(pdf_path).exists():
-            raise HTTPException(404, "Original PDF not found")
-        figures = extract_figures(Path(pdf_path).read_bytes())
+        pdf_path = _paper_pdf_path(paper_id)
+        figures = await asyncio.to_thread(lambda: extract_figures(Path(pdf_path).read_bytes()))
         if fig_index < 0 or fig_index >= len(figures):
             raise HTTPException(404, "Figure not found")
-        import base64
         img_bytes = base64.b64decode(figures[fig_index]["data_b64"])
         return Response(content=img_bytes, media_type="image/png")
 
@@ -1589,19 +1820,8 @@ def create_knowledge_router() -> APIRouter:
     async def get_paper_tables(paper_id: str) -> dict[str, Any]:
         """Extract tables from a paper's PDF."""
         from ..services.figure_extractor import extract_tables_text
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper:
-            raise HTTPException(404, "Paper not found")
-        pdf_path = None
-        if paper.task_id:
-            with Session(engine) as session:
-                task = session.get(Task, paper.task_id)
-                if task and task.original_pdf_path:
-                    pdf_path = task.original_pdf_path
-        if not pdf_path or not Path(pdf_path).exists():
-            raise HTTPException(404, "Original PDF not found")
-        tables = extract_tables_text(Path(pdf_path).read_bytes())
+        pdf_path = _paper_pdf_path(paper_id)
+        tables = await asyncio.to_thread(lambda: extract_tables_text(Path(pdf_path).read_bytes()))
         return {"paper_id": paper_id, "tables": tables, "total": len(tables)}
 
     # ------------------------------------------------------------------
@@ -1609,7 +1829,7 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/papers/{paper_id}/similar")
-    async def get_similar_papers(paper_id: str, n: int = 5) -> dict[str, Any]:
+    def get_similar_papers(paper_id: str, n: int = 5) -> dict[str, Any]:
         """Find similar papers based on vector embeddings."""
         from ..services.vector_search import get_vector_service
         vs = get_vector_service()
@@ -1645,8 +1865,7 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/reading-progress/{item_id}")
-    async def get_reading_progress(item_id: str) -> dict[str, Any]:
-        from ..models.knowledge import ReadingProgress
+    def get_reading_progress(item_id: str) -> dict[str, Any]:
         with Session(engine) as session:
             prog = session.get(ReadingProgress, item_id)
         if not prog:
@@ -1655,8 +1874,6 @@ def create_knowledge_router() -> APIRouter:
 
     @router.put("/reading-progress/{item_id}")
     async def save_reading_progress(item_id: str, request: Request) -> dict[str, str]:
-        from datetime import datetime
-        from ..models.knowledge import ReadingProgress
         body = await request.json()
         with Session(engine) as session:
             prog = session.get(ReadingProgress, item_id)
@@ -1680,7 +1897,7 @@ def create_knowledge_router() -> APIRouter:
             paper = session.get(PaperKnowledge, paper_id)
         if not paper or not paper.knowledge_json:
             raise HTTPException(404, "Paper not found or no knowledge")
-        kj = json.loads(paper.knowledge_json)
+        kj = orjson.loads(paper.knowledge_json)
         if kj.get("tldr"):
             return {"tldr": kj["tldr"], "status": "already_exists"}
 
@@ -1698,34 +1915,36 @@ def create_knowledge_router() -> APIRouter:
             'Respond ONLY with JSON: {"tldr": {"en": "...", "zh": "..."}}\n\n'
             f"Title: {title}\nAbstract: {abstract}"
         )
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=30.0) as client:
-            # Use non-thinking model for simple TLDR generation
-            model = llm_config.get("model", "")
-            if "-thinking" in model:
-                model = model.replace("-thinking", "")
-            resp = await client.post(
-                "/chat/completions",
-                json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 200, "temperature": 0.1},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"},
-            )
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            content = (msg.get("content") or "").strip()
-            if not content:
-                content = msg.get("reasoning_content", "")
-            try:
-                start = content.find("{")
-                end = content.rfind("}")
-                tldr_data = json.loads(content[start:end+1]) if start >= 0 else {}
-            except Exception:
-                tldr_data = {"tldr": {"en": content[:100], "zh": ""}}
+        client = get_http_client()
+        # Use non-thinking model for simple TLDR generation
+        model = llm_config.model
+        if "-thinking" in model:
+            model = model.replace("-thinking", "")
+        resp = await client.post(
+            f"{llm_config.base_url}/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 200, "temperature": 0.1},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"},
+            timeout=30.0,
+        )
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        content = (msg.get("content") or "").strip()
+        if not content:
+            content = msg.get("reasoning_content", "")
+        try:
+            start = content.find("{")
+            end = content.rfind("}")
+            tldr_data = orjson.loads(content[start:end+1]) if start >= 0 else {}
+        except Exception:
+            tldr_data = {"tldr": {"en": content[:100], "zh": ""}}
 
         tldr = tldr_data.get("tldr", {})
         kj["tldr"] = tldr
         with Session(engine) as session:
             p = session.get(PaperKnowledge, paper_id)
             if p:
-                p.knowledge_json = json.dumps(kj, ensure_ascii=False)
+                p.knowledge_json = orjson.dumps(kj).decode()
+                p.updated_at = datetime.utcnow()
                 session.add(p)
                 session.commit()
         return {"tldr": tldr, "status": "generated"}
@@ -1737,14 +1956,15 @@ def create_knowledge_router() -> APIRouter:
     @router.get("/scholar-search")
     async def scholar_search(q: str, n: int = 5) -> dict[str, Any]:
         """Search Semantic Scholar for papers."""
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            r = await client.get(
-                "https://api.semanticscholar.org/graph/v1/paper/search",
-                params={"query": q, "limit": min(n, 10), "fields": "title,year,authors,citationCount,externalIds,abstract"},
-            )
-            if r.status_code != 200:
-                return {"results": [], "message": f"S2 API error: {r.status_code}"}
-            data = r.json()
+        client = get_http_client()
+        r = await client.get(
+            "https://api.semanticscholar.org/graph/v1/paper/search",
+            params={"query": q, "limit": min(n, 10), "fields": "title,year,authors,citationCount,externalIds,abstract"},
+            timeout=15.0,
+        )
+        if r.status_code != 200:
+            return {"results": [], "message": f"S2 API error: {r.status_code}"}
+        data = r.json()
         results = []
         for p in data.get("data", []):
             results.append({
@@ -1763,19 +1983,19 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.post("/papers/{paper_id}/share")
-    async def share_paper(paper_id: str) -> dict[str, Any]:
+    def share_paper(paper_id: str) -> dict[str, Any]:
         """Generate a share token for public access to paper knowledge."""
-        import uuid
         with Session(engine) as session:
             paper = session.get(PaperKnowledge, paper_id)
             if not paper or not paper.knowledge_json:
                 raise HTTPException(404, "Paper not found or no knowledge")
-            kj = json.loads(paper.knowledge_json)
+            kj = orjson.loads(paper.knowledge_json)
             token = kj.get("share_token")
             if not token:
-                token = uuid.uuid4().hex[:12]
+                token = secrets.token_hex(6)
                 kj["share_token"] = token
-                paper.knowledge_json = json.dumps(kj, ensure_ascii=False)
+                paper.knowledge_json = orjson.dumps(kj).decode()
+                paper.updated_at = datetime.utcnow()
                 session.add(paper)
                 session.commit()
         return {"token": token, "url": f"/share/{token}"}
@@ -1795,12 +2015,11 @@ def create_knowledge_router() -> APIRouter:
         missing = []
         for p in papers:
             if p.knowledge_json:
-                kj = json.loads(p.knowledge_json)
+                kj = orjson.loads(p.knowledge_json)
                 if not kj.get("tldr"):
                     missing.append(p.id)
         # Process in background
         async def _do_batch():
-            import asyncio as aio
             success, fail = 0, 0
             for pid in missing:
                 try:
@@ -1808,7 +2027,7 @@ def create_knowledge_router() -> APIRouter:
                         paper = session.get(PaperKnowledge, pid)
                     if not paper or not paper.knowledge_json:
                         continue
-                    kj = json.loads(paper.knowledge_json)
+                    kj = orjson.loads(paper.knowledge_json)
                     meta = kj.get("metadata", {})
                     title = meta.get("title", "")
                     if isinstance(title, dict): title = title.get("en", "") or title.get("zh", "")
@@ -1824,33 +2043,35 @@ def create_knowledge_router() -> APIRouter:
                         'Respond ONLY with JSON: {"tldr": {"en": "...", "zh": "..."}}\n\n'
                         f"Title: {title}\nAbstract: {abstract}"
                     )
-                    async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=30.0) as client:
-                        batch_model = llm_config.get("model", "")
-                        if "-thinking" in batch_model:
-                            batch_model = batch_model.replace("-thinking", "")
-                        resp = await client.post(
-                            "/chat/completions",
-                            json={"model": batch_model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 200, "temperature": 0.1},
-                            headers={"Authorization": f"Bearer {llm_config['api_key']}"},
-                        )
-                        resp.raise_for_status()
-                        msg = resp.json()["choices"][0]["message"]
-                        content = (msg.get("content") or "").strip()
-                        if not content:
-                            content = msg.get("reasoning_content", "")
-                        start = content.find("{"); end = content.rfind("}")
-                        tldr_data = json.loads(content[start:end+1]) if start >= 0 else {}
+                    client = get_http_client()
+                    batch_model = llm_config.model
+                    if "-thinking" in batch_model:
+                        batch_model = batch_model.replace("-thinking", "")
+                    resp = await client.post(
+                        f"{llm_config.base_url}/chat/completions",
+                        json={"model": batch_model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 200, "temperature": 0.1},
+                        headers={"Authorization": f"Bearer {llm_config.api_key}"},
+                        timeout=30.0,
+                    )
+                    resp.raise_for_status()
+                    msg = resp.json()["choices"][0]["message"]
+                    content = (msg.get("content") or "").strip()
+                    if not content:
+                        content = msg.get("reasoning_content", "")
+                    start = content.find("{"); end = content.rfind("}")
+                    tldr_data = orjson.loads(content[start:end+1]) if start >= 0 else {}
                     tldr = tldr_data.get("tldr", {})
                     kj["tldr"] = tldr
                     with Session(engine) as session:
                         p = session.get(PaperKnowledge, pid)
                         if p:
-                            p.knowledge_json = json.dumps(kj, ensure_ascii=False)
+                            p.knowledge_json = orjson.dumps(kj).decode()
+                            p.updated_at = datetime.utcnow()
                             session.add(p); session.commit()
                     success += 1
                 except Exception:
                     fail += 1
-                await aio.sleep(1)
+                await asyncio.sleep(1)
             logger.info("Batch TLDR: %d success, %d fail out of %d", success, fail, len(missing))
         asyncio.create_task(_do_batch())
         return {"queued": len(missing), "message": f"Generating TLDR for {len(missing)} papers in background"}
@@ -1862,11 +2083,9 @@ def create_knowledge_router() -> APIRouter:
     @router.post("/papers/{paper_id}/quiz")
     async def generate_quiz(paper_id: str, request: Request) -> dict[str, Any]:
         llm_config = get_llm_config(request)
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper or not paper.knowledge_json:
+        kj = _load_knowledge(paper_id)
+        if kj is None:
             raise HTTPException(404, "Paper not found or no knowledge")
-        kj = json.loads(paper.knowledge_json)
         meta = kj.get("metadata", {})
         title = meta.get("title", "")
         if isinstance(title, dict): title = title.get("en", "")
@@ -1882,18 +2101,18 @@ def create_knowledge_router() -> APIRouter:
             'Respond ONLY with JSON: {"questions": [{"question": "...", "options": ["A. ...", "B. ...", "C. ...", "D. ..."], "correct": "A", "explanation": "..."}]}\n\n'
             f"Title: {title}\nAbstract: {abstract}\nFindings: {findings}"
         )
-        model = llm_config.get("model", "")
+        model = llm_config.model
         if "-thinking" in model: model = model.replace("-thinking", "")
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=60.0) as client:
-            resp = await client.post("/chat/completions",
-                json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 2000, "temperature": 0.3},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"})
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        client = get_http_client()
+        resp = await client.post(f"{llm_config.base_url}/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 2000, "temperature": 0.3},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"}, timeout=60.0)
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
         try:
             start = content.find("{"); end = content.rfind("}")
-            data = json.loads(content[start:end+1]) if start >= 0 else {"questions": []}
+            data = orjson.loads(content[start:end+1]) if start >= 0 else {"questions": []}
         except Exception:
             data = {"questions": []}
         return {"questions": data.get("questions", []), "paper_id": paper_id}
@@ -1905,11 +2124,9 @@ def create_knowledge_router() -> APIRouter:
     @router.post("/papers/{paper_id}/briefing")
     async def generate_briefing(paper_id: str, request: Request) -> dict[str, Any]:
         llm_config = get_llm_config(request)
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper or not paper.knowledge_json:
+        kj = _load_knowledge(paper_id)
+        if kj is None:
             raise HTTPException(404, "Paper not found or no knowledge")
-        kj = json.loads(paper.knowledge_json)
         meta = kj.get("metadata", {})
         title = meta.get("title", "")
         if isinstance(title, dict): title = title.get("en", "")
@@ -1929,15 +2146,15 @@ def create_knowledge_router() -> APIRouter:
             "## Key Results\n## Limitations\n## Implications\nBe concise and specific.\n\n"
             f"Title: {title}\nAbstract: {abstract}\nFindings:\n{findings}\nMethods:\n{methods}"
         )
-        model = llm_config.get("model", "")
+        model = llm_config.model
         if "-thinking" in model: model = model.replace("-thinking", "")
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=120.0) as client:
-            resp = await client.post("/chat/completions",
-                json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 3000, "temperature": 0.2},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"})
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        client = get_http_client()
+        resp = await client.post(f"{llm_config.base_url}/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 3000, "temperature": 0.2},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"}, timeout=120.0)
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
         return {"briefing": content, "paper_id": paper_id}
 
     # ------------------------------------------------------------------
@@ -1947,7 +2164,6 @@ def create_knowledge_router() -> APIRouter:
     @router.post("/deep-research")
     async def deep_research(request: Request) -> dict[str, Any]:
         """Given a topic, search papers, gather knowledge, and generate expert synthesis."""
-        from ..services.deep_research import DeepResearchService
         llm_config = get_llm_config(request)
         body = await request.json()
         topic = body.get("topic", "").strip()
@@ -1960,12 +2176,10 @@ def create_knowledge_router() -> APIRouter:
 
         # Persist report
         if result.get("status") == "completed":
-            import uuid
-            from ..models.knowledge import ResearchReport
             report = ResearchReport(
-                id=f"rr_{uuid.uuid4().hex[:12]}", topic=topic,
+                id=f"rr_{secrets.token_hex(6)}", topic=topic,
                 synthesis=result.get("synthesis", ""),
-                papers_json=json.dumps(result.get("papers", []), ensure_ascii=False),
+                papers_json=orjson.dumps(result.get("papers", [])).decode(),
                 papers_found=result.get("papers_found", 0),
             )
             with Session(engine) as session:
@@ -1982,7 +2196,6 @@ def create_knowledge_router() -> APIRouter:
     @router.post("/expert-chat")
     async def expert_chat(request: Request) -> dict[str, Any]:
         """Expert-level chat that searches for relevant knowledge before answering."""
-        from ..services.paper_chat import PaperChatService
         from ..services.vector_search import get_vector_service
         llm_config = get_llm_config(request)
         body = await request.json()
@@ -2041,17 +2254,17 @@ def create_knowledge_router() -> APIRouter:
                 "Research knowledge:\n" + "\n".join(context_parts[:40])
             )
 
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=120.0) as client:
-            messages = [{"role": "system", "content": system_prompt}]
-            if history:
-                messages.extend(history[-6:])
-            messages.append({"role": "user", "content": message})
-            resp = await client.post("/chat/completions",
-                json={"model": llm_config.get("model", ""), "messages": messages, "temperature": 0.3, "max_tokens": 3000},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"})
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            reply = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        client = get_http_client()
+        messages = [{"role": "system", "content": system_prompt}]
+        if history:
+            messages.extend(history[-6:])
+        messages.append({"role": "user", "content": message})
+        resp = await client.post(f"{llm_config.base_url}/chat/completions",
+            json={"model": llm_config.model, "messages": messages, "temperature": 0.3, "max_tokens": 3000},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"}, timeout=120.0)
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        reply = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
 
         return {"reply": reply, "sources": sources[:20], "context_chunks": len(context_parts), "mode": mode}
 
@@ -2060,20 +2273,18 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/research-history")
-    async def list_research_history() -> list[dict[str, Any]]:
-        from ..models.knowledge import ResearchReport
+    def list_research_history() -> list[dict[str, Any]]:
         with Session(engine) as session:
             reports = session.exec(select(ResearchReport).order_by(ResearchReport.created_at.desc()).limit(50)).all()
         return [{"id": r.id, "topic": r.topic, "papers_found": r.papers_found, "created_at": r.created_at.isoformat() if r.created_at else None} for r in reports]
 
     @router.get("/research-history/{report_id}")
-    async def get_research_report(report_id: str) -> dict[str, Any]:
-        from ..models.knowledge import ResearchReport
+    def get_research_report(report_id: str) -> dict[str, Any]:
         with Session(engine) as session:
             r = session.get(ResearchReport, report_id)
         if not r:
             raise HTTPException(404, "Report not found")
-        return {"id": r.id, "topic": r.topic, "synthesis": r.synthesis, "papers": json.loads(r.papers_json) if r.papers_json else [], "papers_found": r.papers_found, "created_at": r.created_at.isoformat() if r.created_at else None}
+        return {"id": r.id, "topic": r.topic, "synthesis": r.synthesis, "papers": orjson.loads(r.papers_json) if r.papers_json else [], "papers_found": r.papers_found, "created_at": r.created_at.isoformat() if r.created_at else None}
 
     # ------------------------------------------------------------------
     # PDF Thumbnail (first page as image)
@@ -2082,26 +2293,19 @@ def create_knowledge_router() -> APIRouter:
     @router.get("/papers/{paper_id}/thumbnail")
     async def get_paper_thumbnail(paper_id: str):
         """Generate and return a thumbnail of the paper's first page."""
-        from fastapi.responses import Response
         import fitz
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper:
-            raise HTTPException(404, "Paper not found")
-        pdf_path = None
-        if paper.task_id:
-            with Session(engine) as session:
-                task = session.get(Task, paper.task_id)
-                if task and task.original_pdf_path:
-                    pdf_path = task.original_pdf_path
-        if not pdf_path or not Path(pdf_path).exists():
-            raise HTTPException(404, "PDF not found")
-        try:
+        pdf_path = _paper_pdf_path(paper_id)
+
+        def _render() -> bytes:
             doc = fitz.open(pdf_path)
-            page = doc.load_page(0)
-            pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))  # 50% scale
-            img_bytes = pix.tobytes("png")
-            doc.close()
+            try:
+                pix = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(0.5, 0.5))  # 50% scale
+                return pix.tobytes("png")
+            finally:
+                doc.close()
+
+        try:
+            img_bytes = await asyncio.to_thread(_render)
             return Response(content=img_bytes, media_type="image/png", headers={"Cache-Control": "public, max-age=86400"})
         except Exception:
             raise HTTPException(500, "Failed to generate thumbnail")
@@ -2111,16 +2315,13 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/papers/{paper_id}/tags")
-    async def get_paper_tags(paper_id: str) -> list[str]:
-        from ..models.knowledge import PaperTag
+    def get_paper_tags(paper_id: str) -> list[str]:
         with Session(engine) as session:
             tags = session.exec(select(PaperTag).where(PaperTag.paper_id == paper_id)).all()
         return [t.tag for t in tags]
 
     @router.post("/papers/{paper_id}/tags")
     async def add_paper_tag(paper_id: str, request: Request) -> dict[str, Any]:
-        import uuid
-        from ..models.knowledge import PaperTag
         body = await request.json()
         tag = body.get("tag", "").strip().lower()
         if not tag:
@@ -2128,13 +2329,12 @@ def create_knowledge_router() -> APIRouter:
         with Session(engine) as session:
             existing = session.exec(select(PaperTag).where(PaperTag.paper_id == paper_id, PaperTag.tag == tag)).first()
             if not existing:
-                session.add(PaperTag(id=f"tag_{uuid.uuid4().hex[:8]}", paper_id=paper_id, tag=tag))
+                session.add(PaperTag(id=f"tag_{secrets.token_hex(4)}", paper_id=paper_id, tag=tag))
                 session.commit()
         return {"status": "added", "tag": tag}
 
     @router.delete("/papers/{paper_id}/tags/{tag}")
-    async def remove_paper_tag(paper_id: str, tag: str) -> dict[str, str]:
-        from ..models.knowledge import PaperTag
+    def remove_paper_tag(paper_id: str, tag: str) -> dict[str, str]:
         with Session(engine) as session:
             t = session.exec(select(PaperTag).where(PaperTag.paper_id == paper_id, PaperTag.tag == tag)).first()
             if t:
@@ -2143,10 +2343,8 @@ def create_knowledge_router() -> APIRouter:
         return {"status": "removed"}
 
     @router.get("/tags")
-    async def list_all_tags() -> list[dict[str, Any]]:
+    def list_all_tags() -> list[dict[str, Any]]:
         """List all unique tags with paper counts."""
-        from ..models.knowledge import PaperTag
-        from sqlmodel import func
         with Session(engine) as session:
             results = session.exec(
                 select(PaperTag.tag, func.count(PaperTag.id).label("count"))
@@ -2172,20 +2370,18 @@ def create_knowledge_router() -> APIRouter:
         # Gather paper contexts
         papers_context = []
         with Session(engine) as session:
-            for pid in paper_ids[:15]:
-                p = session.get(PaperKnowledge, pid)
-                if p and p.knowledge_json:
-                    kj = json.loads(p.knowledge_json)
-                    meta = kj.get("metadata", {})
-                    title = meta.get("title", "")
-                    if isinstance(title, dict): title = title.get("en", "")
-                    abstract = meta.get("abstract", "")
-                    if isinstance(abstract, dict): abstract = abstract.get("en", "")
-                    findings = "; ".join(
-                        (f.get("statement", {}).get("en", "") if isinstance(f.get("statement"), dict) else str(f.get("statement", "")))
-                        for f in kj.get("findings", [])[:5]
-                    )
-                    papers_context.append(f"Paper: {title}\nAbstract: {abstract[:300]}\nFindings: {findings}")
+            papers_json = _load_papers_json(session, paper_ids[:15])
+        for kj in papers_json:
+            meta = kj.get("metadata", {})
+            title = meta.get("title", "")
+            if isinstance(title, dict): title = title.get("en", "")
+            abstract = meta.get("abstract", "")
+            if isinstance(abstract, dict): abstract = abstract.get("en", "")
+            findings = "; ".join(
+                (f.get("statement", {}).get("en", "") if isinstance(f.get("statement"), dict) else str(f.get("statement", "")))
+                for f in kj.get("findings", [])[:5]
+            )
+            papers_context.append(f"Paper: {title}\nAbstract: {abstract[:300]}\nFindings: {findings}")
 
         cols_str = ", ".join(columns)
         cols_example = ", ".join(f'"{c}": "value"' for c in columns)
@@ -2197,18 +2393,18 @@ def create_knowledge_router() -> APIRouter:
             f'Respond ONLY with JSON: {{"rows": [{{"paper": "title", {cols_example}}}]}}\n\n'
             + papers_text
         )
-        model = llm_config.get("model", "")
+        model = llm_config.model
         if "-thinking" in model: model = model.replace("-thinking", "")
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=120.0) as client:
-            resp = await client.post("/chat/completions",
-                json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 3000, "temperature": 0.1},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"})
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        client = get_http_client()
+        resp = await client.post(f"{llm_config.base_url}/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 3000, "temperature": 0.1},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"}, timeout=120.0)
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
         try:
             start = content.find("{"); end = content.rfind("}")
-            data = json.loads(content[start:end+1]) if start >= 0 else {"rows": []}
+            data = orjson.loads(content[start:end+1]) if start >= 0 else {"rows": []}
         except Exception:
             data = {"rows": []}
         return {"columns": columns, "rows": data.get("rows", []), "paper_count": len(papers_context)}
@@ -2233,24 +2429,22 @@ def create_knowledge_router() -> APIRouter:
         # Gather context
         context_parts = []
         with Session(engine) as session:
-            for pid in paper_ids[:15]:
-                p = session.get(PaperKnowledge, pid)
-                if p and p.knowledge_json:
-                    kj = json.loads(p.knowledge_json)
-                    meta = kj.get("metadata", {})
-                    title = meta.get("title", "")
-                    if isinstance(title, dict): title = title.get("en", "")
-                    abstract = meta.get("abstract", "")
-                    if isinstance(abstract, dict): abstract = abstract.get("en", "")
-                    findings_list = []
-                    for f in kj.get("findings", [])[:5]:
-                        s = f.get("statement", "")
-                        findings_list.append(s.get("en", "") if isinstance(s, dict) else str(s))
-                    methods_list = []
-                    for m in kj.get("methods", [])[:3]:
-                        n = m.get("name", "")
-                        methods_list.append(n.get("en", "") if isinstance(n, dict) else str(n))
-                    context_parts.append(f"[{len(context_parts)+1}] {title}\nAbstract: {abstract[:300]}\nFindings: {'; '.join(findings_list)}\nMethods: {', '.join(methods_list)}")
+            papers_json = _load_papers_json(session, paper_ids[:15])
+        for kj in papers_json:
+            meta = kj.get("metadata", {})
+            title = meta.get("title", "")
+            if isinstance(title, dict): title = title.get("en", "")
+            abstract = meta.get("abstract", "")
+            if isinstance(abstract, dict): abstract = abstract.get("en", "")
+            findings_list = []
+            for f in kj.get("findings", [])[:5]:
+                s = f.get("statement", "")
+                findings_list.append(s.get("en", "") if isinstance(s, dict) else str(s))
+            methods_list = []
+            for m in kj.get("methods", [])[:3]:
+                n = m.get("name", "")
+                methods_list.append(n.get("en", "") if isinstance(n, dict) else str(n))
+            context_parts.append(f"[{len(context_parts)+1}] {title}\nAbstract: {abstract[:300]}\nFindings: {'; '.join(findings_list)}\nMethods: {', '.join(methods_list)}")
 
         section_prompts = {
             "introduction": "Write an Introduction section that motivates the research problem, reviews key related work, and states the contribution.",
@@ -2269,15 +2463,15 @@ def create_knowledge_router() -> APIRouter:
             "Write in formal academic style. Output as Markdown.\n\n"
             f"Reference papers:\n{context_text}"
         )
-        model = llm_config.get("model", "")
+        model = llm_config.model
         if "-thinking" in model: model = model.replace("-thinking", "")
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=180.0) as client:
-            resp = await client.post("/chat/completions",
-                json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 4000, "temperature": 0.3},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"})
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        client = get_http_client()
+        resp = await client.post(f"{llm_config.base_url}/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 4000, "temperature": 0.3},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"}, timeout=180.0)
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
         return {"section": section, "content": content, "paper_count": len(context_parts)}
 
     # ------------------------------------------------------------------
@@ -2311,21 +2505,26 @@ def create_knowledge_router() -> APIRouter:
         recs = [h for h in hits if h.get("paper_id") not in existing_ids]
 
         # Enrich with paper details
+        # 一条 IN 查询取全部候选，TLDR 用 json_extract 取出，不读整块 knowledge_json
+        recs = recs[:8]
+        with Session(engine) as session:
+            rows = session.exec(
+                select(
+                    PaperKnowledge.id, PaperKnowledge.title, PaperKnowledge.year,
+                    case(
+                        (func.json_valid(PaperKnowledge.knowledge_json),
+                         func.json_extract(PaperKnowledge.knowledge_json, "$.tldr.en")),
+                        else_=None,
+                    ).label("tldr"),
+                ).where(PaperKnowledge.id.in_([r.get("paper_id", "") for r in recs]))
+            ).all()
+        by_id = {p.id: p for p in rows}
         enriched = []
-        with Session(engine) as session:
-            for r in recs[:8]:
-                p = session.get(PaperKnowledge, r.get("paper_id", ""))
-                if p:
-                    tldr = ""
-                    if p.knowledge_json:
-                        try:
-                            kj = json.loads(p.knowledge_json)
-                            tldr_obj = kj.get("tldr", {})
-                            if isinstance(tldr_obj, dict):
-                                tldr = tldr_obj.get("en", "")
-                        except Exception:
-                            pass
-                    enriched.append({"paper_id": p.id, "title": p.title, "year": p.year, "tldr": tldr, "score": r.get("score", 0)})
+        for r in recs:
+            p = by_id.get(r.get("paper_id", ""))
+            if p:
+                tldr = p.tldr if isinstance(p.tldr, str) else ""
+                enriched.append({"paper_id": p.id, "title": p.title, "year": p.year, "tldr": tldr, "score": r.get("score", 0)})
 
         return {"recommendations": enriched, "based_on": len(recent)}
 
@@ -2334,13 +2533,11 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/papers/{paper_id}/mindmap")
-    async def get_paper_mindmap(paper_id: str) -> dict[str, Any]:
+    def get_paper_mindmap(paper_id: str) -> dict[str, Any]:
         """Generate mind map data from paper entities and relationships."""
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper or not paper.knowledge_json:
+        kj = _load_knowledge(paper_id)
+        if kj is None:
             raise HTTPException(404, "Paper not found")
-        kj = json.loads(paper.knowledge_json)
         meta = kj.get("metadata", {})
         title = meta.get("title", "")
         if isinstance(title, dict): title = title.get("en", "")
@@ -2407,13 +2604,13 @@ def create_knowledge_router() -> APIRouter:
         # Step 1: Search
         search_results = []
         for attempt in range(3):
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                r = await client.get("https://api.semanticscholar.org/graph/v1/paper/search",
-                    params={"query": query, "limit": max_papers, "fields": "title,year,authors,citationCount,abstract,externalIds"})
-                if r.status_code == 429:
-                    await asyncio.sleep(5 * (attempt + 1)); continue
-                if r.status_code == 200:
-                    search_results = r.json().get("data", []); break
+            client = get_http_client()
+            r = await client.get("https://api.semanticscholar.org/graph/v1/paper/search",
+                params={"query": query, "limit": max_papers, "fields": "title,year,authors,citationCount,abstract,externalIds"}, timeout=20.0)
+            if r.status_code == 429:
+                await asyncio.sleep(5 * (attempt + 1)); continue
+            if r.status_code == 200:
+                search_results = r.json().get("data", []); break
 
         if not search_results:
             # Fallback to arXiv
@@ -2440,19 +2637,19 @@ def create_knowledge_router() -> APIRouter:
         for i, p in enumerate(search_results):
             screen_prompt += f"[{i}] {p.get('title','')} — {(p.get('abstract') or '')[:200]}\n"
 
-        model = llm_config.get("model", "")
+        model = llm_config.model
         if "-thinking" in model: model = model.replace("-thinking", "")
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=120.0) as client:
-            resp = await client.post("/chat/completions",
-                json={"model": model, "messages": [{"role": "user", "content": screen_prompt}], "max_tokens": 2000, "temperature": 0.1},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"})
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        client = get_http_client()
+        resp = await client.post(f"{llm_config.base_url}/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": screen_prompt}], "max_tokens": 2000, "temperature": 0.1},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"}, timeout=120.0)
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
 
         try:
             start = content.find("{"); end = content.rfind("}")
-            screen_data = json.loads(content[start:end+1]) if start >= 0 else {"decisions": []}
+            screen_data = orjson.loads(content[start:end+1]) if start >= 0 else {"decisions": []}
         except Exception:
             screen_data = {"decisions": []}
 
@@ -2485,11 +2682,9 @@ def create_knowledge_router() -> APIRouter:
     async def generate_slides(paper_id: str, request: Request) -> dict[str, Any]:
         """Generate presentation slides from paper knowledge."""
         llm_config = get_llm_config(request)
-        with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
-        if not paper or not paper.knowledge_json:
+        kj = _load_knowledge(paper_id)
+        if kj is None:
             raise HTTPException(404, "Paper not found")
-        kj = json.loads(paper.knowledge_json)
         meta = kj.get("metadata", {})
         title = meta.get("title", "")
         if isinstance(title, dict): title = title.get("en", "")
@@ -2511,18 +2706,18 @@ def create_knowledge_router() -> APIRouter:
             'Respond ONLY with JSON: {"slides": [...]}\n\n'
             f"Paper: {title}\nAbstract: {abstract[:400]}\nFindings: {findings}\nMethods: {methods}"
         )
-        model = llm_config.get("model", "")
+        model = llm_config.model
         if "-thinking" in model: model = model.replace("-thinking", "")
-        async with httpx.AsyncClient(base_url=llm_config.get("base_url", ""), timeout=120.0) as client:
-            resp = await client.post("/chat/completions",
-                json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 3000, "temperature": 0.2},
-                headers={"Authorization": f"Bearer {llm_config['api_key']}"})
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        client = get_http_client()
+        resp = await client.post(f"{llm_config.base_url}/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": 3000, "temperature": 0.2},
+            headers={"Authorization": f"Bearer {llm_config.api_key}"}, timeout=120.0)
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        content = (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
         try:
             start = content.find("{"); end = content.rfind("}")
-            data = json.loads(content[start:end+1]) if start >= 0 else {"slides": []}
+            data = orjson.loads(content[start:end+1]) if start >= 0 else {"slides": []}
         except Exception:
             data = {"slides": []}
 
@@ -2548,7 +2743,7 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/preferences")
-    async def get_preferences(request: Request) -> dict[str, Any]:
+    def get_preferences(request: Request) -> dict[str, Any]:
         """Get user preferences (stored server-side keyed by client ID)."""
         client_id = get_client_id(request)
         # Simple file-based storage
@@ -2556,7 +2751,7 @@ def create_knowledge_router() -> APIRouter:
         prefs_dir.mkdir(parents=True, exist_ok=True)
         prefs_file = prefs_dir / f"{client_id}.json"
         if prefs_file.exists():
-            return json.loads(prefs_file.read_text())
+            return orjson.loads(prefs_file.read_text())
         return {"radar_topics": "", "notification_email": "", "language": "en", "theme": "system"}
 
     @router.put("/preferences")
@@ -2570,7 +2765,7 @@ def create_knowledge_router() -> APIRouter:
         # Only save allowed fields
         allowed = {"radar_topics", "notification_email", "language", "theme", "default_mode", "highlight_default"}
         prefs = {k: v for k, v in body.items() if k in allowed}
-        prefs_file.write_text(json.dumps(prefs, ensure_ascii=False))
+        prefs_file.write_text(orjson.dumps(prefs).decode())
         return {"status": "saved"}
 
     # ------------------------------------------------------------------
@@ -2578,32 +2773,38 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/papers/{paper_id}/impact")
-    async def get_paper_impact(paper_id: str) -> dict[str, Any]:
+    def get_paper_impact(paper_id: str) -> dict[str, Any]:
         """Calculate composite impact score for a paper."""
+        # 年份、TLDR 与实体/关系数一条查询取齐，不读整块 knowledge_json
         with Session(engine) as session:
-            paper = session.get(PaperKnowledge, paper_id)
+            paper = session.exec(
+                select(
+                    PaperKnowledge.year,
+                    case(
+                        (func.json_valid(PaperKnowledge.knowledge_json),
+                         func.json_extract(PaperKnowledge.knowledge_json, "$.tldr")),
+                        else_=None,
+                    ).label("tldr"),
+                    select(func.count(KnowledgeEntity.id))
+                    .where(KnowledgeEntity.paper_id == paper_id).scalar_subquery().label("ent_count"),
+                    select(func.count(KnowledgeRelationship.id))
+                    .where(KnowledgeRelationship.paper_id == paper_id).scalar_subquery().label("rel_count"),
+                ).where(PaperKnowledge.id == paper_id)
+            ).first()
         if not paper:
             raise HTTPException(404, "Paper not found")
 
         scores = {"citations": 0, "year_recency": 0, "kb_connections": 0, "has_tldr": 0}
 
-        # Citation count from OpenAlex or knowledge
-        if paper.knowledge_json:
-            kj = json.loads(paper.knowledge_json)
-            # Check if enriched with OpenAlex data
-            meta = kj.get("metadata", {})
-            scores["has_tldr"] = 10 if kj.get("tldr") else 0
+        # json_extract 对对象/数组返回 JSON 文本，空的 {} / [] 同样算没有
+        scores["has_tldr"] = 10 if paper.tldr not in (None, "", "{}", "[]") else 0
 
         # Year recency (newer = higher)
         if paper.year:
             scores["year_recency"] = max(0, min(20, (paper.year - 2020) * 4))
 
         # KB connections (entities, relationships)
-        with Session(engine) as session:
-            from sqlmodel import func
-            ent_count = session.exec(select(func.count(KnowledgeEntity.id)).where(KnowledgeEntity.paper_id == paper_id)).one()
-            rel_count = session.exec(select(func.count(KnowledgeRelationship.id)).where(KnowledgeRelationship.paper_id == paper_id)).one()
-        scores["kb_connections"] = min(30, (ent_count + rel_count) * 2)
+        scores["kb_connections"] = min(30, (paper.ent_count + paper.rel_count) * 2)
 
         # Similar papers count
         try:
@@ -2626,11 +2827,19 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/timeline")
-    async def get_paper_timeline() -> dict[str, Any]:
+    def get_paper_timeline() -> dict[str, Any]:
         """Get papers organized by year for timeline visualization."""
+        # TLDR 用 json_extract 取出，不读整块 knowledge_json
         with Session(engine) as session:
             papers = session.exec(
-                select(PaperKnowledge).where(PaperKnowledge.extraction_status == "completed")
+                select(
+                    PaperKnowledge.id, PaperKnowledge.title, PaperKnowledge.venue, PaperKnowledge.year,
+                    case(
+                        (func.json_valid(PaperKnowledge.knowledge_json),
+                         func.json_extract(PaperKnowledge.knowledge_json, "$.tldr.en")),
+                        else_=None,
+                    ).label("tldr"),
+                ).where(PaperKnowledge.extraction_status == "completed")
             ).all()
 
         timeline: dict[int, list] = {}
@@ -2638,15 +2847,7 @@ def create_knowledge_router() -> APIRouter:
             year = p.year or 0
             if year < 2000:
                 continue
-            tldr = ""
-            if p.knowledge_json:
-                try:
-                    kj = json.loads(p.knowledge_json)
-                    tldr_obj = kj.get("tldr", {})
-                    if isinstance(tldr_obj, dict):
-                        tldr = tldr_obj.get("en", "")
-                except Exception:
-                    pass
+            tldr = p.tldr if isinstance(p.tldr, str) else ""
             timeline.setdefault(year, []).append({
                 "id": p.id, "title": p.title, "venue": p.venue, "tldr": tldr,
             })
@@ -2662,26 +2863,36 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/benchmarks")
-    async def get_benchmark_tracker() -> dict[str, Any]:
+    def get_benchmark_tracker() -> dict[str, Any]:
         """Extract and track benchmark results across papers."""
-        with Session(engine) as session:
-            papers = session.exec(
-                select(PaperKnowledge).where(PaperKnowledge.extraction_status == "completed")
+        # json_each 在 SQLite 里展开 findings 并只保留 result 类，Python 只拿到标题和陈述文本
+        # 非法 JSON 换成 '{}' 再展开，json_each 不会因个别坏行报错
+        valid_json = case(
+            (func.json_valid(PaperKnowledge.knowledge_json), PaperKnowledge.knowledge_json), else_="{}",
+        )
+        findings = func.json_each(valid_json, "$.findings").table_valued("value").alias("f")
+        with Session(engine) as session:
+            rows = session.exec(
+                select(
+                    PaperKnowledge.id, PaperKnowledge.year, _json_text("$.metadata.title").label("title"),
+                    case(
+                        (func.json_type(findings.c.value, "$.statement") == "object",
+                         func.json_extract(findings.c.value, "$.statement.en")),
+                        else_=func.json_extract(findings.c.value, "$.statement"),
+                    ).label("statement"),
+                )
+                .select_from(PaperKnowledge)
+                .join(findings, true())
+                .where(
+                    PaperKnowledge.extraction_status == "completed",
+                    func.json_extract(findings.c.value, "$.type") == "result",
+                )
             ).all()
 
-        entries = []
-        for p in papers:
-            if not p.knowledge_json:
-                continue
-            kj = json.loads(p.knowledge_json)
-            title = kj.get("metadata", {}).get("title", "")
-            if isinstance(title, dict): title = title.get("en", "")
-            for f in kj.get("findings", []):
-                if f.get("type") == "result":
-                    stmt = f.get("statement", "")
-                    if isinstance(stmt, dict): stmt = stmt.get("en", "")
-                    entries.append({"paper": title[:60], "paper_id": p.id, "year": p.year, "finding": stmt})
-
+        entries = [
+            {"paper": (r.title or "")[:60], "paper_id": r.id, "year": r.year, "finding": r.statement or ""}
+            for r in rows
+        ]
         return {"entries": entries, "total": len(entries)}
 
     # ------------------------------------------------------------------
@@ -2689,7 +2900,7 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/notes")
-    async def get_quick_notes(request: Request) -> dict[str, str]:
+    def get_quick_notes(request: Request) -> dict[str, str]:
         client_id = get_client_id(request)
         notes_file = Path("/app/data/preferences") / f"{client_id}_notes.md"
         if notes_file.exists():
@@ -2731,17 +2942,17 @@ def create_knowledge_router() -> APIRouter:
         # Use Semantic Scholar to check if paper has community engagement
         if arxiv_id:
             try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    r = await client.get(f"https://api.semanticscholar.org/graph/v1/paper/ArXiv:{arxiv_id}",
-                        params={"fields": "citationCount,influentialCitationCount,tldr"})
-                    if r.status_code == 200:
-                        data = r.json()
-                        discussions.append({
-                            "source": "Semantic Scholar",
-                            "url": f"https://www.semanticscholar.org/paper/{data.get('paperId', '')}",
-                            "title": f"{data.get('citationCount', 0)} citations ({data.get('influentialCitationCount', 0)} influential)",
-                            "snippet": (data.get("tldr") or {}).get("text", ""),
-                        })
+                client = get_http_client()
+                r = await client.get(f"https://api.semanticscholar.org/graph/v1/paper/ArXiv:{arxiv_id}",
+                    params={"fields": "citationCount,influentialCitationCount,tldr"}, timeout=10.0)
+                if r.status_code == 200:
+                    data = r.json()
+                    discussions.append({
+                        "source": "Semantic Scholar",
+                        "url": f"https://www.semanticscholar.org/paper/{data.get('paperId', '')}",
+                        "title": f"{data.get('citationCount', 0)} citations ({data.get('influentialCitationCount', 0)} influential)",
+                        "snippet": (data.get("tldr") or {}).get("text", ""),
+                    })
             except Exception:
                 pass
 
@@ -2778,7 +2989,7 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/dependency-graph")
-    async def get_dependency_graph() -> dict[str, Any]:
+    def get_dependency_graph() -> dict[str, Any]:
         """Build a dependency graph showing which papers build on which."""
         with Session(engine) as session:
             papers = session.exec(
@@ -2792,7 +3003,7 @@ def create_knowledge_router() -> APIRouter:
         for p in papers:
             if not p.knowledge_json:
                 continue
-            kj = json.loads(p.knowledge_json)
+            kj = orjson.loads(p.knowledge_json)
             meta = kj.get("metadata", {})
             title = meta.get("title", "")
             if isinstance(title, dict): title = title.get("en", "")
@@ -2838,36 +3049,30 @@ def create_knowledge_router() -> APIRouter:
         if not paper_ids:
             # Default: all papers with errors or incomplete extraction
             with Session(engine) as session:
-                papers = session.exec(
-                    select(PaperKnowledge).where(
-                        PaperKnowledge.extraction_status.in_(["error", "imported", "pending"])
+                paper_ids = list(session.exec(
+                    select(PaperKnowledge.id).where(
+                        PaperKnowledge.extraction_status.in_(["error", "imported", "pending"]),
+                        PaperKnowledge.task_id.is_not(None),
                     )
-                ).all()
-                paper_ids = [p.id for p in papers if p.task_id]
+                ).all())
+
+        # 论文与任务一次 JOIN 取齐，不再逐篇两次 session.get
+        candidates = paper_ids[:20]
+        with Session(engine) as session:
+            rows = session.exec(
+                select(PaperKnowledge.id, Task.task_id, Task.original_pdf_path)
+                .join(Task, Task.task_id == PaperKnowledge.task_id)
+                .where(PaperKnowledge.id.in_(candidates))
+            ).all()
+        by_id = {row.id: row for row in rows}
 
         queued = 0
-        for pid in paper_ids[:20]:
-            with Session(engine) as session:
-                paper = session.get(PaperKnowledge, pid)
-            if not paper or not paper.task_id:
-                continue
-            with Session(engine) as session:
-                task = session.get(Task, paper.task_id)
-            if not task or not task.original_pdf_path or not Path(task.original_pdf_path).exists():
+        for pid in candidates:
+            row = by_id.get(pid)
+            if not row or not row.original_pdf_path or not Path(row.original_pdf_path).exists():
                 continue
 
-            pdf_bytes = Path(task.original_pdf_path).read_bytes()
-            from ..services.knowledge_extractor import KnowledgeExtractor
-            extractor = KnowledgeExtractor(
-                api_key=llm_config["api_key"], model=llm_config.get("model", ""), base_url=llm_config.get("base_url", ""),
-            )
-            async def _do(ext, pdf, tid, pid):
-                try:
-                    async with ext:
-                        await ext.extract(pdf, tid, user_id=0, paper_id=pid)
-                except Exception:
-                    pass
-            asyncio.create_task(_do(extractor, pdf_bytes, paper.task_id, pid))
+            enqueue_extraction(_extractor(llm_config), Path(row.original_pdf_path), row.task_id, pid)
             queued += 1
 
         return {"queued": queued, "total_candidates": len(paper_ids)}
@@ -2877,10 +3082,8 @@ def create_knowledge_router() -> APIRouter:
     # ------------------------------------------------------------------
 
     @router.get("/api-status")
-    async def get_api_status() -> dict[str, Any]:
+    def get_api_status() -> dict[str, Any]:
         """Show API usage status and rate limit info."""
-        import time
-        from ..core.config import get_config
         cfg = get_config()
 
         status = {
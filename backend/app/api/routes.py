@@ -1,24 +1,34 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
+import re
+import shutil
+import tempfile
 import time
+import zipfile
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 
 import httpx
+import orjson
 from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from sqlalchemy import case, func
+from sqlmodel import Session, select
 
 from ..core.config import get_config
+from ..core.db import engine
+from ..core.http import get_http_client
+from ..models.knowledge import PaperKnowledge
 from ..models.task import TaskStatus
 from ..services.document_processor import DocumentProcessor
 from ..services.task_manager import TaskManager
-from .deps import get_llm_config, get_client_id
+from .deps import get_client_key, get_llm_config
 
 logger = logging.getLogger(__name__)
 
@@ -33,15 +43,16 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     router = APIRouter(prefix="/api", tags=["documents"])
     cfg = get_config()
     # Per-client semaphores: each user (identified by API key prefix) gets their own concurrency limit
-    _client_semaphores: dict[str, asyncio.Semaphore] = {}
+    _client_semaphores: dict[int, asyncio.Semaphore] = {}
     _max_concurrent = cfg.processing.max_concurrent
     _queue: list[str] = []  # track queued task_ids for position info
     limiter = Limiter(key_func=get_remote_address)
 
-    def _get_semaphore(client_id: str) -> asyncio.Semaphore:
-        if client_id not in _client_semaphores:
-            _client_semaphores[client_id] = asyncio.Semaphore(_max_concurrent)
-        return _client_semaphores[client_id]
+    def _get_semaphore(client_key: int) -> asyncio.Semaphore:
+        sem = _client_semaphores.get(client_key)
+        if sem is None:
+            sem = _client_semaphores[client_key] = asyncio.Semaphore(_max_concurrent)
+        return sem
 
     @router.post("/upload")
     @limiter.limit("10/minute")
@@ -52,7 +63,7 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
         highlight: bool = Form(False),
     ) -> dict[str, Any]:
         llm_config = get_llm_config(request)
-        client_id = get_client_id(request)
+        client_key = get_client_key(request)
 
         if mode not in ("translate", "simplify", "zh2en"):
             raise HTTPException(status_code=400, detail="mode must be 'translate', 'simplify', or 'zh2en'")
@@ -77,7 +88,7 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
                 f"Queued (position {queue_pos - _max_concurrent})"
             )
 
-        sem = _get_semaphore(client_id)
+        sem = _get_semaphore(client_key)
 
         async def _process_with_limit() -> None:
             async with sem:
@@ -101,7 +112,6 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
             raise HTTPException(400, "url is required")
 
         # Extract arXiv ID from various URL formats
-        import re
         arxiv_id = None
         patterns = [
             r"arxiv\.org/abs/(\d+\.\d+(?:v\d+)?)",
@@ -120,11 +130,11 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
         filename = f"arxiv_{arxiv_id}.pdf"
 
         # Download PDF
-        async with httpx.AsyncClient(timeout=120.0, follow_redirects=True) as client:
-            resp = await client.get(pdf_url)
-            if resp.status_code != 200:
-                raise HTTPException(400, f"Failed to download PDF: HTTP {resp.status_code}")
-            file_bytes = resp.content
+        client = get_http_client()
+        resp = await client.get(pdf_url, timeout=120.0, follow_redirects=True)
+        if resp.status_code != 200:
+            raise HTTPException(400, f"Failed to download PDF: HTTP {resp.status_code}")
+        file_bytes = resp.content
 
         task = task_manager.create_task(filename, mode=mode, highlight=highlight)
         original_path = Path(task_manager.config.storage.temp_dir) / f"{task.task_id}_original.pdf"
@@ -132,8 +142,8 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
             f.write(file_bytes)
         task_manager.update_original_path(task.task_id, str(original_path))
 
-        client_id = get_client_id(request)
-        sem = _get_semaphore(client_id)
+        client_key = get_client_key(request)
+        sem = _get_semaphore(client_key)
 
         async def _process():
             async with sem:
@@ -145,7 +155,6 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     @router.post("/batch-import")
     async def batch_import(request: Request) -> dict[str, Any]:
         """Import multiple papers by arXiv IDs, DOIs, or BibTeX."""
-        import re
         llm_config = get_llm_config(request)
         body = await request.json()
         ids = body.get("ids", [])  # list of arXiv IDs or DOIs
@@ -190,21 +199,21 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
             if not arxiv_id and (pid.startswith("doi:") or pid.startswith("10.")):
                 doi = pid.replace("doi:", "").strip()
                 try:
-                    async with httpx.AsyncClient(timeout=15.0) as client:
-                        resp = await client.get(f"https://api.openalex.org/works/doi:{doi}", params={"select": "ids,title"})
-                        if resp.status_code == 200:
-                            oa_data = resp.json()
-                            oa_ids = oa_data.get("ids", {})
-                            # Try to get arXiv ID from OpenAlex
-                            openalex_url = oa_ids.get("openalex", "")
-                            if "arxiv" in str(oa_ids):
-                                # OpenAlex sometimes has arxiv in ids
-                                for k, v in oa_ids.items():
-                                    if "arxiv" in str(v).lower():
-                                        m2 = re.search(r'(\d{4}\.\d{4,5})', str(v))
-                                        if m2:
-                                            arxiv_id = m2.group(1)
-                                            break
+                    client = get_http_client()
+                    resp = await client.get(f"https://api.openalex.org/works/doi:{doi}", params={"select": "ids,title"}, timeout=15.0)
+                    if resp.status_code == 200:
+                        oa_data = resp.json()
+                        oa_ids = oa_data.get("ids", {})
+                        # Try to get arXiv ID from OpenAlex
+                        openalex_url = oa_ids.get("openalex", "")
+                        if "arxiv" in str(oa_ids):
+                            # OpenAlex sometimes has arxiv in ids
+                            for k, v in oa_ids.items():
+                                if "arxiv" in str(v).lower():
+                                    m2 = re.search(r'(\d{4}\.\d{4,5})', str(v))
+                                    if m2:
+                                        arxiv_id = m2.group(1)
+                                        break
                 except Exception:
                     pass
 
@@ -212,15 +221,15 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
                 pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
                 filename = f"arxiv_{arxiv_id}.pdf"
                 try:
-                    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                        resp = await client.get(pdf_url)
-                        if resp.status_code != 200:
-                            results.append({"id": pid, "status": "failed", "reason": f"HTTP {resp.status_code}"})
-                            continue
-                        file_bytes = resp.content
+                    client = get_http_client()
+                    resp = await client.get(pdf_url, timeout=30.0, follow_redirects=True)
+                    if resp.status_code != 200:
+                        results.append({"id": pid, "status": "failed", "reason": f"HTTP {resp.status_code}"})
+                        continue
+                    file_bytes = resp.content
                     task = task_manager.create_task(filename, mode=mode, highlight=highlight)
                     original_path = Path(task_manager.config.storage.temp_dir) / f"{task.task_id}_original.pdf"
-                    original_path.write_bytes(file_bytes)
+                    await asyncio.to_thread(original_path.write_bytes, file_bytes)
                     task_manager.update_original_path(task.task_id, str(original_path))
                     asyncio.create_task(processor.process(task.task_id, file_bytes, filename, mode=mode, highlight=highlight, llm_config=llm_config))
                     results.append({"id": pid, "status": "queued", "task_id": task.task_id})
@@ -281,7 +290,7 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
             "error": progress.error,
         }
         if task.highlight_stats:
-            result["highlight_stats"] = json.loads(task.highlight_stats)
+            result["highlight_stats"] = orjson.loads(task.highlight_stats)
         return result
 
     @router.get("/result/{task_id}/preview", response_class=HTMLResponse)
@@ -322,21 +331,20 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     @router.get("/status/{task_id}/stream")
     async def stream_status(task_id: str):
         """SSE endpoint for real-time task progress."""
-        from starlette.responses import StreamingResponse
 
         async def event_generator():
             prev = ""
             while True:
                 task = task_manager.get_task(task_id)
                 if not task:
-                    yield f"data: {json.dumps({'error': 'not_found'})}\n\n"
+                    yield f"data: {orjson.dumps({'error': 'not_found'}).decode()}\n\n"
                     return
-                payload = json.dumps({
+                payload = orjson.dumps({
                     "status": task.status,
                     "percent": task.percent,
                     "message": task.message,
                     "error": task.error,
-                })
+                }).decode()
                 if payload != prev:
                     yield f"data: {payload}\n\n"
                     prev = payload
@@ -387,28 +395,27 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     @router.get("/radar/trending")
     async def radar_trending(days: int = 7) -> dict[str, Any]:
         """Get trending papers from HuggingFace over N days"""
-        from datetime import datetime, timedelta
         papers = []
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for i in range(min(days, 30)):
-                date = (datetime.utcnow() - timedelta(days=i)).strftime("%Y-%m-%d")
-                try:
-                    resp = await client.get("https://huggingface.co/api/daily_papers", params={"date": date, "limit": 50})
-                    if resp.status_code == 200:
-                        for item in resp.json():
-                            p = item.get("paper", {})
-                            if p.get("id"):
-                                papers.append({
-                                    "arxiv_id": p["id"],
-                                    "title": p.get("title", ""),
-                                    "upvotes": p.get("upvotes", 0),
-                                    "authors": [a.get("name", "") for a in (p.get("authors") or [])[:3]],
-                                    "published": p.get("publishedAt", ""),
-                                    "pdf_url": f"https://arxiv.org/pdf/{p['id']}.pdf",
-                                    "date": date,
-                                })
-                except Exception:
-                    pass
+        client = get_http_client()
+        for i in range(min(days, 30)):
+            date = (datetime.utcnow() - timedelta(days=i)).strftime("%Y-%m-%d")
+            try:
+                resp = await client.get("https://huggingface.co/api/daily_papers", params={"date": date, "limit": 50}, timeout=30.0)
+                if resp.status_code == 200:
+                    for item in resp.json():
+                        p = item.get("paper", {})
+                        if p.get("id"):
+                            papers.append({
+                                "arxiv_id": p["id"],
+                                "title": p.get("title", ""),
+                                "upvotes": p.get("upvotes", 0),
+                                "authors": [a.get("name", "") for a in (p.get("authors") or [])[:3]],
+                                "published": p.get("publishedAt", ""),
+                                "pdf_url": f"https://arxiv.org/pdf/{p['id']}.pdf",
+                                "date": date,
+                            })
+            except Exception:
+                pass
         # Deduplicate and sort by upvotes
         seen = set()
         unique = []
@@ -442,11 +449,8 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     @router.get("/radar/recommendations")
     async def get_recommendations() -> dict[str, Any]:
         """Get paper recommendations based on knowledge base papers"""
-        from sqlmodel import Session, select
-        from ..core.db import engine as db_eng
-        from ..models.knowledge import PaperKnowledge
         # Get arxiv IDs from knowledge base
-        with Session(db_eng) as session:
+        with Session(engine) as session:
             papers = session.exec(select(PaperKnowledge).where(PaperKnowledge.extraction_status == "completed")).all()
         if not papers:
             return {"recommendations": [], "message": "No papers in knowledge base yet"}
@@ -458,42 +462,43 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
 
         # Call S2 recommendations API
         s2_ids = []
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            for aid in arxiv_ids:
-                try:
-                    resp = await client.get(f"https://api.semanticscholar.org/graph/v1/paper/ArXiv:{aid}", params={"fields": "paperId"})
-                    if resp.status_code == 200:
-                        s2_ids.append(resp.json().get("paperId", ""))
-                except Exception:
-                    pass
-                if len(s2_ids) >= 3:
-                    break
+        client = get_http_client()
+        for aid in arxiv_ids:
+            try:
+                resp = await client.get(f"https://api.semanticscholar.org/graph/v1/paper/ArXiv:{aid}", params={"fields": "paperId"}, timeout=15.0)
+                if resp.status_code == 200:
+                    s2_ids.append(resp.json().get("paperId", ""))
+            except Exception:
+                pass
+            if len(s2_ids) >= 3:
+                break
 
         if not s2_ids:
             return {"recommendations": [], "message": "Could not resolve paper IDs"}
 
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                resp = await client.post(
-                    "https://api.semanticscholar.org/recommendations/v1/papers/",
-                    params={"limit": 10, "fields": "paperId,externalIds,title,abstract,citationCount,year,authors"},
-                    json={"positivePaperIds": s2_ids},
-                )
-                if resp.status_code == 200:
-                    recs = resp.json().get("recommendedPapers", [])
-                    results = []
-                    for r in recs:
-                        aid = (r.get("externalIds") or {}).get("ArXiv", "")
-                        results.append({
-                            "arxiv_id": aid,
-                            "title": r.get("title", ""),
-                            "abstract": (r.get("abstract") or "")[:300],
-                            "citations": r.get("citationCount", 0),
-                            "year": r.get("year"),
-                            "authors": [a.get("name", "") for a in (r.get("authors") or [])[:3]],
-                            "pdf_url": f"https://arxiv.org/pdf/{aid}.pdf" if aid else "",
-                        })
-                    return {"recommendations": results, "based_on": len(s2_ids)}
+            client = get_http_client()
+            resp = await client.post(
+                "https://api.semanticscholar.org/recommendations/v1/papers/",
+                params={"limit": 10, "fields": "paperId,externalIds,title,abstract,citationCount,year,authors"},
+                json={"positivePaperIds": s2_ids},
+                timeout=15.0,
+            )
+            if resp.status_code == 200:
+                recs = resp.json().get("recommendedPapers", [])
+                results = []
+                for r in recs:
+                    aid = (r.get("externalIds") or {}).get("ArXiv", "")
+                    results.append({
+                        "arxiv_id": aid,
+                        "title": r.get("title", ""),
+                        "abstract": (r.get("abstract") or "")[:300],
+                        "citations": r.get("citationCount", 0),
+                        "year": r.get("year"),
+                        "authors": [a.get("name", "") for a in (r.get("authors") or [])[:3]],
+                        "pdf_url": f"https://arxiv.org/pdf/{aid}.pdf" if aid else "",
+                    })
+                return {"recommendations": results, "based_on": len(s2_ids)}
         except Exception:
             pass
 
@@ -520,11 +525,8 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     # ------------------------------------------------------------------
 
     @router.get("/backup")
-    async def create_backup() -> FileResponse:
+    def create_backup() -> FileResponse:
         """Create a ZIP backup of the entire database and vector store."""
-        import shutil
-        import tempfile
-        from datetime import datetime
         ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         backup_name = f"paperradar_backup_{ts}"
         with tempfile.TemporaryDirectory() as tmp:
@@ -548,15 +550,12 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     @router.post("/restore")
     async def restore_backup(file: UploadFile = File(...)) -> dict[str, str]:
         """Restore from a backup ZIP file."""
-        import shutil
-        import tempfile
         if not file.filename or not file.filename.endswith(".zip"):
             raise HTTPException(400, "Must be a .zip file")
         content = await file.read()
         with tempfile.TemporaryDirectory() as tmp:
             zip_path = Path(tmp) / "backup.zip"
             zip_path.write_bytes(content)
-            import zipfile
             with zipfile.ZipFile(zip_path, "r") as zf:
                 zf.extractall(tmp)
             # Find the backup directory
@@ -582,31 +581,33 @@ def create_router(task_manager: TaskManager, processor: DocumentProcessor) -> AP
     # ------------------------------------------------------------------
 
     @router.get("/share/{token}")
-    async def get_shared_paper(token: str):
-        from sqlmodel import Session, select
-        from ..core.db import engine as db_eng
-        from ..models.knowledge import PaperKnowledge
-        with Session(db_eng) as session:
-            papers = session.exec(
-                select(PaperKnowledge).where(PaperKnowledge.extraction_status == "completed")
-            ).all()
-        for p in papers:
-            if not p.knowledge_json:
-                continue
-            kj = json.loads(p.knowledge_json)
-            if kj.get("share_token") == token:
-                meta = kj.get("metadata", {})
-                return {
-                    "title": meta.get("title", ""),
-                    "authors": meta.get("authors", []),
-                    "year": meta.get("year"),
-                    "abstract": meta.get("abstract", ""),
-                    "tldr": kj.get("tldr", {}),
-                    "findings": kj.get("findings", [])[:10],
-                    "methods": kj.get("methods", [])[:5],
-                    "entities": kj.get("entities", [])[:10],
-                    "shared": True,
-                }
+    def get_shared_paper(token: str):
+        # 在 SQLite 里按 share_token 过滤，只解析命中的那一篇的 knowledge_json
+        with Session(engine) as session:
+            kj_text = session.exec(
+                select(PaperKnowledge.knowledge_json).where(
+                    PaperKnowledge.extraction_status == "completed",
+                    case(
+                        (func.json_valid(PaperKnowledge.knowledge_json),
+                         func.json_extract(PaperKnowledge.knowledge_json, "$.share_token")),
+                        else_=None,
+                    ) == token,
+                )
+            ).first()
+        if kj_text:
+            kj = orjson.loads(kj_text)
+            meta = kj.get("metadata", {})
+            return {
+                "title": meta.get("title", ""),
+                "authors": meta.get("authors", []),
+                "year": meta.get("year"),
+                "abstract": meta.get("abstract", ""),
+                "tldr": kj.get("tldr", {}),
+                "findings": kj.get("findings", [])[:10],
+                "methods": kj.get("methods", [])[:5],
+                "entities": kj.get("entities", [])[:10],
+                "shared": True,
+            }
         raise HTTPException(status_code=404, detail="Shared paper not found")
 
     return router
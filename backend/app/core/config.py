@@ -1,14 +1,22 @@
 from __future__ import annotations
 
 import os
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 import yaml
 from pydantic import BaseModel, Field
 
 
+class LLMCredentials(NamedTuple):
+    """Resolved per-request LLM endpoint (server config or BYOK headers)."""
+
+    base_url: str
+    api_key: str
+    model: str
+
+
 class LLMConfig(BaseModel):
     api_key: str = Field("", alias="api_key")
     base_url: str = Field("https://api.openai.com/v1", alias="base_url")
@@ -19,6 +27,7 @@ class LLMConfig(BaseModel):
 
 class ProcessingConfig(BaseModel):
     max_concurrent: int = Field(3, alias="max_concurrent")
+    max_extractions: int = Field(2, alias="max_extractions")
 
 
 class RadarConfig(BaseModel):
@@ -62,11 +71,16 @@ class DatabaseConfig(BaseModel):
 class SecurityConfig(BaseModel):
     secret_key: str = Field("CHANGE_THIS_TO_A_SECURE_SECRET_KEY", alias="secret_key")
     api_token: str = Field("", alias="api_token")
+    password_pepper: str = Field("", alias="password_pepper")
     cors_origins: list[str] = Field(
         default=["http://localhost:5173", "http://127.0.0.1:5173"],
         alias="cors_origins",
     )
 
+    @cached_property
+    def api_token_bytes(self) -> bytes:
+        return self.api_token.encode()
+
 
 class AppConfig(BaseModel):
     llm: LLMConfig
@@ -88,7 +102,7 @@ def _load_yaml(path: Path) -> dict[str, Any]:
     return data
 
 
-@lru_cache
+@lru_cache(maxsize=1)
 def get_config() -> AppConfig:
     candidates = [
         Path(os.getenv("APP_CONFIG_PATH", "")),
@@ -1,6 +1,11 @@
 import logging
+import os
+import sqlite3
 from collections.abc import Generator
 
+import orjson
+from sqlalchemy import MetaData, event
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlmodel import Session, SQLModel, create_engine
 
 from .config import get_config
@@ -10,7 +15,32 @@ logger = logging.getLogger(__name__)
 config = get_config()
 
 connect_args = {"check_same_thread": False} if "sqlite" in config.database.url else {}
-engine = create_engine(config.database.url, echo=False, connect_args=connect_args)
+# 连接池常驻，不做 pre-ping；内存 SQLite 用默认的 SingletonThreadPool，不接受池大小参数
+pool_args = {} if ":memory:" in config.database.url else {"pool_size": (os.cpu_count() or 1) * 2}
+engine = create_engine(
+    config.database.url,
+    echo=False,
+    connect_args=connect_args,
+    pool_pre_ping=False,
+    pool_recycle=1800,
+    # JSON 列（标签等）用 orjson 编解码
+    json_serializer=lambda obj: orjson.dumps(obj).decode(),
+    json_deserializer=orjson.loads,
+    **pool_args,
+)
+
+
+if "sqlite" in config.database.url:
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record) -> None:
+        # WAL 允许读写并发；连接常驻池中，页缓存随连接复用
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
 
 
 def init_db():
@@ -35,6 +65,10 @@ def init_db():
 
     SQLModel.metadata.create_all(engine)
     _migrate_db()
+    _migrate_collection_papers(engine)
+    _ensure_indexes()
+    if "sqlite" in cfg.database.url:
+        ensure_entity_fts(engine)
 
 
 def _migrate_db() -> None:
@@ -42,6 +76,8 @@ def _migrate_db() -> None:
     migrations = [
         ("task", "highlight", "BOOLEAN DEFAULT 0"),
         ("task", "highlight_stats", "TEXT"),
+        ("paperknowledge", "bibtex_cached", "TEXT"),
+        ("paperknowledge", "csl_cached", "TEXT"),
     ]
     with engine.connect() as conn:
         for table, column, col_type in migrations:
@@ -57,6 +93,99 @@ def _migrate_db() -> None:
                 logger.debug("Migration skip %s.%s: %s", table, column, exc)
 
 
+def _migrate_collection_papers(bind) -> None:
+    """Move legacy PaperCollection.paper_ids_json arrays into the collectionpaper table."""
+    from ..models.knowledge import PaperCollection
+
+    with bind.begin() as conn:
+        existing = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(papercollection)")]
+        if "paper_ids_json" not in existing:
+            return
+        # 按数组顺序插入，自增 id 保留原有排序；非法 JSON 视为空数组
+        copied = conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO collectionpaper (collection_id, paper_id, added_at) "
+            "SELECT c.id, j.value, c.updated_at FROM papercollection AS c, "
+            "json_each(CASE WHEN json_valid(c.paper_ids_json) THEN c.paper_ids_json ELSE '[]' END) AS j "
+            "WHERE j.type = 'text' ORDER BY c.id, j.key"
+        ).rowcount
+        logger.info("Migrated: copied %d papercollection.paper_ids_json entries into collectionpaper", copied)
+        # 旧列 NOT NULL 且无默认值，不删掉的话新建收藏夹会插入失败
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            conn.exec_driver_sql("ALTER TABLE papercollection DROP COLUMN paper_ids_json")
+        else:
+            # DROP COLUMN 需要 SQLite 3.35+：按模型建新表、复制其余列、删旧表再改名，同一事务内完成。
+            # 索引随旧表删除，由随后的 _ensure_indexes 按模型重建
+            columns = ", ".join(c.name for c in PaperCollection.__table__.columns)
+            rebuilt = PaperCollection.__table__.to_metadata(MetaData(), name="papercollection_rebuild")
+            conn.execute(CreateTable(rebuilt))
+            conn.exec_driver_sql(
+                f"INSERT INTO papercollection_rebuild ({columns}) SELECT {columns} FROM papercollection"
+            )
+            conn.exec_driver_sql("DROP TABLE papercollection")
+            conn.exec_driver_sql("ALTER TABLE papercollection_rebuild RENAME TO papercollection")
+    logger.info("Migrated: dropped papercollection.paper_ids_json")
+
+
+def _ensure_indexes() -> None:
+    """Create indexes declared on models that pre-existing tables are missing.
+
+    create_all() only creates indexes together with a new table, so indexes added to
+    a model later would otherwise never reach an existing database.
+    """
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    # IF NOT EXISTS 不需要反射已有索引（表达式索引无法反射）
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                except Exception as exc:
+                    logger.debug("Index skip %s: %s", index.name, exc)
+
+
+# ----------------------------------------------------------------------
+# 实体全文索引 (SQLite FTS5)
+# ----------------------------------------------------------------------
+
+# trigram 分词保留 LIKE '%q%' 的子串语义（大小写不敏感），但走索引而非全表扫描。
+# knowledgeentity 主键是 TEXT，隐式 rowid 会在 VACUUM 时重新编号，所以索引里存 entity_id 而不是引用 rowid
+_ENTITY_FTS_DDL = [
+    "CREATE VIRTUAL TABLE entity_fts USING fts5(name, entity_id UNINDEXED, tokenize='trigram')",
+    "CREATE TRIGGER entity_fts_ai AFTER INSERT ON knowledgeentity BEGIN "
+    "INSERT INTO entity_fts(name, entity_id) VALUES (new.name, new.id); END",
+    "CREATE TRIGGER entity_fts_ad AFTER DELETE ON knowledgeentity BEGIN "
+    "DELETE FROM entity_fts WHERE entity_id = old.id; END",
+    "CREATE TRIGGER entity_fts_au AFTER UPDATE OF id, name ON knowledgeentity BEGIN "
+    "UPDATE entity_fts SET name = new.name, entity_id = new.id WHERE entity_id = old.id; END",
+    # 已有实体一次性灌入索引
+    "INSERT INTO entity_fts(name, entity_id) SELECT name, id FROM knowledgeentity",
+]
+
+# 旧版本按 rowid 关联的外部内容索引：连同触发器一起删掉重建
+_ENTITY_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS entity_fts_ai",
+    "DROP TRIGGER IF EXISTS entity_fts_ad",
+    "DROP TRIGGER IF EXISTS entity_fts_au",
+    "DROP TABLE IF EXISTS entity_fts",
+]
+
+
+def ensure_entity_fts(bind) -> None:
+    """Create the entity_fts index and its sync triggers if they do not exist yet."""
+    try:
+        with bind.begin() as conn:
+            existing = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'entity_fts'"
+            ).scalar()
+            if existing and "entity_id" in existing:
+                return
+            for stmt in (_ENTITY_FTS_DROP if existing else []) + _ENTITY_FTS_DDL:
+                conn.exec_driver_sql(stmt)
+        logger.info("Created entity_fts index")
+    except Exception as exc:
+        # SQLite 未编译 FTS5/trigram 时整体回滚，搜索退回 LIKE 查询
+        logger.warning("entity_fts unavailable: %s", exc)
+
+
 def get_session() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    with Session(engine, expire_on_commit=False) as session:
         yield session
@@ -0,0 +1,21 @@
+import httpx
+
+# 进程内共享的出站 HTTP 客户端：连接池按主机复用 keep-alive 连接，省去每个请求的 TCP/TLS 握手。
+# 各调用点按需传 timeout 覆盖默认值；应用关闭时由 close_http_client 释放
+_LIMITS = httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30)
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=10.0), limits=_LIMITS)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
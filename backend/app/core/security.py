@@ -1,6 +1,10 @@
+import hashlib
+import hmac
 from datetime import datetime, timedelta
 from typing import Any
 
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from jose import jwt
 from passlib.context import CryptContext
 
@@ -8,18 +12,44 @@ from .config import get_config
 
 config = get_config()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id, OWASP 推荐参数 (t=2, m=46 MiB, p=1)
+password_hasher = PasswordHasher(time_cost=2, memory_cost=47104, parallelism=1)
+# 仅用于校验旧的 bcrypt 哈希，登录成功后会重新哈希为 argon2id
+legacy_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = "HS256"
-SECRET_KEY = config.security.secret_key
+# HS256 保持不变；密钥以 bytes 常驻，签名时无需每次编码
+SECRET_KEY = config.security.secret_key.encode()
+PASSWORD_PEPPER = config.security.password_pepper.encode()
+
+
+def _is_legacy_hash(hashed_password: str) -> bool:
+    return hashed_password.startswith("$2")
+
+
+def _pepper(password: str) -> str:
+    if not PASSWORD_PEPPER:
+        return password
+    return hmac.new(PASSWORD_PEPPER, password.encode(), hashlib.sha256).hexdigest()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    if _is_legacy_hash(hashed_password):
+        return legacy_pwd_context.verify(plain_password, hashed_password)
+    try:
+        return password_hasher.verify(hashed_password, _pepper(plain_password))
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    if _is_legacy_hash(hashed_password):
+        return True
+    return password_hasher.check_needs_rehash(hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(_pepper(password))
 
 
 def create_access_token(subject: str | Any, expires_delta: timedelta = None) -> str:
@@ -14,8 +14,9 @@ from slowapi.util import get_remote_address
 
 from .api.routes import create_router
 from .api.knowledge_routes import create_knowledge_router
-from .core.config import get_config
+from .core.config import LLMCredentials, get_config
 from .core.db import init_db
+from .core.http import close_http_client
 import logging
 from .core.logger import setup_logging
 
@@ -168,7 +169,7 @@ async def on_startup() -> None:
                 continue
             requeued.add(t.filename)
             pdf_bytes = Path(t.original_pdf_path).read_bytes()
-            llm_cfg = {"base_url": config.llm.base_url, "api_key": config.llm.api_key, "model": config.llm.model}
+            llm_cfg = LLMCredentials(config.llm.base_url, config.llm.api_key, config.llm.model)
             asyncio.create_task(
                 processor.process(t.task_id, pdf_bytes, t.filename, mode=t.mode or "translate", highlight=t.highlight or False, llm_config=llm_cfg)
             )
@@ -232,3 +233,8 @@ async def on_startup() -> None:
                 except Exception:
                     logger.exception("Daily digest failed")
         asyncio.create_task(_digest_loop())
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await close_http_client()
@@ -4,10 +4,14 @@ from __future__ import annotations
 
 from datetime import datetime
 
+from sqlalchemy import JSON, Column, Index, UniqueConstraint, func
 from sqlmodel import Field, SQLModel
 
 
 class PaperKnowledge(SQLModel, table=True):
+    # 已完成论文的缓存令牌 count()/max(updated_at) 可以只读这个覆盖索引
+    __table_args__ = (Index("ix_paperknowledge_status_updated", "extraction_status", "updated_at"),)
+
     id: str = Field(primary_key=True)
     task_id: str | None = Field(default=None, index=True)
     user_id: int = Field(default=0, index=True)
@@ -19,30 +23,33 @@ class PaperKnowledge(SQLModel, table=True):
     venue: str | None = Field(default=None)
 
     knowledge_json: str | None = Field(default=None)
+    # 导出用的预渲染结果，提取完成时写入（metadata 之后不会再变）
+    bibtex_cached: str | None = Field(default=None)
+    csl_cached: str | None = Field(default=None)
 
     extraction_status: str = Field(default="pending")
     extraction_model: str | None = Field(default=None)
     extraction_error: str | None = Field(default=None)
 
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class KnowledgeEntity(SQLModel, table=True):
     id: str = Field(primary_key=True)
-    paper_id: str = Field(foreign_key="paperknowledge.id", index=True)
+    paper_id: str = Field(foreign_key="paperknowledge.id", ondelete="CASCADE", index=True)
     user_id: int = Field(default=0, index=True)
 
     name: str = Field(index=True)
     type: str
-    aliases_json: str | None = Field(default=None)
+    aliases_json: list[str] | None = Field(default=None, sa_column=Column("aliases_json", JSON(none_as_null=True)))
     definition: str | None = Field(default=None)
     importance: float = Field(default=0.5)
 
 
 class KnowledgeRelationship(SQLModel, table=True):
     id: str = Field(primary_key=True)
-    paper_id: str = Field(foreign_key="paperknowledge.id", index=True)
+    paper_id: str = Field(foreign_key="paperknowledge.id", ondelete="CASCADE", index=True)
     user_id: int = Field(default=0, index=True)
 
     source_entity_id: str = Field(index=True)
@@ -54,44 +61,64 @@ class KnowledgeRelationship(SQLModel, table=True):
 
 class Flashcard(SQLModel, table=True):
     id: str = Field(primary_key=True)
-    paper_id: str = Field(foreign_key="paperknowledge.id", index=True)
+    paper_id: str = Field(foreign_key="paperknowledge.id", ondelete="CASCADE", index=True)
     user_id: int = Field(default=0, index=True)
 
     front: str
     back: str
-    tags_json: str | None = Field(default=None)
+    # JSON 列：读取时由 SQLAlchemy 反序列化，兼容已有的 JSON 文本数据
+    tags_json: list[str] | None = Field(default=None, sa_column=Column("tags_json", JSON(none_as_null=True)))
     difficulty: int = Field(default=3)
 
     interval_days: float = Field(default=1.0)
     ease_factor: float = Field(default=2.5)
     repetitions: int = Field(default=0)
-    next_review: datetime = Field(default_factory=datetime.utcnow)
+    next_review: datetime = Field(default_factory=datetime.utcnow, index=True)
     last_review: datetime | None = Field(default=None)
 
 
 class UserAnnotation(SQLModel, table=True):
+    # 按论文列出批注：paper_id 等值过滤 + (created_at, id) 倒序游标，一次索引范围扫描
+    __table_args__ = (Index("ix_userannotation_paper_created", "paper_id", "created_at", "id"),)
+
     id: str = Field(primary_key=True)
-    paper_id: str = Field(foreign_key="paperknowledge.id", index=True)
+    paper_id: str = Field(foreign_key="paperknowledge.id", ondelete="CASCADE", index=True)
     user_id: int = Field(default=0, index=True)
 
     type: str
     content: str
     target_type: str = Field(default="paper")
     target_id: str = Field(default="")
-    tags_json: str | None = Field(default=None)
+    # {"tags": [...], "color": "..."}；早期数据可能是纯标签列表
+    tags_json: dict | list | None = Field(default=None, sa_column=Column("tags_json", JSON(none_as_null=True)))
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+def _sql_now() -> dict:
+    # 时间戳由数据库在 INSERT 语句里生成（CURRENT_TIMESTAMP，UTC）；
+    # server_default 给新建的表，default 让缺少列默认值的旧库同样生效
+    return {"default": func.now(), "server_default": func.now()}
+
+
 class PaperCollection(SQLModel, table=True):
     id: str = Field(primary_key=True)
     user_id: int = Field(default=0, index=True)
     name: str = Field(index=True)
     description: str = Field(default="")
     color: str = Field(default="blue")
-    paper_ids_json: str = Field(default="[]")  # JSON array of paper_id strings
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default=None, sa_column_kwargs=_sql_now())
+    updated_at: datetime = Field(default=None, sa_column_kwargs=_sql_now())
+
+
+class CollectionPaper(SQLModel, table=True):
+    # 收藏夹成员关系；唯一约束兼作 (collection_id, paper_id) 复合索引，增删成员不再整行重写 JSON 数组
+    __table_args__ = (UniqueConstraint("collection_id", "paper_id"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    collection_id: str = Field(foreign_key="papercollection.id", ondelete="CASCADE", index=True)
+    paper_id: str = Field(index=True)
+    added_at: datetime = Field(default=None, sa_column_kwargs=_sql_now())
 
 
 class ReadingEvent(SQLModel, table=True):
@@ -100,7 +127,7 @@ class ReadingEvent(SQLModel, table=True):
     paper_id: str = Field(default="", index=True)
     task_id: str = Field(default="", index=True)
     event_type: str = Field(default="view")  # view, read, annotate, chat, export
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default=None, index=True, sa_column_kwargs=_sql_now())
 
 
 class ReadingProgress(SQLModel, table=True):
@@ -124,3 +151,11 @@ class PaperTag(SQLModel, table=True):
     paper_id: str = Field(index=True)
     tag: str = Field(index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CacheEntry(SQLModel, table=True):
+    """进程间共享的 KV 缓存（多 worker 共用，重启不丢），值为 JSON 文本"""
+
+    key: str = Field(primary_key=True)
+    value_json: str
+    expires_at: datetime = Field(index=True)
@@ -1,14 +1,18 @@
 from datetime import datetime
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel
 
 
 class UserBase(SQLModel):
-    email: str = Field(unique=True, index=True)
+    email: str
     is_active: bool = Field(default=True)
 
 
 class User(UserBase, table=True):
+    # 邮箱大小写不敏感唯一；登录按 lower(email) 查找同样走这个索引，不再另建 email 列索引
+    __table_args__ = (Index("ix_user_email_lower", text("lower(email)"), unique=True),)
+
     id: int | None = Field(default=None, primary_key=True)
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,50 @@
+"""数据库支撑的 KV 缓存 - 多个 uvicorn worker 共享，带过期时间"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+import orjson
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from ..core.db import engine
+from ..models.knowledge import CacheEntry
+
+
+def get_cached(key: str) -> Any | None:
+    """读取未过期的缓存值；不存在或已过期返回 None。"""
+    with Session(engine) as session:
+        value_json = session.exec(
+            select(CacheEntry.value_json).where(CacheEntry.key == key, CacheEntry.expires_at > datetime.utcnow())
+        ).first()
+    return orjson.loads(value_json) if value_json is not None else None
+
+
+def set_cached(key: str, value: Any, ttl_seconds: int) -> None:
+    """写入缓存值，顺带清掉已过期的条目。"""
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.exec(delete(CacheEntry).where(CacheEntry.expires_at <= now))
+        session.merge(
+            CacheEntry(
+                key=key,
+                value_json=orjson.dumps(value).decode(),
+                expires_at=now + timedelta(seconds=ttl_seconds),
+            )
+        )
+        session.commit()
+
+
+async def get_or_fetch(key: str, ttl_seconds: int, fetch: Callable[[], Awaitable[Any]]) -> Any | None:
+    """Cache-aside：命中直接返回；未命中时调用 fetch，结果不为 None 才写入缓存。"""
+    cached = await asyncio.to_thread(get_cached, key)
+    if cached is not None:
+        return cached
+    value = await fetch()
+    if value is not None:
+        await asyncio.to_thread(set_cached, key, value, ttl_seconds)
+    return value
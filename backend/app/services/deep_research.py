@@ -10,7 +10,7 @@ from datetime import datetime
 import httpx
 from sqlmodel import Session, select
 
-from ..core.config import get_config
+from ..core.config import LLMCredentials, get_config
 from ..core.db import engine
 from ..models.knowledge import PaperKnowledge
 
@@ -58,10 +58,10 @@ Papers:
 
 
 class DeepResearchService:
-    def __init__(self, llm_config: dict) -> None:
-        self.api_key = llm_config["api_key"]
-        self.model = llm_config.get("model", "")
-        self.base_url = llm_config.get("base_url", "")
+    def __init__(self, llm_config: LLMCredentials) -> None:
+        self.api_key = llm_config.api_key
+        self.model = llm_config.model
+        self.base_url = llm_config.base_url
         # Use non-thinking model for synthesis
         if "-thinking" in self.model:
             self.model = self.model.replace("-thinking", "")
@@ -12,7 +12,7 @@ import tempfile
 from pathlib import Path
 from string import Template
 
-from ..core.config import AppConfig
+from ..core.config import AppConfig, LLMCredentials
 from ..models.task import TaskResult, TaskStatus
 from .highlighter import HighlightService
 from .task_manager import TaskManager
@@ -37,7 +37,7 @@ class DocumentProcessor:
 
     async def process(
         self, task_id: str, file_bytes: bytes, filename: str, mode: str = "translate", highlight: bool = False,
-        llm_config: dict | None = None,
+        llm_config: LLMCredentials | None = None,
     ) -> None:
         """使用 pdf2zh 处理 PDF 文档"""
 
@@ -47,10 +47,9 @@ class DocumentProcessor:
             self.task_manager.update_progress(task_id, TaskStatus.PARSING, 10, "Preparing to translate...")
 
         # Use per-request LLM config if provided, else fallback to config.yaml
-        cfg = llm_config or {}
-        base_url = cfg.get("base_url") or self.config.llm.base_url
-        api_key = cfg.get("api_key") or self.config.llm.api_key
-        model = cfg.get("model") or self.config.llm.model
+        base_url = (llm_config and llm_config.base_url) or self.config.llm.base_url
+        api_key = (llm_config and llm_config.api_key) or self.config.llm.api_key
+        model = (llm_config and llm_config.model) or self.config.llm.model
 
         os.environ["OPENAILIKED_BASE_URL"] = base_url
         os.environ["OPENAILIKED_API_KEY"] = api_key
@@ -109,7 +108,7 @@ class DocumentProcessor:
             logger.info(f"Task {task_id} completed (mode={mode})")
 
             # Auto-extract knowledge if original PDF exists
-            if llm_config and llm_config.get("api_key"):
+            if llm_config and llm_config.api_key:
                 original_path = None
                 task_obj = self.task_manager.get_task(task_id)
                 if task_obj and task_obj.original_pdf_path:
@@ -119,9 +118,9 @@ class DocumentProcessor:
                         from .knowledge_extractor import KnowledgeExtractor
                         original_bytes = Path(original_path).read_bytes()
                         extractor = KnowledgeExtractor(
-                            api_key=llm_config["api_key"],
-                            model=llm_config.get("model", ""),
-                            base_url=llm_config.get("base_url", ""),
+                            api_key=llm_config.api_key,
+                            model=llm_config.model,
+                            base_url=llm_config.base_url,
                         )
 
                         async def _extract():
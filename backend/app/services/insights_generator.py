@@ -8,6 +8,8 @@ from datetime import datetime
 
 import httpx
 
+from ..core.http import get_http_client
+
 logger = logging.getLogger(__name__)
 
 INSIGHTS_PROMPT = (
@@ -35,9 +37,7 @@ class InsightsGenerator:
     def __init__(self, api_key: str, model: str, base_url: str) -> None:
         self.api_key = api_key
         self.model = model
-        self._client = httpx.AsyncClient(
-            base_url=base_url, timeout=httpx.Timeout(300.0, connect=10.0),
-        )
+        self.base_url = base_url
 
     async def generate(self, papers_json: list[dict]) -> dict:
         """从多篇论文的知识 JSON 生成跨论文洞察。"""
@@ -69,7 +69,12 @@ class InsightsGenerator:
         }
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
 
-        response = await self._client.post("/chat/completions", json=payload, headers=headers)
+        response = await get_http_client().post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            headers=headers,
+            timeout=httpx.Timeout(300.0, connect=10.0),
+        )
         response.raise_for_status()
         content = response.json()["choices"][0]["message"]["content"].strip()
 
@@ -91,6 +96,3 @@ class InsightsGenerator:
         result["generated_at"] = datetime.utcnow().isoformat()
         result["paper_count"] = len(papers_json)
         return result
-
-    async def close(self) -> None:
-        await self._client.aclose()
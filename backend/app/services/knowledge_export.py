@@ -6,6 +6,7 @@ import csv
 import io
 import json
 import zipfile
+from collections.abc import Iterator
 
 
 class KnowledgeExporter:
@@ -14,9 +15,13 @@ class KnowledgeExporter:
     @staticmethod
     def export_obsidian_vault(papers_json: list[dict]) -> bytes:
         """导出为 Obsidian 兼容的 Markdown vault (ZIP)。"""
-        buffer = io.BytesIO()
+        return b"".join(KnowledgeExporter.stream_obsidian_vault(papers_json))
 
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+    @staticmethod
+    def stream_obsidian_vault(papers_json: list[dict]) -> Iterator[bytes]:
+        """逐篇写入 Obsidian vault 的 ZIP 并随写随出，不在内存里拼出整个压缩包。"""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
             # 收集所有实体用于独立的实体笔记
             all_entities: dict[str, dict] = {}
 
@@ -28,6 +33,8 @@ class KnowledgeExporter:
                 # --- 论文笔记 ---
                 md = _paper_to_markdown(paper)
                 zf.writestr(f"papers/{safe_title}.md", md)
+                if sink.pending:
+                    yield sink.drain()
 
                 # 收集实体
                 for ent in paper.get("entities", []):
@@ -45,43 +52,51 @@ class KnowledgeExporter:
                 safe_name = _safe_filename(name)
                 md = _entity_to_markdown(ent)
                 zf.writestr(f"entities/{safe_name}.md", md)
+                if sink.pending:
+                    yield sink.drain()
 
-        return buffer.getvalue()
+        yield sink.drain()
 
     @staticmethod
     def export_csv(papers_json: list[dict]) -> tuple[bytes, bytes]:
         """导出实体和关系为 CSV。返回 (entities_csv, relationships_csv)。"""
-        # Entities CSV
-        ent_buffer = io.StringIO()
-        ent_writer = csv.writer(ent_buffer)
-        ent_writer.writerow(["id", "name", "type", "definition", "importance", "paper_title"])
-
-        # Relationships CSV
-        rel_buffer = io.StringIO()
-        rel_writer = csv.writer(rel_buffer)
-        rel_writer.writerow(["id", "source", "target", "type", "description", "confidence", "paper_title"])
+        return (
+            b"".join(KnowledgeExporter.iter_entities_csv(papers_json)),
+            b"".join(KnowledgeExporter.iter_relationships_csv(papers_json)),
+        )
 
+    @staticmethod
+    def iter_entities_csv(papers_json: list[dict]) -> Iterator[bytes]:
+        """逐篇论文产出实体 CSV 的 UTF-8 片段（首块为表头）。"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "name", "type", "definition", "importance", "paper_title"])
         for paper in papers_json:
             title = paper.get("metadata", {}).get("title", "")
-            entity_names: dict[str, str] = {}
-
             for ent in paper.get("entities", []):
-                ent_id = ent.get("id", "")
-                name = ent.get("name", "")
-                entity_names[ent_id] = name
-                ent_writer.writerow([
-                    ent_id,
-                    name,
+                writer.writerow([
+                    ent.get("id", ""),
+                    ent.get("name", ""),
                     ent.get("type", ""),
                     ent.get("definition", ""),
                     ent.get("importance", 0.5),
                     title,
                 ])
+            yield _drain(buffer)
 
+    @staticmethod
+    def iter_relationships_csv(papers_json: list[dict]) -> Iterator[bytes]:
+        """逐篇论文产出关系 CSV 的 UTF-8 片段（首块为表头）。"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "source", "target", "type", "description", "confidence", "paper_title"])
+        for paper in papers_json:
+            title = paper.get("metadata", {}).get("title", "")
+            entity_names = {ent.get("id", ""): ent.get("name", "") for ent in paper.get("entities", [])}
             for rel in paper.get("relationships", []):
                 src_id = rel.get("source_entity_id", "")
                 tgt_id = rel.get("target_entity_id", "")
-                rel_writer.writerow([
+                writer.writerow([
                     rel.get("id", ""),
                     entity_names.get(src_id, rel.get("source", src_id)),
                     entity_names.get(tgt_id, rel.get("target", tgt_id)),
@@ -90,43 +105,81 @@ class KnowledgeExporter:
                     rel.get("confidence", 0.5),
                     title,
                 ])
+            yield _drain(buffer)
+
+    @staticmethod
+    def stream_csv_zip(papers_json: list[dict]) -> Iterator[bytes]:
+        """边生成边输出 entities.csv / relationships.csv 的 ZIP，不在内存里拼出整个压缩包。"""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, chunks in (
+                ("entities.csv", KnowledgeExporter.iter_entities_csv(papers_json)),
+                ("relationships.csv", KnowledgeExporter.iter_relationships_csv(papers_json)),
+            ):
+                with zf.open(name, "w") as entry:
+                    for chunk in chunks:
+                        entry.write(chunk)
+                        if sink.pending:
+                            yield sink.drain()
+        yield sink.drain()
 
-        return ent_buffer.getvalue().encode("utf-8"), rel_buffer.getvalue().encode("utf-8")
+    @staticmethod
+    def render_bibtex(paper: dict) -> str:
+        """渲染单篇论文的 BibTeX 条目（提取完成时预先算好存库）。"""
+        metadata = paper.get("metadata", {})
+        if metadata.get("bibtex"):
+            return metadata["bibtex"]
+        authors = metadata.get("authors", [])
+        author_str = " and ".join(a.get("name", "") for a in authors)
+        cite_key = paper.get("id", "unknown").replace("pk_", "")
+        fields = [
+            f"@article{{{cite_key},",
+            f"  title = {{{metadata.get('title', '')}}},",
+            f"  author = {{{author_str}}},",
+            f"  year = {{{metadata.get('year', '')}}},",
+        ]
+        if metadata.get("doi"):
+            fields.append(f"  doi = {{{metadata['doi']}}},")
+        if metadata.get("venue"):
+            fields.append(f"  journal = {{{metadata['venue']}}},")
+        fields.append("}\n")
+        return "\n".join(fields)
+
+    @staticmethod
+    def render_csl_item(paper: dict) -> dict:
+        """构建单篇论文的 CSL-JSON 条目。"""
+        metadata = paper.get("metadata", {})
+
+        # 如果论文已有 csl_json，直接使用
+        if metadata.get("csl_json"):
+            return metadata["csl_json"]
+
+        # 从 metadata 构建 CSL-JSON
+        authors = [
+            {"family": _split_name(a.get("name", ""))[1], "given": _split_name(a.get("name", ""))[0]}
+            for a in metadata.get("authors", [])
+        ]
+        item = {
+            "type": "article-journal",
+            "id": paper.get("id", ""),
+            "title": metadata.get("title", ""),
+            "author": authors,
+            "abstract": metadata.get("abstract", ""),
+        }
+        if metadata.get("year"):
+            item["issued"] = {"date-parts": [[metadata["year"]]]}
+        if metadata.get("doi"):
+            item["DOI"] = metadata["doi"]
+        if metadata.get("venue"):
+            item["container-title"] = metadata["venue"]
+        if metadata.get("url"):
+            item["URL"] = metadata["url"]
+        return item
 
     @staticmethod
     def export_csl_json(papers_json: list[dict]) -> bytes:
         """导出为 CSL-JSON 格式（Zotero/Mendeley 兼容）。"""
-        csl_items = []
-        for paper in papers_json:
-            metadata = paper.get("metadata", {})
-
-            # 如果论文已有 csl_json，直接使用
-            if metadata.get("csl_json"):
-                csl_items.append(metadata["csl_json"])
-                continue
-
-            # 从 metadata 构建 CSL-JSON
-            authors = [
-                {"family": _split_name(a.get("name", ""))[1], "given": _split_name(a.get("name", ""))[0]}
-                for a in metadata.get("authors", [])
-            ]
-            item = {
-                "type": "article-journal",
-                "id": paper.get("id", ""),
-                "title": metadata.get("title", ""),
-                "author": authors,
-                "abstract": metadata.get("abstract", ""),
-            }
-            if metadata.get("year"):
-                item["issued"] = {"date-parts": [[metadata["year"]]]}
-            if metadata.get("doi"):
-                item["DOI"] = metadata["doi"]
-            if metadata.get("venue"):
-                item["container-title"] = metadata["venue"]
-            if metadata.get("url"):
-                item["URL"] = metadata["url"]
-            csl_items.append(item)
-
+        csl_items = [KnowledgeExporter.render_csl_item(paper) for paper in papers_json]
         return json.dumps(csl_items, ensure_ascii=False, indent=2).encode("utf-8")
 
 
@@ -135,6 +188,38 @@ class KnowledgeExporter:
 # ------------------------------------------------------------------
 
 
+class _ChunkSink(io.RawIOBase):
+    """只写、不可 seek 的缓冲：zipfile 会改用 data descriptor 写法，已写出的字节可随时取走。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._chunks)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    """取出 StringIO 中已写入的内容并清空。"""
+    data = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
 def _safe_filename(name: str) -> str:
     """将名称转为安全的文件名。"""
     unsafe = '<>:"/\\|?*'
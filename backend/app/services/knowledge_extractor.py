@@ -5,23 +5,65 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-import uuid
+import secrets
 from datetime import datetime
+from pathlib import Path
 
 import fitz
 import httpx
 from sqlmodel import Session
 
+from ..core.config import get_config
 from ..core.db import engine
+from ..core.http import get_http_client
 from ..models.knowledge import (
     Flashcard,
     KnowledgeEntity,
     KnowledgeRelationship,
     PaperKnowledge,
 )
+from .knowledge_export import KnowledgeExporter
 
 logger = logging.getLogger(__name__)
 
+# 全局限制同时运行的提取流水线数量（每条流水线内部还会并发多个 LLM 请求）；
+# 超出的请求在这里排队，而不是同时打满 LLM 限流和内存
+_MAX_EXTRACTIONS = max(1, get_config().processing.max_extractions)
+_extraction_slots = asyncio.Semaphore(_MAX_EXTRACTIONS)
+
+# 手动触发的提取走队列：固定数量的常驻 worker 依次消费，请求只入队文件路径就返回。
+# 排队中的任务不读 PDF、不占内存；worker 在首次入队时按当前事件循环启动
+_extraction_queue: asyncio.Queue | None = None
+_extraction_loop: asyncio.AbstractEventLoop | None = None
+_extraction_workers: set[asyncio.Task] = set()
+
+
+def enqueue_extraction(extractor: KnowledgeExtractor, pdf_path: Path, task_id: str, paper_id: str | None) -> None:
+    """把一篇论文的知识提取放进后台队列。"""
+    global _extraction_queue, _extraction_loop
+    loop = asyncio.get_running_loop()
+    if _extraction_queue is None or _extraction_loop is not loop or not _extraction_workers:
+        _extraction_queue, _extraction_loop = asyncio.Queue(), loop
+        _extraction_workers.clear()
+        for _ in range(_MAX_EXTRACTIONS):
+            worker = asyncio.create_task(_extraction_worker(_extraction_queue))
+            _extraction_workers.add(worker)
+            worker.add_done_callback(_extraction_workers.discard)
+    _extraction_queue.put_nowait((extractor, pdf_path, task_id, paper_id))
+
+
+async def _extraction_worker(queue: asyncio.Queue) -> None:
+    while True:
+        extractor, pdf_path, task_id, paper_id = await queue.get()
+        try:
+            pdf_bytes = await asyncio.to_thread(pdf_path.read_bytes)
+            # 失败时 extract 自己会把 extraction_status/extraction_error 写回论文记录
+            await extractor.extract(pdf_bytes, task_id, user_id=0, paper_id=paper_id)
+        except Exception as exc:
+            logger.warning("Queued knowledge extraction failed for task %s: %s", task_id, exc)
+        finally:
+            queue.task_done()
+
 # ------------------------------------------------------------------
 # 双语指令片段
 # ------------------------------------------------------------------
@@ -124,7 +166,7 @@ FLASHCARD_PROMPT = (
 
 
 def _gen_id(prefix: str) -> str:
-    return f"{prefix}_{uuid.uuid4().hex[:12]}"
+    return f"{prefix}_{secrets.token_hex(6)}"
 
 
 def _bi_text(val: any) -> str:
@@ -196,10 +238,7 @@ class KnowledgeExtractor:
         self.api_key = api_key
         self.model = model
         self.max_concurrent = max_concurrent
-        self._client = httpx.AsyncClient(
-            base_url=base_url,
-            timeout=httpx.Timeout(180.0, connect=10.0),
-        )
+        self.base_url = base_url
 
     # ------------------------------------------------------------------
     # 主入口
@@ -226,13 +265,16 @@ class KnowledgeExtractor:
         self._save_paper(paper)
 
         try:
-            knowledge = await self._run_pipeline(pdf_bytes, paper_id, user_id)
+            async with _extraction_slots:
+                knowledge = await self._run_pipeline(pdf_bytes, paper_id, user_id)
             paper.knowledge_json = json.dumps(knowledge, ensure_ascii=False)
             paper.title = _bi_text(knowledge.get("metadata", {}).get("title", ""))
             paper.doi = knowledge.get("metadata", {}).get("doi")
             paper.arxiv_id = knowledge.get("metadata", {}).get("arxiv_id")
             paper.year = knowledge.get("metadata", {}).get("year")
             paper.venue = knowledge.get("metadata", {}).get("venue")
+            paper.bibtex_cached = KnowledgeExporter.render_bibtex(knowledge)
+            paper.csl_cached = json.dumps(KnowledgeExporter.render_csl_item(knowledge), ensure_ascii=False)
             paper.extraction_status = "completed"
             paper.updated_at = datetime.utcnow()
             self._save_paper(paper)
@@ -429,8 +471,11 @@ class KnowledgeExtractor:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
-        response = await self._client.post(
-            "/chat/completions", json=payload, headers=headers
+        response = await get_http_client().post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            headers=headers,
+            timeout=httpx.Timeout(180.0, connect=10.0),
         )
         response.raise_for_status()
         data = response.json()
@@ -532,7 +577,7 @@ class KnowledgeExtractor:
                     user_id=user_id,
                     name=_bi_text(ent.get("name", "")),
                     type=ent.get("type", "concept"),
-                    aliases_json=json.dumps(ent.get("aliases", []), ensure_ascii=False),
+                    aliases_json=ent.get("aliases", []),
                     definition=_bi_text(ent.get("definition")),
                     importance=ent.get("importance", 0.5),
                 ))
@@ -557,7 +602,7 @@ class KnowledgeExtractor:
                     user_id=user_id,
                     front=_bi_text(fc.get("front", "")),
                     back=_bi_text(fc.get("back", "")),
-                    tags_json=json.dumps(fc.get("tags", []), ensure_ascii=False),
+                    tags_json=fc.get("tags", []),
                     difficulty=fc.get("difficulty", 3),
                     interval_days=1.0,
                     ease_factor=2.5,
@@ -572,7 +617,8 @@ class KnowledgeExtractor:
     # ------------------------------------------------------------------
 
     async def close(self) -> None:
-        await self._client.aclose()
+        # 请求走进程共享的 HTTP 客户端，由应用关闭时统一释放，这里无需处理
+        pass
 
     async def __aenter__(self) -> KnowledgeExtractor:
         return self
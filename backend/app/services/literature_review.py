@@ -5,7 +5,7 @@ from __future__ import annotations
 import json
 import logging
 
-import httpx
+from ..core.http import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -37,22 +37,22 @@ class LiteratureReviewGenerator:
         context = self._build_context(papers_json)
         user_msg = f"Topic: {topic}\n\nWrite a literature review based on these {len(papers_json)} papers." if topic else f"Write a literature review based on these {len(papers_json)} papers."
 
-        async with httpx.AsyncClient(base_url=self.base_url, timeout=300.0) as client:
-            resp = await client.post(
-                "/chat/completions",
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": REVIEW_PROMPT.format(context=context)},
-                        {"role": "user", "content": user_msg},
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 4096,
-                },
-                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
-            )
-            resp.raise_for_status()
-            return resp.json()["choices"][0]["message"]["content"]
+        resp = await get_http_client().post(
+            f"{self.base_url}/chat/completions",
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": REVIEW_PROMPT.format(context=context)},
+                    {"role": "user", "content": user_msg},
+                ],
+                "temperature": 0.3,
+                "max_tokens": 4096,
+            },
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            timeout=300.0,
+        )
+        resp.raise_for_status()
+        return resp.json()["choices"][0]["message"]["content"]
 
     def _text(self, val) -> str:
         if isinstance(val, dict):
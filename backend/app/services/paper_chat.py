@@ -5,7 +5,7 @@ from __future__ import annotations
 import json
 import logging
 
-import httpx
+from ..core.http import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -58,15 +58,15 @@ class PaperChatService:
             messages.extend(history[-6:])
         messages.append({"role": "user", "content": message})
 
-        async with httpx.AsyncClient(base_url=self.base_url, timeout=120.0) as client:
-            resp = await client.post(
-                "/chat/completions",
-                json={"model": self.model, "messages": messages, "temperature": 0.3, "max_tokens": 2048},
-                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
-            )
-            resp.raise_for_status()
-            msg = resp.json()["choices"][0]["message"]
-            return (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
+        resp = await get_http_client().post(
+            f"{self.base_url}/chat/completions",
+            json={"model": self.model, "messages": messages, "temperature": 0.3, "max_tokens": 2048},
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            timeout=120.0,
+        )
+        resp.raise_for_status()
+        msg = resp.json()["choices"][0]["message"]
+        return (msg.get("content") or "").strip() or msg.get("reasoning_content", "")
 
     def _text(self, val) -> str:
         if isinstance(val, dict):
@@ -12,7 +12,7 @@ import arxiv
 import httpx
 from sqlmodel import Session, select
 
-from ..core.config import AppConfig
+from ..core.config import AppConfig, LLMCredentials
 from ..core.db import engine as db_engine
 from ..models.knowledge import PaperKnowledge
 
@@ -243,11 +243,7 @@ class RadarEngine:
                 dest.write_bytes(pdf_bytes)
                 self._task_manager.update_original_path(task.task_id, str(dest))
 
-                llm_cfg = {
-                    "base_url": self.config.llm.base_url,
-                    "api_key": self.config.llm.api_key,
-                    "model": self.config.llm.model,
-                }
+                llm_cfg = LLMCredentials(self.config.llm.base_url, self.config.llm.api_key, self.config.llm.model)
 
                 # Step 1: Translate + Highlight
                 try:
@@ -267,7 +263,7 @@ class RadarEngine:
                 try:
                     from .knowledge_extractor import KnowledgeExtractor
                     extractor = KnowledgeExtractor(
-                        api_key=llm_cfg["api_key"], model=llm_cfg["model"], base_url=llm_cfg["base_url"],
+                        api_key=llm_cfg.api_key, model=llm_cfg.model, base_url=llm_cfg.base_url,
                     )
                     async with extractor:
                         await extractor.extract(pdf_bytes, task.task_id, user_id=0)
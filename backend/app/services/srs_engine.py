@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
+from typing import Any
 
 from ..models.knowledge import Flashcard
 
@@ -11,9 +12,9 @@ class SRSEngine:
     """SuperMemo SM-2 算法。"""
 
     @staticmethod
-    def review(card: Flashcard, quality: int) -> None:
+    def schedule(interval_days: float, ease_factor: float, repetitions: int, quality: int) -> dict[str, Any]:
         """
-        处理一次复习。
+        根据当前 SRS 状态计算一次复习后的新状态（纯函数，不修改任何对象）。
 
         quality: 0-5
             0 = 完全遗忘
@@ -22,31 +23,44 @@ class SRSEngine:
             3 = 回忆正确但很费力
             4 = 回忆正确稍有犹豫
             5 = 完美回忆
+
+        返回可直接用于 UPDATE 的列值字典。
         """
         now = datetime.utcnow()
-        card.last_review = now
 
         if quality >= 3:
             # 回忆成功
-            if card.repetitions == 0:
-                card.interval_days = 1.0
-            elif card.repetitions == 1:
-                card.interval_days = 6.0
+            if repetitions == 0:
+                interval_days = 1.0
+            elif repetitions == 1:
+                interval_days = 6.0
             else:
-                card.interval_days = card.interval_days * card.ease_factor
-            card.repetitions += 1
+                interval_days = interval_days * ease_factor
+            repetitions += 1
         else:
             # 回忆失败，重置
-            card.repetitions = 0
-            card.interval_days = 1.0
+            repetitions = 0
+            interval_days = 1.0
 
         # 更新 ease factor
-        card.ease_factor = max(
+        ease_factor = max(
             1.3,
-            card.ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02),
+            ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02),
         )
 
-        card.next_review = now + timedelta(days=card.interval_days)
+        return {
+            "interval_days": interval_days,
+            "ease_factor": ease_factor,
+            "repetitions": repetitions,
+            "next_review": now + timedelta(days=interval_days),
+            "last_review": now,
+        }
+
+    @staticmethod
+    def review(card: Flashcard, quality: int) -> None:
+        """处理一次复习，就地更新闪卡的 SRS 字段。"""
+        for key, value in SRSEngine.schedule(card.interval_days, card.ease_factor, card.repetitions, quality).items():
+            setattr(card, key, value)
 
     @staticmethod
     def get_due_count(cards: list[Flashcard]) -> int:
@@ -4,6 +4,7 @@ import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from sqlalchemy import delete
 from sqlmodel import Session, select
 
 from ..core.config import get_config
@@ -23,10 +24,10 @@ class TaskManager:
     ) -> Task:
         task_id = uuid.uuid4().hex
         task = Task(task_id=task_id, filename=filename, user_id=user_id, mode=mode, highlight=highlight)
-        with Session(engine) as session:
+        # 所有列都在 Python 侧取默认值，提交后不过期、不回查，省掉一次 SELECT
+        with Session(engine, expire_on_commit=False) as session:
             session.add(task)
             session.commit()
-            session.refresh(task)
         return task
 
     def get_task(self, task_id: str) -> Task | None:
@@ -134,26 +135,16 @@ class TaskManager:
     def cleanup(self) -> None:
         cutoff = datetime.utcnow() - self._ttl
         _terminal = [TaskStatus.COMPLETED, TaskStatus.ERROR]
+        expired = (Task.created_at < cutoff, Task.status.in_(_terminal))
         with Session(engine) as session:
-            statement = select(Task).where(
-                Task.created_at < cutoff,
-                Task.status.in_(_terminal),
-            )
-            expired_tasks = session.exec(statement).all()
-
-            for task in expired_tasks:
-                # Delete result PDF if exists
-                if task.result_pdf_path:
-                    try:
-                        Path(task.result_pdf_path).unlink(missing_ok=True)
-                    except Exception:
-                        pass
-                # Delete original PDF if exists
-                if task.original_pdf_path:
-                    try:
-                        Path(task.original_pdf_path).unlink(missing_ok=True)
-                    except Exception:
-                        pass
-                session.delete(task)
-
+            # Only the file paths are needed; rows are removed with one bulk DELETE
+            statement = select(Task.result_pdf_path, Task.original_pdf_path).where(*expired)
+            for result_pdf_path, original_pdf_path in session.exec(statement).all():
+                for path in (result_pdf_path, original_pdf_path):
+                    if path:
+                        try:
+                            Path(path).unlink(missing_ok=True)
+                        except Exception:
+                            pass
+            session.exec(delete(Task).where(*expired))
             session.commit()
@@ -39,7 +39,7 @@ from app.core.config import get_config
 
 get_config.cache_clear()
 
-from app.core.db import get_session
+from app.core.db import ensure_entity_fts, get_session
 from app.main import app
 
 # Ensure all models are registered
@@ -48,18 +48,23 @@ from app.models.task import *  # noqa: F401, F403
 from app.models.user import *  # noqa: F401, F403
 
 
-@pytest.fixture(name="client")
-def client_fixture():
+@pytest.fixture(name="session")
+def session_fixture():
     test_engine = create_engine(
         "sqlite://",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
     SQLModel.metadata.create_all(test_engine)
+    ensure_entity_fts(test_engine)
+    with Session(test_engine) as session:
+        yield session
+
 
+@pytest.fixture(name="client")
+def client_fixture(session):
     def override():
-        with Session(test_engine) as session:
-            yield session
+        yield session
 
     app.dependency_overrides[get_session] = override
     with TestClient(app) as client:
@@ -1,3 +1,29 @@
+import pytest
+from fastapi import FastAPI
+from sqlmodel import select
+from starlette.testclient import TestClient
+
+from app.api import auth
+from app.core.db import get_session
+from app.models.user import User
+
+
+@pytest.fixture(name="auth_client")
+def auth_client_fixture(session, monkeypatch):
+    # 主应用未挂载认证路由（BYOK 模式），这里单独挂一个；关闭限流以便连续请求
+    monkeypatch.setattr(auth.limiter, "enabled", False)
+    auth_app = FastAPI()
+    auth_app.state.limiter = auth.limiter
+    auth_app.include_router(auth.router, prefix="/api/auth")
+
+    def override():
+        yield session
+
+    auth_app.dependency_overrides[get_session] = override
+    with TestClient(auth_app) as client:
+        yield client
+
+
 def test_register(client):
     response = client.post("/api/auth/register", json={"email": "test@test.com", "password": "secret123"})
     assert response.status_code == 200
@@ -46,3 +72,43 @@ def test_openapi_json(client):
     assert response.status_code == 200
     data = response.json()
     assert "paths" in data
+
+
+def test_register_bulk(auth_client):
+    users = [{"email": "a@test.com", "password": "secret123"}, {"email": "b@test.com", "password": "secret456"}]
+    response = auth_client.post("/api/auth/register/bulk", json=users)
+    assert response.status_code == 200
+    data = response.json()
+    assert [u["email"] for u in data] == ["a@test.com", "b@test.com"]
+    assert all(u["id"] for u in data)
+
+
+def test_register_bulk_duplicate_in_batch(auth_client, session):
+    users = [{"email": "same@test.com", "password": "secret123"}, {"email": "SAME@test.com", "password": "secret123"}]
+    response = auth_client.post("/api/auth/register/bulk", json=users)
+    assert response.status_code == 400
+    assert session.exec(select(User)).all() == []
+
+
+def test_register_bulk_duplicate_existing_user(auth_client, session):
+    session.add(User(email="old@test.com", hashed_password="x"))
+    session.commit()
+    users = [{"email": "new@test.com", "password": "secret123"}, {"email": "old@test.com", "password": "secret123"}]
+    response = auth_client.post("/api/auth/register/bulk", json=users)
+    assert response.status_code == 400
+    assert [u.email for u in session.exec(select(User)).all()] == ["old@test.com"]
+
+
+def test_register_bulk_size_cap(auth_client):
+    users = [{"email": f"u{i}@test.com", "password": "secret123"} for i in range(auth._MAX_BULK_USERS + 1)]
+    response = auth_client.post("/api/auth/register/bulk", json=users)
+    assert response.status_code == 413
+
+
+def test_login_lookup_uses_email_index(session):
+    compiled = auth._LOGIN_LOOKUP.compile(session.get_bind())
+    params = compiled.construct_params({"email": "a@test.com"})
+    plan = session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), tuple(params[name] for name in compiled.positiontup)
+    )
+    assert "USING INDEX ix_user_email_lower" in " ".join(row[-1] for row in plan)
@@ -0,0 +1,34 @@
+from app.services import cache
+
+
+def test_cache_roundtrip_and_expiry(session, monkeypatch):
+    monkeypatch.setattr(cache, "engine", session.get_bind())
+    assert cache.get_cached("insights:a") is None
+
+    cache.set_cached("insights:a", {"paper_count": 2, "themes": ["attention"]}, ttl_seconds=60)
+    assert cache.get_cached("insights:a") == {"paper_count": 2, "themes": ["attention"]}
+
+    cache.set_cached("insights:a", {"paper_count": 3}, ttl_seconds=60)
+    assert cache.get_cached("insights:a") == {"paper_count": 3}
+
+    cache.set_cached("insights:b", [1, 2], ttl_seconds=0)
+    assert cache.get_cached("insights:b") is None
+
+
+async def test_get_or_fetch_caches_only_hits(session, monkeypatch):
+    monkeypatch.setattr(cache, "engine", session.get_bind())
+    calls = []
+
+    async def fetch_found():
+        calls.append("found")
+        return {"paperId": "abc"}
+
+    async def fetch_missing():
+        calls.append("missing")
+        return None
+
+    assert await cache.get_or_fetch("api:s2", 60, fetch_found) == {"paperId": "abc"}
+    assert await cache.get_or_fetch("api:s2", 60, fetch_found) == {"paperId": "abc"}
+    assert await cache.get_or_fetch("api:none", 60, fetch_missing) is None
+    assert await cache.get_or_fetch("api:none", 60, fetch_missing) is None
+    assert calls == ["found", "missing", "missing"]
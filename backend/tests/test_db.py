@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core import db
+from app.models.knowledge import CollectionPaper, KnowledgeEntity, PaperCollection
+
+
+@pytest.fixture(name="legacy_engine")
+def legacy_engine_fixture():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        # 旧版 papercollection：成员存在 NOT NULL 的 paper_ids_json 数组里
+        conn.exec_driver_sql(
+            "CREATE TABLE papercollection (id VARCHAR NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "name VARCHAR NOT NULL, description VARCHAR NOT NULL, color VARCHAR NOT NULL, "
+            "paper_ids_json VARCHAR NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO papercollection VALUES "
+            "('col_a', 0, 'A', '', 'blue', '[\"p2\", \"p1\", \"p2\"]', '2024-01-01', '2024-01-02'), "
+            "('col_b', 0, 'B', '', 'red', 'not json', '2024-01-01', '2024-01-02')"
+        )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.mark.parametrize("sqlite_version", [(3, 40, 0), (3, 31, 1)], ids=["drop-column", "rebuild"])
+def test_migrate_collection_papers(legacy_engine, monkeypatch, sqlite_version):
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", sqlite_version)
+    db._migrate_collection_papers(legacy_engine)
+    db._migrate_collection_papers(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(papercollection)")]
+    assert "paper_ids_json" not in columns
+    with Session(legacy_engine) as session:
+        members = session.exec(
+            select(CollectionPaper.collection_id, CollectionPaper.paper_id).order_by(CollectionPaper.id)
+        ).all()
+        assert [tuple(m) for m in members] == [("col_a", "p2"), ("col_a", "p1")]
+        assert session.get(PaperCollection, "col_b").color == "red"
+        # 迁移后新建收藏夹不再撞上旧列的 NOT NULL 约束
+        session.add(PaperCollection(id="col_new", name="New"))
+        session.commit()
+        assert session.get(PaperCollection, "col_new").created_at is not None
+
+
+def test_entity_fts_replaces_rowid_index():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # 旧版本按 rowid 关联 knowledgeentity 的外部内容索引
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE entity_fts USING fts5("
+            "name, content='knowledgeentity', content_rowid='rowid', tokenize='trigram')"
+        )
+        conn.exec_driver_sql(
+            "CREATE TRIGGER entity_fts_ai AFTER INSERT ON knowledgeentity BEGIN "
+            "INSERT INTO entity_fts(rowid, name) VALUES (new.rowid, new.name); END"
+        )
+    with Session(engine) as session:
+        session.add(KnowledgeEntity(id="ent_a", paper_id="pk", name="Transformer", type="method"))
+        session.commit()
+
+    db.ensure_entity_fts(engine)
+    with engine.connect() as conn:
+        hits = conn.exec_driver_sql("SELECT entity_id FROM entity_fts WHERE entity_fts MATCH 'ransform'").all()
+    assert hits == [("ent_a",)]
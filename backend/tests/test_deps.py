@@ -0,0 +1,68 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.deps import get_client_id, get_client_key, get_llm_config, parse_auth
+from app.core.config import SecurityConfig, get_config
+
+
+def _request(headers: dict[str, str] | None = None) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw, "client": ("10.0.0.1", 1234)})
+
+
+@pytest.fixture
+def api_token(monkeypatch):
+    monkeypatch.setattr(get_config(), "security", SecurityConfig(api_token="s3cret-token"))
+    return "s3cret-token"
+
+
+def test_api_token_uses_server_llm(api_token):
+    cfg = get_llm_config(_request({"Authorization": f"Bearer {api_token}"}))
+    assert cfg.api_key == "test-key"
+    assert cfg.model == "test-model"
+
+
+def test_wrong_api_token_rejected(api_token):
+    with pytest.raises(HTTPException) as exc:
+        get_llm_config(_request({"Authorization": "Bearer s3cret-tokex"}))
+    assert exc.value.status_code == 401
+    with pytest.raises(HTTPException) as exc:
+        get_llm_config(_request({"Authorization": "Bearer short"}))
+    assert exc.value.status_code == 401
+
+
+def test_byok_headers():
+    cfg = get_llm_config(
+        _request({"X-LLM-API-Key": "sk-user", "X-LLM-Base-URL": "https://llm.test/v1", "X-LLM-Model": "m1"})
+    )
+    assert cfg.api_key == "sk-user"
+    assert cfg.base_url == "https://llm.test/v1"
+    assert cfg.model == "m1"
+
+
+def test_fallback_to_config_llm():
+    cfg = get_llm_config(_request())
+    assert cfg.api_key == "test-key"
+
+
+def test_client_id():
+    assert get_client_id(_request({"Authorization": "Bearer x"})) == "_api_token_"
+    assert get_client_id(_request({"X-LLM-API-Key": "sk-0123456789abcdefXYZ"})) == "sk-0123456789abc"
+    assert get_client_id(_request()) == "10.0.0.1"
+
+
+def test_client_key_is_stable_int():
+    key = get_client_key(_request({"X-LLM-API-Key": "sk-0123456789abcdefXYZ"}))
+    assert isinstance(key, int)
+    assert key == get_client_key(_request({"X-LLM-API-Key": "sk-0123456789abcdef"}))
+    assert key != get_client_key(_request())
+
+
+def test_parse_auth_cached_on_request_state():
+    request = _request({"X-LLM-API-Key": "sk-user"})
+    auth = parse_auth(request)
+    assert auth.kind == "byok"
+    assert auth.api_key == "sk-user"
+    assert parse_auth(request) is auth
+    assert request.state.auth is auth
@@ -0,0 +1,29 @@
+import asyncio
+
+from app.services import knowledge_extractor
+
+
+class _RecordingExtractor:
+    def __init__(self) -> None:
+        self.calls: list[tuple[bytes, str, str | None]] = []
+
+    async def extract(self, pdf_bytes, task_id, user_id, paper_id=None):
+        self.calls.append((pdf_bytes, task_id, paper_id))
+        if task_id == "t_bad":
+            raise RuntimeError("LLM unavailable")
+
+
+async def test_queued_extractions_survive_failures(tmp_path):
+    pdf = tmp_path / "paper.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    extractor = _RecordingExtractor()
+
+    knowledge_extractor.enqueue_extraction(extractor, pdf, "t_bad", None)
+    knowledge_extractor.enqueue_extraction(extractor, tmp_path / "missing.pdf", "t_gone", "pk_gone")
+    knowledge_extractor.enqueue_extraction(extractor, pdf, "t_ok", "pk_ok")
+    await asyncio.wait_for(knowledge_extractor._extraction_queue.join(), timeout=5)
+
+    assert sorted(extractor.calls) == [(b"%PDF-1.4", "t_bad", None), (b"%PDF-1.4", "t_ok", "pk_ok")]
+    assert len(knowledge_extractor._extraction_workers) == knowledge_extractor._MAX_EXTRACTIONS
+    for worker in list(knowledge_extractor._extraction_workers):
+        worker.cancel()
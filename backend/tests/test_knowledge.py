@@ -0,0 +1,398 @@
+import io
+import json
+import zipfile
+
+import pytest
+from sqlmodel import select
+
+from app.models.knowledge import (
+    CollectionPaper,
+    Flashcard,
+    KnowledgeEntity,
+    KnowledgeRelationship,
+    PaperCollection,
+    PaperKnowledge,
+    PaperTag,
+    UserAnnotation,
+)
+from app.models.task import Task, TaskStatus
+from app.services import audio_summary
+
+KNOWLEDGE = {
+    "id": "pk_test",
+    "metadata": {"title": "Attention Is All You Need", "abstract": {"en": "We propose the Transformer."}},
+    "tldr": {"en": "Transformers replace recurrence with attention."},
+    "entities": [],
+}
+
+
+@pytest.fixture(name="paper")
+def paper_fixture(session):
+    paper = PaperKnowledge(
+        id="pk_test",
+        title="Attention Is All You Need",
+        knowledge_json=json.dumps(KNOWLEDGE),
+        extraction_status="completed",
+    )
+    session.add(paper)
+    session.add(KnowledgeEntity(id="ent_a", paper_id="pk_test", name="Transformer", type="method"))
+    session.add(KnowledgeEntity(id="ent_b", paper_id="pk_test", name="Self-Attention", type="concept"))
+    session.add(
+        KnowledgeRelationship(
+            id="rel_1", paper_id="pk_test", source_entity_id="ent_a", target_entity_id="ent_b", type="uses"
+        )
+    )
+    session.commit()
+    return paper
+
+
+def test_extract_knowledge_lookup(client, paper, session):
+    assert client.post("/api/knowledge/extract/missing").status_code == 404
+    session.add(Task(task_id="t_running", filename="a.pdf", status=TaskStatus.PARSING))
+    session.add(Task(task_id="t_done", filename="b.pdf", status=TaskStatus.COMPLETED))
+    paper.task_id = "t_done"
+    session.add(paper)
+    session.commit()
+    assert client.post("/api/knowledge/extract/t_running").status_code == 400
+    response = client.post("/api/knowledge/extract/t_done")
+    assert response.json() == {"paper_id": "pk_test", "status": "already_completed"}
+
+
+def test_list_papers(client, paper):
+    response = client.get("/api/knowledge/papers")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["id"] == "pk_test"
+    assert data[0]["summary"] == "We propose the Transformer."
+    assert data[0]["tldr"] == "Transformers replace recurrence with attention."
+
+
+def test_list_papers_summary_variants(client, session):
+    rows = (
+        ("pk_zh", {"metadata": {"abstract": {"zh": "中文摘要"}}, "tldr": "plain tldr"}),
+        ("pk_str", {"metadata": {"abstract": "x" * 300}, "tldr": {"en": "Unable to generate TLDR"}}),
+        ("pk_bad", "{not json"),
+    )
+    for pid, knowledge in rows:
+        kj = knowledge if isinstance(knowledge, str) else json.dumps(knowledge, ensure_ascii=False)
+        session.add(PaperKnowledge(id=pid, title=pid, knowledge_json=kj, extraction_status="completed"))
+    session.commit()
+    papers = {p["id"]: p for p in client.get("/api/knowledge/papers").json()}
+    assert (papers["pk_zh"]["summary"], papers["pk_zh"]["tldr"]) == ("中文摘要", "plain tldr")
+    assert (papers["pk_str"]["summary"], papers["pk_str"]["tldr"]) == ("x" * 200, "")
+    assert (papers["pk_bad"]["summary"], papers["pk_bad"]["tldr"]) == ("", "")
+
+
+def test_list_papers_pagination(client, paper):
+    assert len(client.get("/api/knowledge/papers?limit=1").json()) == 1
+    assert client.get("/api/knowledge/papers?offset=1").json() == []
+    assert client.get("/api/knowledge/papers?limit=0").status_code == 422
+
+
+def test_list_papers_cursor(client, session, paper):
+    for i in range(3):
+        session.add(PaperKnowledge(id=f"pk_{i}", title=f"Paper {i}", extraction_status="pending"))
+    session.commit()
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/knowledge/papers", params=params)
+        seen += [p["id"] for p in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == [p["id"] for p in client.get("/api/knowledge/papers").json()]
+    assert len(seen) == 4
+    assert client.get("/api/knowledge/papers", params={"cursor": "bogus"}).status_code == 400
+
+
+def test_get_paper(client, paper):
+    response = client.get("/api/knowledge/papers/pk_test")
+    assert response.status_code == 200
+    assert response.json()["metadata"]["title"] == "Attention Is All You Need"
+    assert client.get("/api/knowledge/papers/missing").status_code == 404
+
+
+def test_extraction_status_and_paper_export(client, paper):
+    status = client.get("/api/knowledge/extract/status/pk_test").json()
+    assert status == {"paper_id": "pk_test", "status": "completed", "error": None, "title": "Attention Is All You Need"}
+    assert client.get("/api/knowledge/extract/status/missing").status_code == 404
+    assert client.get("/api/knowledge/export/paper/pk_test").json()["id"] == "pk_test"
+
+
+def test_graph_and_search(client, paper):
+    graph = client.get("/api/knowledge/graph").json()
+    assert {n["id"] for n in graph["nodes"]} == {"ent_a", "ent_b"}
+    assert graph["edges"] == [
+        {"id": "rel_1", "source": "ent_a", "target": "ent_b", "type": "uses", "description": None, "confidence": 0.5}
+    ]
+    node = next(n for n in graph["nodes"] if n["id"] == "ent_a")
+    assert node == {
+        "id": "ent_a",
+        "name": "Transformer",
+        "type": "method",
+        "definition": None,
+        "importance": 0.5,
+        "paper_id": "pk_test",
+    }
+    hits = client.get("/api/knowledge/graph/search", params={"q": "Attention"}).json()
+    assert [h["id"] for h in hits] == ["ent_b"]
+
+
+def test_graph_cache_follows_changes(client, session, paper):
+    assert len(client.get("/api/knowledge/graph").json()["nodes"]) == 2
+    session.add(KnowledgeEntity(id="ent_c", paper_id="pk_test", name="Encoder", type="method"))
+    session.commit()
+    assert len(client.get("/api/knowledge/graph").json()["nodes"]) == 3
+    client.delete("/api/knowledge/papers/pk_test")
+    assert client.get("/api/knowledge/graph").json() == {"nodes": [], "edges": []}
+
+
+def test_search_entities_substring(client, paper, session):
+    search = lambda q: [h["id"] for h in client.get("/api/knowledge/graph/search", params={"q": q}).json()]  # noqa: E731
+    assert search("tentio") == ["ent_b"]  # FTS trigram, case-insensitive substring
+    assert search("ATTENTION") == ["ent_b"]
+    assert search('"x') == []
+    assert search("At") == ["ent_b"]  # short query falls back to LIKE
+    assert len(client.get("/api/knowledge/graph/search", params={"q": "r", "limit": 1}).json()) == 1
+    entity = session.get(KnowledgeEntity, "ent_b")
+    entity.name = "Cross Attention"
+    session.add(entity)
+    session.commit()
+    assert search("cross att") == ["ent_b"]  # update trigger keeps the index in sync
+
+
+def test_search_entities_survives_vacuum(client, paper, session):
+    search = lambda q: [h["id"] for h in client.get("/api/knowledge/graph/search", params={"q": q}).json()]  # noqa: E731
+    session.add(KnowledgeEntity(id="ent_c", paper_id="pk_test", name="Positional Encoding", type="method"))
+    session.commit()
+    session.delete(session.get(KnowledgeEntity, "ent_a"))
+    session.commit()
+    # knowledgeentity 的隐式 rowid 可能被 VACUUM 重新编号（取决于 SQLite 版本），再显式挪动 rowid 确保发生
+    session.connection().exec_driver_sql("VACUUM")
+    session.connection().exec_driver_sql("UPDATE knowledgeentity SET rowid = rowid + 100")
+    session.commit()
+    assert search("Positional") == ["ent_c"]
+    assert search("tentio") == ["ent_b"]
+    assert search("Transformer") == []
+
+
+def test_compare_papers_requires_extracted_papers(client):
+    response = client.post("/api/knowledge/compare", json={"paper_ids": ["missing_a", "missing_b"]})
+    assert response.status_code == 400
+    assert "extracted knowledge" in response.json()["detail"]
+
+
+def test_export_bibtex(client, paper):
+    text = client.get("/api/knowledge/export/bibtex").text
+    assert text == "@article{test,\n  title = {Attention Is All You Need},\n  author = {},\n  year = {},\n}\n"
+
+
+def test_export_citations_use_cached_render(client, session, paper):
+    # 旧数据没有缓存：首次导出时现算并回填
+    csl = client.get("/api/knowledge/export/csl-json").json()
+    assert [item["title"] for item in csl] == ["Attention Is All You Need"]
+    client.get("/api/knowledge/export/bibtex")
+    session.refresh(paper)
+    assert paper.bibtex_cached.startswith("@article{test,")
+    assert json.loads(paper.csl_cached)["id"] == "pk_test"
+
+    paper.bibtex_cached = "@misc{cached}\n"
+    session.add(paper)
+    session.commit()
+    assert client.get("/api/knowledge/export/bibtex").text == "@misc{cached}\n"
+
+
+def test_flashcard_lifecycle(client, paper):
+    response = client.post(
+        "/api/knowledge/flashcards",
+        params={"paper_id": "pk_test", "front": "Q", "back": "A", "tags": "nlp,attention"},
+    )
+    assert response.status_code == 200
+    card = response.json()
+    assert card["tags"] == ["nlp", "attention"]
+
+    listed = client.get("/api/knowledge/flashcards").json()
+    assert [c["id"] for c in listed] == [card["id"]]
+    assert listed[0]["tags"] == ["nlp", "attention"]
+
+    due = client.get("/api/knowledge/flashcards/due").json()
+    assert [c["id"] for c in due] == [card["id"]]
+
+    reviewed = client.post(f"/api/knowledge/flashcards/{card['id']}/review", params={"quality": 5}).json()
+    assert reviewed["srs"]["repetitions"] == 1
+    assert reviewed["srs"]["interval_days"] == 1
+    reviewed = client.post(f"/api/knowledge/flashcards/{card['id']}/review", params={"quality": 5}).json()
+    assert reviewed["srs"]["repetitions"] == 2
+    assert reviewed["srs"]["interval_days"] == 6
+    assert reviewed["srs"]["last_review"] is not None
+    assert client.post("/api/knowledge/flashcards/fc_missing/review", params={"quality": 3}).status_code == 404
+
+    assert client.delete(f"/api/knowledge/flashcards/{card['id']}").json() == {"status": "deleted"}
+    assert client.delete(f"/api/knowledge/flashcards/{card['id']}").status_code == 404
+    missing = client.post("/api/knowledge/flashcards", params={"paper_id": "pk_missing", "front": "Q", "back": "A"})
+    assert missing.status_code == 404
+
+
+def test_annotation_lifecycle(client, paper):
+    response = client.post(
+        "/api/knowledge/papers/pk_test/annotations",
+        json={"content": "Key idea", "tags": ["important"], "color": "yellow"},
+    )
+    assert response.status_code == 200
+    ann = response.json()
+    assert ann["color"] == "yellow"
+    assert ann["tags"] == ["important"]
+
+    listed = client.get("/api/knowledge/papers/pk_test/annotations").json()
+    assert [a["id"] for a in listed] == [ann["id"]]
+    assert listed[0]["tags"] == ["important"]
+
+    assert client.delete(f"/api/knowledge/annotations/{ann['id']}").json() == {"status": "deleted"}
+    assert client.delete(f"/api/knowledge/annotations/{ann['id']}").status_code == 404
+
+
+def test_delete_paper_removes_children(client, session, paper):
+    client.post("/api/knowledge/flashcards", params={"paper_id": "pk_test", "front": "Q", "back": "A"})
+    client.post("/api/knowledge/papers/pk_test/annotations", json={"content": "note"})
+    session.add(PaperTag(id="tag_1", paper_id="pk_test", tag="nlp"))
+    session.commit()
+
+    assert client.delete("/api/knowledge/papers/pk_test").json() == {"status": "deleted"}
+    assert client.get("/api/knowledge/papers/pk_test").status_code == 404
+    for model in (Flashcard, UserAnnotation, KnowledgeRelationship, KnowledgeEntity, PaperTag):
+        assert session.exec(select(model)).all() == []
+    assert client.delete("/api/knowledge/papers/pk_test").status_code == 404
+
+
+def test_export_json_tracks_paper_changes(client, session, paper):
+    first = client.get("/api/knowledge/export/json").json()
+    assert [p["id"] for p in first["papers"]] == ["pk_test"]
+
+    session.add(
+        PaperKnowledge(
+            id="pk_second",
+            title="BERT",
+            knowledge_json=json.dumps({"id": "pk_second", "metadata": {"title": "BERT"}}),
+            extraction_status="completed",
+        )
+    )
+    session.commit()
+    second = client.get("/api/knowledge/export/json").json()
+    assert {p["id"] for p in second["papers"]} == {"pk_test", "pk_second"}
+    assert list(second) == ["schema_version", "exported_at", "papers", "global_entities", "global_relationships"]
+
+
+def test_export_json_skips_malformed_knowledge(client, session, paper):
+    session.add(PaperKnowledge(id="pk_bad", title="Broken", knowledge_json="{not json", extraction_status="completed"))
+    session.commit()
+    response = client.get("/api/knowledge/export/json")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()["papers"]] == ["pk_test"]
+
+
+def test_export_json_dedupes_global_entities(client, session):
+    for pid, names in (("pk_1", ["Transformer", "BERT"]), ("pk_2", [" transformer ", "", "GPT"])):
+        session.add(
+            PaperKnowledge(id=pid, title=pid, knowledge_json=json.dumps({"id": pid}), extraction_status="completed")
+        )
+        session.commit()
+        for i, name in enumerate(names):
+            session.add(KnowledgeEntity(id=f"{pid}_{i}", paper_id=pid, name=name, type="concept"))
+        session.commit()
+    # 早期数据以 JSON 文本写入 aliases_json，JSON 列照样能读出列表
+    session.connection().exec_driver_sql("UPDATE knowledgeentity SET aliases_json = '[\"GPT-3\"]' WHERE id = 'pk_2_2'")
+    session.commit()
+    data = client.get("/api/knowledge/export/json").json()
+    names = sorted(e["name"] for e in data["global_entities"])
+    assert names == ["BERT", "GPT", "Transformer"]
+    assert {e["id"] for e in data["global_entities"]} == {"pk_1_0", "pk_1_1", "pk_2_2"}
+    assert next(e for e in data["global_entities"] if e["name"] == "GPT")["aliases"] == ["GPT-3"]
+
+
+def test_export_csv_streams_zip(client, session):
+    knowledge = {
+        "id": "pk_csv",
+        "metadata": {"title": "Graph Paper"},
+        "entities": [{"id": "e1", "name": "GNN", "type": "method"}, {"id": "e2", "name": "Graph", "type": "concept"}],
+        "relationships": [{"id": "r1", "source_entity_id": "e1", "target_entity_id": "e2", "type": "uses"}],
+    }
+    session.add(
+        PaperKnowledge(
+            id="pk_csv", title="Graph Paper", knowledge_json=json.dumps(knowledge), extraction_status="completed"
+        )
+    )
+    session.commit()
+    response = client.get("/api/knowledge/export/csv")
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        entities = zf.read("entities.csv").decode()
+        relationships = zf.read("relationships.csv").decode()
+    assert entities.splitlines()[1:] == ["e1,GNN,method,,0.5,Graph Paper", "e2,Graph,concept,,0.5,Graph Paper"]
+    assert relationships.splitlines()[1] == "r1,GNN,Graph,uses,,0.5,Graph Paper"
+
+
+def test_export_obsidian_streams_zip(client, session):
+    knowledge = {
+        "id": "pk_vault",
+        "metadata": {"title": "Graph Paper"},
+        "entities": [{"id": "e1", "name": "GNN", "type": "method"}],
+    }
+    session.add(
+        PaperKnowledge(
+            id="pk_vault", title="Graph Paper", knowledge_json=json.dumps(knowledge), extraction_status="completed"
+        )
+    )
+    session.commit()
+    response = client.get("/api/knowledge/export/obsidian")
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+        assert sorted(zf.namelist()) == ["entities/GNN.md", "papers/Graph Paper.md"]
+        assert "Graph Paper" in zf.read("entities/GNN.md").decode()
+
+
+def test_tags_read_from_legacy_json_text(client, session, paper):
+    session.connection().exec_driver_sql(
+        "INSERT INTO flashcard (id, paper_id, user_id, front, back, tags_json, difficulty, interval_days, "
+        "ease_factor, repetitions, next_review) VALUES ('fc_legacy', 'pk_test', 0, 'Q', 'A', '[\"rnn\"]', 3, 1.0, "
+        "2.5, 0, '2024-01-01 00:00:00')"
+    )
+    session.connection().exec_driver_sql(
+        "INSERT INTO userannotation (id, paper_id, user_id, type, content, target_type, target_id, tags_json, "
+        "created_at) VALUES ('ann_legacy', 'pk_test', 0, 'note', 'old', 'paper', '', '[\"todo\"]', '2024-01-01 00:00:00')"
+    )
+    session.commit()
+    cards = client.get("/api/knowledge/flashcards").json()
+    assert cards[0]["tags"] == ["rnn"]
+    annotations = client.get("/api/knowledge/papers/pk_test/annotations").json()
+    assert annotations[0]["tags"] == ["todo"]
+
+
+def test_collection_membership(client, session):
+    session.add(PaperCollection(id="col_test", name="Reading list"))
+    session.commit()
+    url = "/api/knowledge/collections/col_test/papers"
+    assert client.post(url, json={"paper_id": "p1"}).json() == {"paper_count": 1}
+    assert client.post(url, json={"paper_id": "p2"}).json() == {"paper_count": 2}
+    # 重复加入保持幂等
+    assert client.post(url, json={"paper_id": "p1"}).json() == {"paper_count": 2}
+    (col,) = client.get("/api/knowledge/collections").json()
+    assert col["paper_ids"] == ["p1", "p2"]
+    assert col["paper_count"] == 2
+
+    assert client.delete(f"{url}/p1").json() == {"paper_count": 1}
+    assert client.post("/api/knowledge/collections/col_missing/papers", json={"paper_id": "p1"}).status_code == 404
+    assert client.delete("/api/knowledge/collections/col_test").status_code == 200
+    assert client.get("/api/knowledge/collections").json() == []
+    assert session.exec(select(CollectionPaper)).all() == []
+
+
+def test_audio_file_supports_range_requests(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_summary, "AUDIO_DIR", tmp_path)
+    (tmp_path / "pk_audio.mp3").write_bytes(b"0123456789")
+    response = client.get("/api/knowledge/papers/pk_audio/audio/file", headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.content == b"2345"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert client.get("/api/knowledge/papers/pk_missing/audio/file").status_code == 404
@@ -0,0 +1,35 @@
+from jose import jwt
+
+from app.core.security import (
+    ALGORITHM,
+    SECRET_KEY,
+    create_access_token,
+    get_password_hash,
+    legacy_pwd_context,
+    password_needs_rehash,
+    verify_password,
+)
+
+
+def test_password_hash_is_argon2id():
+    hashed = get_password_hash("secret123")
+    assert hashed.startswith("$argon2id$")
+    assert verify_password("secret123", hashed)
+    assert not verify_password("badpass", hashed)
+    assert not password_needs_rehash(hashed)
+
+
+def test_legacy_bcrypt_hash_verifies_and_needs_rehash():
+    legacy = legacy_pwd_context.hash("secret123")
+    assert verify_password("secret123", legacy)
+    assert not verify_password("badpass", legacy)
+    assert password_needs_rehash(legacy)
+
+
+def test_verify_password_rejects_garbage_hash():
+    assert not verify_password("secret123", "not-a-hash")
+
+
+def test_access_token_roundtrip():
+    token = create_access_token(subject=42)
+    assert jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"] == "42"